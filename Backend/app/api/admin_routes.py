@@ -0,0 +1,90 @@
+"""Admin-only endpoints: request traces, flame-graph profiles, LLM usage, dispatch and local classifier stats."""
+
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from app.api.deps import require_admin
+from app.core import tracing
+from app.core.config import get_settings
+from app.services import llm_scheduler, local_classifier, usage
+
+router = APIRouter()
+
+FOLDED_MEDIA_TYPE = "text/plain; charset=utf-8"
+
+
+@router.get("/traces")
+def list_traces(
+    format: str = Query("json", pattern="^(json|folded)$"),
+    current_user: dict = Depends(require_admin),
+):
+    """
+    Kept traces, slowest first: the slowest sampled requests plus recent
+    X-Trace requests. format=folded merges them all into one folded-stack
+    profile for flamegraph.pl or speedscope.
+    """
+    if format == "folded":
+        return Response(tracing.folded_stacks(), media_type=FOLDED_MEDIA_TYPE)
+    settings = get_settings()
+    return {
+        "sample_rate": settings.trace_sample_rate,
+        "keep_slowest": settings.trace_keep_slowest,
+        "traces": tracing.list_traces(),
+    }
+
+
+@router.get("/traces/{trace_id}")
+def get_trace(
+    trace_id: str,
+    format: str = Query("json", pattern="^(json|folded)$"),
+    current_user: dict = Depends(require_admin),
+):
+    """One trace as a nested span tree, or as folded stacks."""
+    trace = tracing.get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    if format == "folded":
+        return Response(tracing.folded_stacks([trace]), media_type=FOLDED_MEDIA_TYPE)
+    return trace.to_dict()
+
+
+@router.delete("/traces")
+def clear_traces(current_user: dict = Depends(require_admin)):
+    return {"cleared": tracing.clear()}
+
+
+@router.get("/usage")
+async def get_usage_report(
+    days: int = Query(7, ge=1, le=366),
+    group_by: list[str] = Query(["user"]),
+    username: str | None = None,
+    doc_id: str | None = None,
+    current_user: dict = Depends(require_admin),
+):
+    """
+    Org-wide LLM token usage over the last `days` days. group_by is repeatable:
+    user, document, session, prompt_type, day.
+    """
+    invalid = [g for g in group_by if g not in ("user", "document", "session", "prompt_type", "day")]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid group_by: {', '.join(invalid)}")
+    rows = await asyncio.to_thread(usage.report, days, list(dict.fromkeys(group_by)), username, doc_id)
+    settings = get_settings()
+    return {
+        "days": days,
+        "group_by": group_by,
+        "default_daily_quota": settings.usage_daily_token_quota or None,
+        "quota_overrides": settings.usage_user_quotas,
+        "rows": rows,
+    }
+
+
+@router.get("/llm-scheduler")
+def get_llm_scheduler_stats(current_user: dict = Depends(require_admin)):
+    """Current LLM dispatch queues, in-flight calls and chat SLO status."""
+    return llm_scheduler.get_stats()
+
+
+@router.get("/local-classifier")
+def get_local_classifier_stats(current_user: dict = Depends(require_admin)):
+    """Training set size per clause type, local vs escalated predictions and agreement with the LLM."""
+    return local_classifier.get_stats()
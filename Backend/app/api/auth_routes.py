@@ -6,7 +6,12 @@ from fastapi.security import OAuth2PasswordRequestForm
 from app.models.auth import UserCreate, UserOut, Token
 from app.core.security import hash_password, verify_password, create_access_token
 from app.db.database import get_db
-from app.db.repositories import create_user, get_user_by_username, user_exists
+from app.db.repositories import (
+    create_user, get_user_by_username, user_exists, delete_user, list_user_documents
+)
+from app.core import auth_cache
+from app.api.deps import get_current_user
+from app.services.documents import purge_document
 
 logger = logging.getLogger(__name__)
 
@@ -52,3 +57,19 @@ def login(form_data: OAuth2PasswordRequestForm = Depends()):
         return Token(access_token=access_token)
     finally:
         conn.close()
+
+
+@router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
+def delete_account(current_user: dict = Depends(get_current_user)):
+    """Delete the current user, their documents and chat history."""
+    username = current_user["username"]
+    conn = get_db()
+    try:
+        for doc in list_user_documents(conn, username):
+            purge_document(conn, doc["id"])
+        delete_user(conn, username)
+    finally:
+        conn.close()
+    # Outstanding tokens must stop working immediately, not after the cache TTL
+    auth_cache.invalidate_user(username)
+    logger.info("User deleted: %s", username)
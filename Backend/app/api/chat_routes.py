@@ -2,13 +2,17 @@
 
 import uuid
 from fastapi import APIRouter, Depends, HTTPException
-from app.api.deps import get_current_user
-from app.db.database import get_db
+from app.api.deps import enforce_quota, get_current_user
+from app.core.tracing import traced
+from app.db.database import get_db, get_async_db
 from app.db.repositories import (
-    create_chat_session, list_chat_sessions,
-    add_chat_message, get_chat_messages, delete_chat_session
+    list_chat_sessions, get_chat_messages, delete_chat_session
 )
-from app.services.qa_chain import ask_question
+from app.db import async_repositories as arepo
+from app.services import usage
+from app.services.qa_chain import aask_question, astream_answer, estimate_tokens
+from app.services.chat_history import abuild_history
+from app.api.sse import format_sse, sse_response
 from pydantic import BaseModel
 from typing import Optional
 
@@ -36,44 +40,66 @@ def get_messages(session_id: str, current_user: dict = Depends(get_current_user)
     finally:
         conn.close()
 
+@traced("db.start_turn")
+async def _start_turn(conn, req: ChatRequest, username: str) -> tuple[str, list[dict], Optional[str]]:
+    """
+    Create the session if needed, save the user message, and return
+    (session_id, recent history within the token budget, summary of earlier turns).
+    """
+    # Create session if not provided
+    if not req.session_id:
+        session_id = str(uuid.uuid4())
+        title = req.question[:50] + ("..." if len(req.question) > 50 else "")
+        await arepo.create_chat_session(conn, session_id, username, title, req.doc_id)
+    else:
+        session_id = req.session_id
+
+    # Save user message
+    message_id = await arepo.add_chat_message(conn, session_id, "user", req.question)
+
+    # Get conversation history for memory, excluding the message we just added
+    conversation_history, summary = await abuild_history(conn, session_id, before_id=message_id)
+    return session_id, conversation_history, summary
+
+
+@traced("db.save_answer")
+async def _save_answer(conn, session_id: str, answer: str, referenced_clauses: list[str],
+                       overall_risk: str, confidence: float) -> None:
+    """Save the assistant message with its metadata."""
+    meta = {
+        "referenced_clauses": referenced_clauses,
+        "overall_risk": overall_risk,
+        "confidence": confidence,
+    }
+    await arepo.add_chat_message(conn, session_id, "assistant", answer, meta)
+
+
+async def _check_quota(req: ChatRequest, username: str) -> None:
+    usage.set_context(document_id=req.doc_id, session_id=req.session_id)
+    await enforce_quota(username, lambda: estimate_tokens(req.question, with_history=bool(req.session_id)))
+
+
 @router.post("/send")
-def send_message(req: ChatRequest, current_user: dict = Depends(get_current_user)):
-    conn = get_db()
+async def send_message(req: ChatRequest, current_user: dict = Depends(get_current_user)):
+    await _check_quota(req, current_user["username"])
+    conn = await get_async_db()
     try:
-        # Create session if not provided
-        if not req.session_id:
-            session_id = str(uuid.uuid4())
-            title = req.question[:50] + ("..." if len(req.question) > 50 else "")
-            create_chat_session(conn, session_id, current_user["username"], title, req.doc_id)
-        else:
-            session_id = req.session_id
-
-        # Save user message
-        add_chat_message(conn, session_id, "user", req.question)
-
-        # Get conversation history for memory
-        history = get_chat_messages(conn, session_id)
-        # Exclude the message we just added (last one) to avoid duplication
-        conversation_history = [
-            {"role": m["role"], "content": m["content"]}
-            for m in history[:-1]
-        ]
-
-        # Get AI answer with memory
-        result = ask_question(
+        session_id, conversation_history, summary = await _start_turn(conn, req, current_user["username"])
+        usage.set_context(session_id=session_id)
+
+        # Get AI answer with memory (awaits the LLM without holding a worker thread)
+        result = await aask_question(
             req.question,
             top_k=req.top_k,
             doc_id=req.doc_id,
             conversation_history=conversation_history if conversation_history else None,
+            history_summary=summary,
         )
 
-        # Save assistant message
-        meta = {
-            "referenced_clauses": result.referenced_clauses,
-            "overall_risk": result.overall_risk,
-            "confidence": result.confidence,
-        }
-        add_chat_message(conn, session_id, "assistant", result.answer, meta)
+        await _save_answer(
+            conn, session_id, result.answer, result.referenced_clauses,
+            result.overall_risk, result.confidence,
+        )
 
         return {
             "session_id": session_id,
@@ -81,9 +107,49 @@ def send_message(req: ChatRequest, current_user: dict = Depends(get_current_user
             "referenced_clauses": result.referenced_clauses,
             "overall_risk": result.overall_risk,
             "confidence": result.confidence,
+            "cached": result.cached,
         }
     finally:
-        conn.close()
+        await conn.close()
+
+
+@router.post("/send/stream")
+async def send_message_stream(req: ChatRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Streaming variant of /send (text/event-stream). Events, in order:
+    session, references, token (repeated), done. The assistant message is
+    persisted before the done event is sent.
+    """
+    await _check_quota(req, current_user["username"])
+    conn = await get_async_db()
+    try:
+        session_id, conversation_history, summary = await _start_turn(conn, req, current_user["username"])
+    finally:
+        await conn.close()
+    usage.set_context(session_id=session_id)
+
+    async def events():
+        yield format_sse("session", {"session_id": session_id})
+        async for event, data in astream_answer(
+            req.question,
+            top_k=req.top_k,
+            doc_id=req.doc_id,
+            conversation_history=conversation_history if conversation_history else None,
+            history_summary=summary,
+        ):
+            if event == "done":
+                save_conn = await get_async_db()
+                try:
+                    await _save_answer(
+                        save_conn, session_id, data["answer"], data["referenced_clauses"],
+                        data["overall_risk"], data["confidence"],
+                    )
+                finally:
+                    await save_conn.close()
+                data = {"session_id": session_id, **data}
+            yield format_sse(event, data)
+
+    return sse_response(events())
 
 @router.delete("/sessions/{session_id}")
 def delete_session(session_id: str, current_user: dict = Depends(get_current_user)):
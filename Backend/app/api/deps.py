@@ -1,37 +1,86 @@
 """Shared FastAPI dependencies"""
 
+import asyncio
+from typing import Callable
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
+from app.core import auth_cache, tracing
+from app.core.config import get_settings
 from app.core.security import decode_access_token
 from app.db.database import get_db
+from app.db.repositories import get_user_principal
+from app.services import usage
 
 # This tells FastAPI where the login endpoint is (for Swagger UI)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
+
+def _load_principal(username: str) -> dict | None:
+    conn = get_db()
+    try:
+        return get_user_principal(conn, username)
+    finally:
+        conn.close()
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
     """
     Dependency that extracts and validates the current user from JWT.
     Raises 401 if token is invalid or user doesn't exist.
+    Verified tokens and principals are cached briefly, so the common case
+    needs neither JWT decoding nor a database round trip.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid or expired token",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    payload = decode_access_token(token)
-    if payload is None:
-        raise credentials_exception
-    username: str = payload.get("sub")
+    username = auth_cache.get_token_subject(token)
     if username is None:
-        raise credentials_exception
+        payload = decode_access_token(token)
+        if payload is None:
+            raise credentials_exception
+        username = payload.get("sub")
+        if username is None:
+            raise credentials_exception
+        auth_cache.remember_token(token, username, payload.get("exp"))
+
     # Verify user still exists in DB
-    conn = get_db()
-    try:
-        from app.db.repositories import get_user_by_username
-        user = get_user_by_username(conn, username)
-    finally:
-        conn.close()
+    user = auth_cache.get_principal(username)
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        user = await asyncio.to_thread(_load_principal, username)
+        if user is None:
+            raise credentials_exception
+        auth_cache.remember_principal(username, user)
+    tracing.set_user(username)
+    usage.set_context(user=username)
+    return user
+
+
+async def require_admin(current_user: dict = Depends(get_current_user)) -> dict:
+    """Dependency that only admits users listed in ADMIN_USERNAMES."""
+    if current_user["username"] not in get_settings().admin_usernames:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
+
+async def enforce_quota(username: str, estimate: Callable[[], int]) -> None:
+    """
+    Reject the request with 429 before any LLM work starts if the estimated
+    tokens would take the user past their daily quota.
+    """
+    try:
+        await asyncio.to_thread(usage.check_quota, username, estimate)
+    except usage.QuotaExceededError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={
+                "message": "Daily LLM token quota exceeded",
+                "used_tokens": e.used,
+                "quota": e.quota,
+                "requested_tokens": e.requested,
+            },
+            headers={"Retry-After": str(usage.seconds_until_reset())},
+        )
@@ -1,29 +1,41 @@
 """Document upload and analysis routes."""
 
+import base64
+import csv
+import io
+import json
 import uuid
+import zipfile
 import logging
 from pathlib import Path
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from typing import AsyncIterator, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, UploadFile, File, status
+from fastapi.responses import StreamingResponse
 from app.core.config import get_settings
-from app.api.deps import get_current_user
+from app.api.deps import enforce_quota, get_current_user
 
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db
+from app.db import async_repositories as arepo
 from app.db.repositories import (
     create_document, insert_clauses, get_clauses_by_document,
     get_document, list_user_documents, is_document_analyzed,
-    update_clause_classification, delete_document
+    get_clauses_page, update_clause_classifications
 )
 
 from app.services.pdf_extractor import extract_pages
 from app.services.segmenter import segment_document
 from app.models.clause import Clause, DocumentOut
 
-from app.services.classifier import classify_clauses
-from app.services.risk_scorer import score_clauses
-from app.db.repositories import update_clause_classification
+from app.services import (
+    classifier, ingestion, llm_scheduler, risk_lexicon, risk_scorer, triage, usage, versioning,
+)
+from app.services.alignment import align_clauses
+from app.services.documents import purge_document
+from app.services.analysis import aanalyze_document, asplit_clauses, calls_avoided
 from app.models.clause import ClassifiedClause
 
 from app.services.vector_store import add_clauses as add_clauses_to_index
+from app.services.vector_store import copy_vectors as copy_vectors_in_index
 
 
 logger = logging.getLogger(__name__)
@@ -106,15 +118,7 @@ def delete_document_endpoint(doc_id: str, current_user: dict = Depends(get_curre
         if doc["uploaded_by"] != current_user["username"]:
             raise HTTPException(status_code=403, detail="Not your document")
 
-        # Delete from DB
-        delete_document(conn, doc_id)
-
-        # Delete PDF file
-        settings = get_settings()
-        pdf_path = Path(settings.upload_dir) / f"{doc_id}.pdf"
-        if pdf_path.exists():
-            pdf_path.unlink()
-            logger.info("Deleted PDF file: %s", pdf_path)
+        purge_document(conn, doc_id)
 
     finally:
         conn.close()
@@ -143,54 +147,106 @@ def get_document_pdf(doc_id: str, current_user: dict = Depends(get_current_user)
         filename=doc["filename"],
     )
 
-@router.get("/{doc_id}/export")
-def export_document_report(doc_id: str, current_user: dict = Depends(get_current_user)):
-    """Export analysis report as JSON."""
-    conn = get_db()
+_EXPORT_FIELDS = [
+    "clause_id", "section_title", "text", "page",
+    "clause_type", "importance", "risk_level", "risk_reason",
+]
+_EXPORT_MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+_EXPORT_FLUSH_BYTES = 64 * 1024
+
+
+def _export_clause(r: dict) -> dict:
+    return {
+        "clause_id": r["id"],
+        "section_title": r.get("section_title") or "Untitled",
+        "text": r["text"],
+        "page": r["page"],
+        "clause_type": r.get("clause_type"),
+        "importance": r.get("importance"),
+        "risk_level": r.get("risk_level"),
+        "risk_reason": r.get("risk_reason"),
+    }
+
+
+def _csv_line(values: list) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+
+async def _export_chunks(conn, doc: dict, export_format: str) -> AsyncIterator[str]:
+    """Render the export row by row from the clause cursor, flushing in ~64KB chunks."""
+    doc_id = doc["id"]
     try:
-        doc = get_document(conn, doc_id)
-        if not doc:
-            raise HTTPException(status_code=404, detail="Document not found")
-
-        rows = get_clauses_by_document(conn, doc_id)
-        clauses = [
-            {
-                "section_title": r.get("section_title", "Untitled"),
-                "text": r["text"],
-                "page": r["page"],
-                "clause_type": r.get("clause_type"),
-                "importance": r.get("importance"),
-                "risk_level": r.get("risk_level"),
-                "risk_reason": r.get("risk_reason"),
+        pending: list[str] = []
+        size = 0
+        if export_format == "json":
+            header = {
+                "document": {
+                    "filename": doc["filename"],
+                    "page_count": doc["page_count"],
+                    "uploaded_by": doc["uploaded_by"],
+                    "created_at": doc["created_at"],
+                    "is_analyzed": await arepo.is_document_analyzed(conn, doc_id),
+                },
+                "summary": await arepo.get_risk_distribution(conn, doc_id),
             }
-            for r in rows
-        ]
-
-        risk_counts = {"High": 0, "Medium": 0, "Low": 0}
-        for c in clauses:
-            level = c.get("risk_level")
-            if level in risk_counts:
-                risk_counts[level] += 1
-
-        report = {
-            "document": {
-                "filename": doc["filename"],
-                "page_count": doc["page_count"],
-                "uploaded_by": doc["uploaded_by"],
-                "created_at": doc["created_at"],
-                "is_analyzed": is_document_analyzed(conn, doc_id),
-            },
-            "summary": {
-                "total_clauses": len(clauses),
-                "risk_distribution": risk_counts,
-            },
-            "clauses": clauses,
-        }
-        return report
+            pending.append(json.dumps(header)[:-1] + ', "clauses": [')
+        elif export_format == "csv":
+            pending.append(_csv_line(_EXPORT_FIELDS))
+
+        first = True
+        async for row in arepo.iter_clauses_by_document(conn, doc_id):
+            clause = _export_clause(row)
+            if export_format == "json":
+                line = ("" if first else ", ") + json.dumps(clause)
+            elif export_format == "ndjson":
+                line = json.dumps(clause) + "\n"
+            else:
+                line = _csv_line([clause[f] for f in _EXPORT_FIELDS])
+            first = False
+            pending.append(line)
+            size += len(line)
+            if size >= _EXPORT_FLUSH_BYTES:
+                yield "".join(pending)
+                pending, size = [], 0
+
+        if export_format == "json":
+            pending.append("]}")
+        if pending:
+            yield "".join(pending)
     finally:
-        conn.close()
+        await conn.close()
 
 
+@router.get("/{doc_id}/export")
+async def export_document_report(
+    doc_id: str,
+    export_format: str = Query("json", alias="format", pattern="^(json|ndjson|csv)$"),
+    current_user: dict = Depends(get_current_user),
+):
+    """Export the analysis report as JSON, NDJSON or CSV, streamed from the database."""
+    conn = await get_async_db()
+    try:
+        doc = await arepo.get_document(conn, doc_id)
+    except Exception:
+        await conn.close()
+        raise
+    if not doc:
+        await conn.close()
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    stem = Path(doc["filename"]).stem.replace('"', "") or doc_id
+    return StreamingResponse(
+        _export_chunks(conn, doc, export_format),
+        media_type=_EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{stem}-report.{export_format}"'},
+    )
+
 
 @router.get("/{doc_id}")
 def get_document_detail(doc_id: str, current_user: dict = Depends(get_current_user)):
@@ -207,17 +263,58 @@ def get_document_detail(doc_id: str, current_user: dict = Depends(get_current_us
         conn.close()
 
 
+def _index_uploaded_clauses(doc_id: str, clauses: list[dict], carried_from: Optional[dict] = None) -> None:
+    """
+    Background task: make freshly uploaded clauses searchable before analysis.
+    carried_from maps unchanged clauses of a new version to their previous
+    clause, whose vector is copied instead of embedding the text again.
+    """
+    conn = get_db()
+    try:
+        if get_document(conn, doc_id) is None:
+            logger.info("Document %s deleted before indexing, skipping", doc_id)
+            return
+    finally:
+        conn.close()
+    try:
+        if carried_from:
+            copy_vectors_in_index([
+                (carried_from[c["clause_id"]], c) for c in clauses if c["clause_id"] in carried_from
+            ])
+        add_clauses_to_index(clauses)
+    except Exception as e:
+        logger.error("Upload-time indexing failed for document %s: %s", doc_id, str(e))
+
+
 @router.post("/upload", response_model=DocumentOut, status_code=status.HTTP_201_CREATED)
 def upload_document(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    parent_id: Optional[str] = Query(None, description="Upload as a new version of this document"),
     current_user: dict = Depends(get_current_user),
 ):
-    """Upload a PDF, extract text, and segment into clauses."""
+    """
+    Upload a PDF, extract text, segment into clauses, and index them in the background.
+    With parent_id, the upload is the next version of that document: clauses are
+    diffed against it and unchanged ones keep its analysis and vectors, so only
+    modified and added clauses are embedded and later sent to the LLM.
+    """
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Only PDF files are accepted",
         )
+    parent = None
+    if parent_id:
+        conn = get_db()
+        try:
+            parent = get_document(conn, parent_id)
+        finally:
+            conn.close()
+        if not parent:
+            raise HTTPException(status_code=404, detail="Previous version not found")
+        if parent["uploaded_by"] != current_user["username"]:
+            raise HTTPException(status_code=403, detail="Not your document")
     settings = get_settings()
     doc_id = str(uuid.uuid4())
     # Save uploaded file
@@ -238,96 +335,319 @@ def upload_document(
         )
     # Segment into clauses
     clauses = segment_document(pages, doc_id)
+    # Instant keyword-only risk so the UI can flag clauses before analysis
+    for clause, level in zip(clauses, risk_lexicon.provisional_risk([c.text for c in clauses])):
+        clause.provisional_risk = level
+    clause_dicts = [c.model_dump() for c in clauses]
+    version = (parent["version"] or 1) + 1 if parent else 1
+    changes = None
+    carried = []
     # Store in database
     conn = get_db()
     try:
-        create_document(conn, doc_id, file.filename, current_user["username"], len(pages))
-        insert_clauses(conn, doc_id, [c.model_dump() for c in clauses])
+        if parent:
+            previous = get_clauses_by_document(conn, parent_id)
+            changes = versioning.diff_clauses(clause_dicts, previous)
+            carried = versioning.carried_labels(changes, previous)
+        create_document(
+            conn, doc_id, file.filename, current_user["username"], len(pages),
+            parent_id=parent_id, version=version,
+        )
+        insert_clauses(conn, doc_id, clause_dicts)
+        if carried:
+            update_clause_classifications(conn, carried)
     finally:
         conn.close()
+
+    # Vector metadata for carried clauses gets the copied labels straight away
+    labels = {cid: {"clause_type": t, "risk_level": lvl} for cid, t, _, lvl, *_ in carried}
+    carried_from = {
+        ch["clause_id"]: ch["previous_clause_id"]
+        for ch in changes or () if ch["status"] == versioning.UNCHANGED
+    }
+    if parent:
+        logger.info(
+            "Document %s is version %d of %s: %s, %d clauses keep their analysis",
+            doc_id, version, parent_id, versioning.summarize(changes), len(carried),
+        )
+    # Phase 1: embed now so the document is searchable; analysis only patches labels later
+    background_tasks.add_task(
+        _index_uploaded_clauses,
+        doc_id,
+        triage.indexable([{**c, **labels.get(c["clause_id"], {}), "document_id": doc_id} for c in clause_dicts]),
+        carried_from,
+    )
     return DocumentOut(
         doc_id=doc_id,
         filename=file.filename,
         page_count=len(pages),
         clauses=clauses,
+        parent_id=parent_id,
+        version=version,
+        changes=versioning.summarize(changes) if changes is not None else None,
     )
 
+
+def _check_bulk_limits(job: dict, staged_bytes: int, files: int, size: int) -> None:
+    """Reject a bulk upload before staging files that would take it past the per-request limits."""
+    settings = get_settings()
+    if len(job["files"]) + files > settings.ingest_max_files:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.ingest_max_files} files per request",
+        )
+    if staged_bytes + size > settings.ingest_max_request_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.ingest_max_request_bytes} bytes per request",
+        )
+
+
+@router.post("/bulk", status_code=status.HTTP_202_ACCEPTED)
+def bulk_upload_documents(
+    background_tasks: BackgroundTasks,
+    files: list[UploadFile] = File(...),
+    index: bool = Query(True, description="Embed clauses so documents are searchable"),
+    analyze: bool = Query(False, description="Queue LLM classification and risk scoring"),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Upload many PDFs (and/or zip archives of PDFs) in one request. Files are
+    staged, then extracted, stored and indexed in the background; poll
+    GET /documents/bulk/{job_id} for per-file progress and failures.
+    """
+    settings = get_settings()
+    job = ingestion.create_job(current_user["username"], index, analyze)
+    paths: dict[str, Path] = {}
+    staged_bytes = 0
+    try:
+        for upload in files:
+            name = Path(upload.filename or "").name
+            if name.lower().endswith(".zip"):
+                with zipfile.ZipFile(upload.file) as archive:
+                    members = ingestion.list_zip_pdfs(archive)
+                    # Limits are checked against the declared sizes before anything is extracted
+                    declared = sum(member.file_size for _, member, _ in members if member is not None)
+                    _check_bulk_limits(job, staged_bytes, len(members), declared)
+                    for member_name, member, error in members:
+                        if error:
+                            ingestion.add_file(job, member_name, error=error)
+                            continue
+                        with archive.open(member) as source:
+                            doc_id, path = ingestion.stage_pdf(source)
+                        paths[doc_id] = path
+                        staged_bytes += member.file_size
+                        ingestion.add_file(job, member_name, doc_id)
+            elif name.lower().endswith(".pdf"):
+                if upload.size is not None and upload.size > settings.ingest_max_file_bytes:
+                    _check_bulk_limits(job, staged_bytes, 1, 0)
+                    ingestion.add_file(job, name, error=f"File exceeds {settings.ingest_max_file_bytes} bytes")
+                else:
+                    _check_bulk_limits(job, staged_bytes, 1, upload.size or 0)
+                    doc_id, path = ingestion.stage_pdf(upload.file)
+                    paths[doc_id] = path
+                    staged_bytes += path.stat().st_size
+                    ingestion.add_file(job, name, doc_id)
+            else:
+                _check_bulk_limits(job, staged_bytes, 1, 0)
+                ingestion.add_file(job, name, error="Only PDF or zip files are accepted")
+    except HTTPException:
+        for path in paths.values():
+            path.unlink(missing_ok=True)
+        raise
+    except zipfile.BadZipFile:
+        for path in paths.values():
+            path.unlink(missing_ok=True)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid zip archive")
+
+    background_tasks.add_task(ingestion.run_job, job, paths)
+    logger.info("Bulk ingestion job %s: %d files staged", job["job_id"], len(paths))
+    return {
+        "job_id": job["job_id"],
+        "files": len(job["files"]),
+        "staged": len(paths),
+        "status_url": f"/documents/bulk/{job['job_id']}",
+    }
+
+
+@router.get("/bulk/{job_id}")
+def get_bulk_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Progress of a bulk ingestion job, per file."""
+    job = ingestion.get_job(job_id)
+    if job is None or job["username"] != current_user["username"]:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job
+
+
+def _encode_cursor(row: dict) -> str:
+    raw = json.dumps([row["page"], row["id"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[int, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        page, clause_id = json.loads(raw)
+        return int(page), str(clause_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/{doc_id}/clauses")
 def get_document_clauses(
     doc_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    risk_level: Optional[list[str]] = Query(None),
+    clause_type: Optional[list[str]] = Query(None),
     current_user: dict = Depends(get_current_user),
 ):
-    """Retrieve all clauses for a document."""
+    """
+    Retrieve a document's clauses, optionally filtered by risk level / clause type.
+    With `limit`, returns one keyset page; the next page's cursor is in X-Next-Cursor.
+    """
+    after = _decode_cursor(cursor) if cursor else None
     conn = get_db()
     try:
         doc = get_document(conn, doc_id)
         if not doc:
             raise HTTPException(status_code=404, detail="Document not found")
-        rows = get_clauses_by_document(conn, doc_id)
-        return [
-            {
-                "clause_id": r["id"],
-                "section_title": r["section_title"] or "Untitled",
-                "text": r["text"],
-                "page": r["page"],
-                "clause_type": r.get("clause_type"),
-                "importance": r.get("importance"),
-                "risk_level": r.get("risk_level"),
-                "risk_reason": r.get("risk_reason"),
-            }
-            for r in rows
-        ]
+        rows = get_clauses_page(
+            conn, doc_id,
+            limit=limit + 1 if limit else None,
+            after=after,
+            risk_levels=risk_level,
+            clause_types=clause_type,
+        )
     finally:
         conn.close()
 
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+    return [
+        {
+            "clause_id": r["id"],
+            "section_title": r["section_title"] or "Untitled",
+            "text": r["text"],
+            "page": r["page"],
+            "clause_type": r.get("clause_type"),
+            "importance": r.get("importance"),
+            "risk_level": r.get("risk_level"),
+            "risk_reason": r.get("risk_reason"),
+            "label_source": r.get("label_source"),
+            "duplicate_of": r.get("duplicate_of"),
+            "duplicate_similarity": r.get("duplicate_similarity"),
+            "provisional_risk": r.get("provisional_risk"),
+            "type_source": r.get("type_source"),
+        }
+        for r in rows
+    ]
 
 
-@router.post("/{doc_id}/analyze", response_model=list[ClassifiedClause])
-def analyze_document(
+@router.get("/{doc_id}/diff")
+def diff_document(
     doc_id: str,
+    against: Optional[str] = Query(None, description="Document to diff against (default: previous version)"),
     current_user: dict = Depends(get_current_user),
 ):
-    """Classify clauses and score risk for an uploaded document."""
+    """Clause-level diff of a document against its previous version: unchanged, modified, added and removed."""
     conn = get_db()
     try:
         doc = get_document(conn, doc_id)
         if not doc:
             raise HTTPException(status_code=404, detail="Document not found")
+        previous_id = against or doc.get("parent_id")
+        if not previous_id:
+            raise HTTPException(status_code=400, detail="Document has no previous version; pass ?against=")
+        if not get_document(conn, previous_id):
+            raise HTTPException(status_code=404, detail="Previous version not found")
+        clauses = get_clauses_by_document(conn, doc_id)
+        previous = get_clauses_by_document(conn, previous_id)
+    finally:
+        conn.close()
 
-        rows = get_clauses_by_document(conn, doc_id)
+    changes = versioning.diff_clauses(clauses, previous)
+    by_id = {c["id"]: c for c in clauses}
+    previous_by_id = {c["id"]: c for c in previous}
+    for change in changes:
+        clause = by_id.get(change["clause_id"]) or previous_by_id[change["previous_clause_id"]]
+        change["section_title"] = clause["section_title"] or "Untitled"
+        change["page"] = clause["page"]
+        if change["status"] != versioning.UNCHANGED:
+            change["text"] = by_id[change["clause_id"]]["text"] if change["clause_id"] else None
+            change["previous_text"] = (
+                previous_by_id[change["previous_clause_id"]]["text"] if change["previous_clause_id"] else None
+            )
+    return {
+        "document_id": doc_id,
+        "previous_id": previous_id,
+        "version": doc.get("version") or 1,
+        "summary": versioning.summarize(changes),
+        "changes": changes,
+    }
+
+
+@router.get("/{doc_id}/align/{reference_id}")
+def align_document(doc_id: str, reference_id: str, current_user: dict = Depends(get_current_user)):
+    """
+    Align every clause of a document to a reference document (e.g. our standard
+    template) by embedding similarity: matched pairs with scores, reference
+    clauses missing from the document and clauses the document adds.
+    """
+    conn = get_db()
+    try:
+        for required in (doc_id, reference_id):
+            if not get_document(conn, required):
+                raise HTTPException(status_code=404, detail=f"Document {required} not found")
+        clauses = get_clauses_by_document(conn, doc_id)
+        reference = get_clauses_by_document(conn, reference_id)
+    finally:
+        conn.close()
+    return {"document_id": doc_id, "reference_id": reference_id, **align_clauses(clauses, reference)}
+
+
+@router.post("/{doc_id}/analyze", response_model=list[ClassifiedClause])
+async def analyze_document(
+    doc_id: str,
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Classify clauses and score risk for an uploaded document. Near-duplicates of
+    clauses already analyzed reuse their labels; X-LLM-Calls-Avoided says how
+    many LLM calls that saved.
+    """
+    conn = await get_async_db()
+    try:
+        doc = await arepo.get_document(conn, doc_id)
+        if not doc:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        rows = await arepo.get_clauses_by_document(conn, doc_id)
         if not rows:
             raise HTTPException(status_code=404, detail="No clauses found for this document")
 
         clause_dicts = [dict(r) for r in rows]
 
-        # Classify
-        classifications = classify_clauses(clause_dicts)
-
-        # Score risk
-        risks = score_clauses(clause_dicts)
-
-        # Update DB and build response
-        results = []
-        for row, cls, risk in zip(clause_dicts, classifications, risks):
-            update_clause_classification(
-                conn, row["id"], cls.clause_type, cls.importance, risk.risk_level, risk.risk_reason
-            )
-            results.append(ClassifiedClause(
-                clause_id=row["id"],
-                section_title=row["section_title"] or "Untitled",
-                text=row["text"],
-                page=row["page"],
-                clause_type=cls.clause_type,
-                importance=cls.importance,
-                risk_level=risk.risk_level,
-                risk_reason=risk.risk_reason,
-            ))
-
-        # Store in FAISS
-        add_clauses_to_index([{**r.model_dump(), "document_id": doc_id} for r in results])
-
-        logger.info("Analyzed %d clauses for document %s", len(results), doc_id)
+        usage.set_context(document_id=doc_id)
+        # Only clauses that still need the LLM count toward the quota (not carried,
+        # triaged or near-duplicate ones)
+        split = await asplit_clauses(clause_dicts, doc)
+        texts = [c["text"] for c in split[0]]
+        await enforce_quota(
+            current_user["username"],
+            lambda: classifier.estimate_tokens(texts) + risk_scorer.estimate_tokens(texts),
+        )
+        try:
+            llm_scheduler.admit_bulk()
+        except llm_scheduler.LLMOverloadedError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+
+        # Classify, score risk, store labels and patch them onto the upload-time vectors
+        results = await aanalyze_document(conn, doc, clause_dicts, split)
+        response.headers["X-LLM-Calls-Avoided"] = str(calls_avoided(results))
         return results
     finally:
-        conn.close()
-
+        await conn.close()
@@ -2,9 +2,11 @@
 
 import logging
 from fastapi import APIRouter, Depends
-from app.api.deps import get_current_user
+from app.api.deps import enforce_quota, get_current_user
+from app.services import usage
 from app.models.query import QueryRequest, QueryResponse
-from app.services.qa_chain import ask_question
+from app.services.qa_chain import aask_question, astream_answer, estimate_tokens
+from app.api.sse import format_sse, sse_response
 
 logger = logging.getLogger(__name__)
 
@@ -12,14 +14,16 @@ router = APIRouter()
 
 
 @router.post("/", response_model=QueryResponse)
-def query(
+async def query(
     request: QueryRequest,
     current_user: dict = Depends(get_current_user),
 ):
     """Ask a question about uploaded legal documents using RAG."""
     logger.info("User '%s' asked: %s", current_user["username"], request.question)
+    usage.set_context(document_id=request.doc_id)
+    await enforce_quota(current_user["username"], lambda: estimate_tokens(request.question))
 
-    response = ask_question(
+    response = await aask_question(
         question=request.question,
         top_k=request.top_k,
         doc_id=request.doc_id,
@@ -27,3 +31,28 @@ def query(
 
     logger.info("Answered with confidence: %.2f", response.confidence)
     return response
+
+
+@router.post("/stream")
+async def query_stream(
+    request: QueryRequest,
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Streaming variant of the RAG query (text/event-stream). Emits the retrieved
+    clause references first, then answer tokens, then a closing "done" event
+    with overall_risk and confidence.
+    """
+    logger.info("User '%s' asked (stream): %s", current_user["username"], request.question)
+    usage.set_context(document_id=request.doc_id)
+    await enforce_quota(current_user["username"], lambda: estimate_tokens(request.question))
+
+    async def events():
+        async for event, data in astream_answer(
+            question=request.question,
+            top_k=request.top_k,
+            doc_id=request.doc_id,
+        ):
+            yield format_sse(event, data)
+
+    return sse_response(events())
@@ -0,0 +1,19 @@
+"""Server-sent event helpers for streaming routes."""
+
+import json
+from typing import AsyncIterator
+
+from fastapi.responses import StreamingResponse
+
+# Disable proxy buffering (nginx) so events reach the browser immediately
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Encode one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """Wrap an async iterator of encoded events in a text/event-stream response."""
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,61 @@
+"""LLM token usage reports and quota status."""
+
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.api.deps import get_current_user
+from app.core.config import get_settings
+from app.db.database import get_db
+from app.db.repositories import get_document
+from app.services import usage
+
+router = APIRouter()
+
+
+@router.get("/me")
+async def get_my_usage(
+    days: int = Query(1, ge=1, le=366),
+    current_user: dict = Depends(get_current_user),
+):
+    """The current user's quota status and token usage by prompt type."""
+    username = current_user["username"]
+    quota = usage.quota_for(username)
+    used = await asyncio.to_thread(usage.used_today, username)
+    return {
+        "username": username,
+        "quota": quota or None,
+        "used_today": used,
+        "remaining": max(quota - used, 0) if quota else None,
+        "resets_in_seconds": usage.seconds_until_reset(),
+        "days": days,
+        "by_prompt_type": await asyncio.to_thread(usage.report, days, ["prompt_type"], username),
+        "by_day": await asyncio.to_thread(usage.report, days, ["day"], username),
+    }
+
+
+def _load_document(doc_id: str) -> dict | None:
+    conn = get_db()
+    try:
+        return get_document(conn, doc_id)
+    finally:
+        conn.close()
+
+
+@router.get("/documents/{doc_id}")
+async def get_document_usage(
+    doc_id: str,
+    days: int = Query(30, ge=1, le=366),
+    current_user: dict = Depends(get_current_user),
+):
+    """Tokens spent on one document, by prompt type and by user (document owner or admins only)."""
+    doc = await asyncio.to_thread(_load_document, doc_id)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    username = current_user["username"]
+    if doc["uploaded_by"] != username and username not in get_settings().admin_usernames:
+        raise HTTPException(status_code=403, detail="Not your document")
+    return {
+        "document_id": doc_id,
+        "days": days,
+        "by_prompt_type": await asyncio.to_thread(usage.report, days, ["prompt_type"], None, doc_id),
+        "by_user": await asyncio.to_thread(usage.report, days, ["user"], None, doc_id),
+    }
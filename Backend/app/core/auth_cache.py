@@ -0,0 +1,102 @@
+"""In-process TTL/LRU cache for authenticated principals.
+
+Two small maps sit in front of get_current_user:
+- token hash -> (username, token expiry), so a known token skips JWT decoding
+- username -> principal (id, username, created_at), so a known user skips SQLite
+
+Principals expire after a short TTL and are dropped immediately when the user is
+deleted; token entries never outlive the token's own "exp" claim.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import xxhash
+
+from app.core import metrics
+from app.core.config import get_settings
+
+_lock = threading.Lock()
+_tokens: OrderedDict[str, tuple[str, float]] = OrderedDict()
+_principals: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _key(token: str) -> str:
+    # The whole token: header and payload are only trusted because they were decoded once
+    return xxhash.xxh64_hexdigest(token.encode("utf-8"))
+
+
+def _evict(cache: OrderedDict, max_size: int) -> None:
+    while len(cache) > max_size:
+        cache.popitem(last=False)
+
+
+def get_token_subject(token: str) -> Optional[str]:
+    """Return the username for an already-verified, unexpired token."""
+    key = _key(token)
+    with _lock:
+        entry = _tokens.get(key)
+        if entry is None:
+            return None
+        username, expires_at = entry
+        if expires_at <= time.time():
+            del _tokens[key]
+            return None
+        _tokens.move_to_end(key)
+        return username
+
+
+def remember_token(token: str, username: str, expires_at: Optional[float]) -> None:
+    """Record a verified token. Tokens without an expiry are not cached."""
+    settings = get_settings()
+    if settings.auth_cache_ttl_seconds <= 0 or expires_at is None:
+        return
+    with _lock:
+        _tokens[_key(token)] = (username, float(expires_at))
+        _evict(_tokens, settings.auth_cache_size)
+
+
+def get_principal(username: str) -> Optional[dict]:
+    """Return the cached principal for a username, if still fresh."""
+    with _lock:
+        entry = _principals.get(username)
+        if entry is not None and entry[1] > time.monotonic():
+            _principals.move_to_end(username)
+            _stats["hits"] += 1
+            return entry[0]
+        if entry is not None:
+            del _principals[username]
+        _stats["misses"] += 1
+        return None
+
+
+def remember_principal(username: str, principal: dict) -> None:
+    settings = get_settings()
+    if settings.auth_cache_ttl_seconds <= 0:
+        return
+    with _lock:
+        _principals[username] = (principal, time.monotonic() + settings.auth_cache_ttl_seconds)
+        _evict(_principals, settings.auth_cache_size)
+
+
+def invalidate_user(username: str) -> None:
+    """Forget a user and every token issued to them (call on user deletion)."""
+    with _lock:
+        _principals.pop(username, None)
+        for key in [k for k, (u, _) in _tokens.items() if u == username]:
+            del _tokens[key]
+
+
+def get_stats() -> dict:
+    """Return principal cache hit/miss counters for this process."""
+    with _lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+        size = len(_principals)
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0, "size": size}
+
+
+metrics.register_cache("auth_principal", get_stats)
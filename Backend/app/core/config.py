@@ -5,6 +5,7 @@ All settings are driven by environment variables (loaded from .env file).
 
 from functools import lru_cache
 from pathlib import Path
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -18,22 +19,114 @@ class Settings(BaseSettings):
     # LLM (Groq)
     groq_api_key: str
     llm_model: str = "llama-3.3-70b-versatile"
+    # Point at an OpenAI/Groq-compatible stand-in (e.g. benchmarks/llm_server.py)
+    llm_base_url: Optional[str] = None
 
     # Embeddings (local HuggingFace)
     embedding_model: str = "all_MiniLM-L6-v2"
+    embedding_cache_path: str = "data/embedding_cache.db"
+    query_embedding_cache_size: int = 1024
+    embedding_batch_enabled: bool = True
+    embedding_batch_max_size: int = 64
+    embedding_batch_window_ms: float = 5.0
+    embedding_torch_threads: int = 0  # 0 = torch default
+
+    # Retrieval
+    retrieval_cache_size: int = 512
+    context_token_budget: int = 2500
+    hybrid_retrieval_enabled: bool = True
+    rrf_k: int = 60
+
+    # Chat history budgeting
+    chat_history_window: int = 20        # messages fetched per turn
+    chat_history_max_messages: int = 10  # newest messages kept verbatim
+    chat_history_token_budget: int = 1500
+    chat_history_fold_batch: int = 6     # overflowed messages that trigger a summary fold
+    chat_summary_max_tokens: int = 300
+
+    # Semantic answer cache
+    answer_cache_enabled: bool = True
+    answer_cache_similarity_threshold: float = 0.95
+    answer_cache_size: int = 512
 
     # JWT Auth
     jwt_secret_key: str
     jwt_algorithm: str = "HS256"
     jwt_expire_minutes: int = 60
+    auth_cache_ttl_seconds: int = 60  # 0 disables the principal cache
+    auth_cache_size: int = 4096
+    admin_usernames: list[str] = []  # JSON list, e.g. ADMIN_USERNAMES='["alice"]'
 
     # Storage Paths
     database_path: str = "data/legal_analyzer.db"
     faiss_index_path: str = "data/faiss_index"
     upload_dir: str = "uploads"
 
-    # Logging
+    # LLM dispatch scheduler: interactive (chat) calls ahead of bulk analysis
+    llm_scheduler_enabled: bool = True
+    llm_max_concurrency: int = 8
+    llm_interactive_reserved_slots: int = 2  # never used by bulk work
+    llm_bulk_degraded_slots: int = 1         # bulk slots while the chat SLO is at risk (min 1)
+    llm_interactive_slo_seconds: float = 8.0  # p90 of queue wait + call
+    llm_bulk_shed_queue_depth: int = 4       # queued bulk calls before new bulk jobs get 503
+    llm_user_weights: dict[str, float] = {}  # fair-share weights, default 1.0
+
+    # LLM usage ledger: daily per-user token quotas (prompt + completion), 0 = unlimited
+    usage_daily_token_quota: int = 0
+    usage_user_quotas: dict[str, int] = {}  # JSON overrides, e.g. USAGE_USER_QUOTAS='{"bulk": 2000000}'
+    usage_flush_interval_seconds: float = 2.0
+    usage_reservation_seconds: float = 300.0  # unused part of an admitted estimate is released after this
+
+    # Risk keywords: weighted lexicon compiled into one pattern; a keyword verdict at or
+    # above the confidence threshold skips the LLM risk call (above 1.0 always asks the LLM)
+    risk_keywords: dict[str, float] = {}  # JSON, e.g. {"force majeure": 1.0, "exclusive": 0}
+    risk_high_score: float = 3.0
+    risk_medium_score: float = 1.0
+    risk_llm_confidence_threshold: float = 0.75
+
+    # Local clause-type classifier: nearest centroid over LLM-labeled clause vectors;
+    # predictions with a low margin over the runner-up type still go to the LLM
+    local_classifier_enabled: bool = True
+    local_classifier_min_margin: float = 0.05  # cosine similarity gap between the two nearest types
+    local_classifier_min_examples: int = 5  # LLM-labeled examples a type needs before it is predicted
+    local_classifier_max_training: int = 20000  # clauses loaded from the database at startup
+    local_classifier_shadow_rate: float = 0.05  # confident predictions still checked against the LLM
+
+    # Triage: non-substantive segments (TOC, signature blocks, page numbers, bare headings)
+    # are labeled General/Low without the LLM
+    triage_enabled: bool = True
+    triage_min_words: int = 6
+    triage_min_alpha_ratio: float = 0.5  # letters / non-space characters
+    triage_signature_max_words: int = 120
+    triage_exclude_from_index: bool = False  # also skip embedding them
+
+    # Near-duplicate clauses reuse the labels of an already analyzed clause
+    dedup_enabled: bool = True
+    dedup_similarity_threshold: float = 0.8  # estimated Jaccard over word 3-shingles
+
+    # Document versions: clauses at least this similar (difflib ratio) count as modified, not added/removed
+    version_fuzzy_threshold: float = 0.6
+
+    # Clause alignment against a reference document
+    align_match_threshold: float = 0.75  # cosine similarity for a clause pair to count as matched
+    align_optimal_max_clauses: int = 2000  # larger documents use greedy instead of optimal assignment
+
+    # Bulk ingestion
+    ingest_workers: int = 0  # extraction/segmentation processes, 0 = CPU count
+    ingest_write_batch_size: int = 50  # documents per SQLite transaction and embedding pass
+    ingest_max_files: int = 2000  # per request
+    ingest_max_file_bytes: int = 50_000_000
+    ingest_max_request_bytes: int = 2_000_000_000  # total PDF bytes per request (declared sizes for zips)
+
+    # Logging & metrics
     log_level: str = "INFO"
+    metrics_enabled: bool = True  # GET /metrics in Prometheus text format
+
+    # Request tracing: admins opt in per request with X-Trace: 1, the sampler
+    # traces this share of all requests and keeps the slowest
+    trace_sample_rate: float = 0.0
+    trace_keep_slowest: int = 20
+    trace_keep_requested: int = 50
 
     @property
     def database_dir(self) -> Path:
@@ -0,0 +1,315 @@
+"""Zero-dependency Prometheus metrics.
+
+Counters, gauges and histograms are kept in-process and rendered in the
+Prometheus text exposition format by GET /metrics. Values that other modules
+already track (cache hit counters, index size) are read at scrape time through
+registered callbacks, so they add nothing to the hot path.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: dict[str, "_Metric"] = {}
+_callbacks: dict[str, tuple[str, Callable[[], float]]] = {}
+_caches: dict[str, Callable[[], dict]] = {}
+_registry_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...]):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts..., +Inf count, sum]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def _register(metric: _Metric) -> _Metric:
+    with _registry_lock:
+        existing = _registry.get(metric.name)
+        if existing is not None:
+            return existing
+        _registry[metric.name] = metric
+        return metric
+
+
+def counter(name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+    return _register(Counter(name, help_text, labelnames))
+
+
+def gauge(name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+    return _register(Gauge(name, help_text, labelnames))
+
+
+def histogram(
+    name: str, help_text: str, labelnames: tuple[str, ...] = (), buckets: tuple = DEFAULT_BUCKETS
+) -> Histogram:
+    return _register(Histogram(name, help_text, labelnames, buckets))
+
+
+def register_gauge_callback(name: str, help_text: str, fn: Callable[[], float]) -> None:
+    """Expose a gauge whose value is computed by fn at scrape time."""
+    with _registry_lock:
+        _callbacks[name] = (help_text, fn)
+
+
+def register_cache(cache: str, stats_fn: Callable[[], dict]) -> None:
+    """
+    Expose a cache's get_stats() dict ("hits", "misses" and optionally "size")
+    as cache_hits_total / cache_misses_total / cache_entries with a cache label.
+    """
+    with _registry_lock:
+        _caches[cache] = stats_fn
+
+
+def _render_caches(caches: dict[str, Callable[[], dict]]) -> list[str]:
+    stats = {}
+    for cache, fn in caches.items():
+        try:
+            stats[cache] = fn()
+        except Exception:
+            continue
+    lines = []
+    for family, key, kind, help_text in (
+        ("cache_hits_total", "hits", "counter", "Cache hits by cache"),
+        ("cache_misses_total", "misses", "counter", "Cache misses by cache"),
+        ("cache_entries", "size", "gauge", "Entries currently held by cache"),
+    ):
+        samples = [(cache, s[key]) for cache, s in stats.items() if key in s]
+        if not samples:
+            continue
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {kind}")
+        lines.extend(f'{family}{{cache="{_escape(c)}"}} {_format_value(v)}' for c, v in samples)
+    return lines
+
+
+def render() -> str:
+    """Render every registered metric in the Prometheus text format."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+        callbacks = dict(_callbacks)
+        caches = dict(_caches)
+
+    lines: list[str] = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    for name, (help_text, fn) in callbacks.items():
+        try:
+            value = fn()
+        except Exception:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {_format_value(value)}")
+    lines.extend(_render_caches(caches))
+    return "\n".join(lines) + "\n"
+
+
+def route_template(scope) -> str:
+    """
+    Matched route template with its router prefix, e.g. /documents/{doc_id}/analyze.
+    Newer FastAPI versions hand back the router-local route, so the prefix is
+    recovered from the leading segments of the concrete path.
+    """
+    route_path = getattr(scope.get("route"), "path", None)
+    if not route_path:
+        return "unmatched"
+    segments = scope["path"].split("/")
+    prefix_len = len(segments) - len(route_path.split("/")) + 1
+    return "/".join(segments[:max(prefix_len, 1)]) + route_path
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request count and time to response start per
+    route template (the matched path, e.g. /documents/{doc_id}/analyze).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        recorded = False
+
+        def record(status: int) -> None:
+            template = route_template(scope)
+            HTTP_LATENCY.observe(time.perf_counter() - started, method=scope["method"], route=template)
+            HTTP_REQUESTS.inc(method=scope["method"], route=template, status=str(status))
+
+        async def send_wrapper(message):
+            nonlocal recorded
+            if message["type"] == "http.response.start" and not recorded:
+                recorded = True
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if not recorded:
+                recorded = True
+                record(500)
+            raise
+
+
+# Metrics shared across modules
+
+HTTP_REQUESTS = counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status"),
+)
+HTTP_LATENCY = histogram(
+    "http_request_duration_seconds", "Time to response start by route template", ("method", "route"),
+)
+LLM_LATENCY = histogram(
+    "llm_request_duration_seconds", "LLM call latency by prompt type", ("prompt_type",),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0),
+)
+LLM_TOKENS = counter(
+    "llm_tokens_total", "LLM tokens by prompt type and direction", ("prompt_type", "direction"),
+)
+LLM_ERRORS = counter(
+    "llm_errors_total", "Failed LLM calls by prompt type and exception class", ("prompt_type", "error"),
+)
+LLM_CALLS_AVOIDED = counter(
+    "llm_calls_avoided_total", "LLM calls skipped because clause labels were reused", ("reason",),
+)
+EMBEDDING_BATCH_SIZE = histogram(
+    "embedding_batch_size", "Unique texts per embedding batch", (),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+EMBEDDING_BATCH_SECONDS = histogram(
+    "embedding_batch_duration_seconds", "Model time per embedding batch",
+)
+FAISS_SEARCH_SECONDS = histogram(
+    "faiss_search_duration_seconds", "FAISS similarity search latency (cache misses only)",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+SQLITE_SECONDS = histogram(
+    "sqlite_statement_duration_seconds", "SQLite statement execution time by statement kind", ("statement",),
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5),
+)
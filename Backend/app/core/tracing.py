@@ -0,0 +1,324 @@
+"""Per-request trace spans for admin profiling.
+
+A request is traced when an admin sends `X-Trace: 1` (the response carries
+X-Trace-Id) or when it is picked by the random sampler (TRACE_SAMPLE_RATE),
+which keeps only the slowest TRACE_KEEP_SLOWEST traces. Services mark stages
+with `span("retrieval")` or `@traced("embed")`; the current span lives in a
+contextvar, so nesting follows the call chain across awaits and
+asyncio.to_thread. When a request is not traced, a span is one contextvar
+lookup.
+
+Traces render as a JSON span tree or as folded stacks
+("POST /chat/send;retrieval;faiss 1830", microseconds of self time), the
+input format of flamegraph.pl and speedscope.
+"""
+
+import functools
+import heapq
+import inspect
+import itertools
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.core import auth_cache, metrics
+from app.core.config import get_settings
+from app.core.security import decode_access_token
+
+TRACE_HEADER = b"x-trace"
+MAX_SPANS = 2000  # per trace; long analyze runs stop recording past this
+
+_current: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+_lock = threading.Lock()
+_slowest: list[tuple[float, int, "Trace"]] = []  # min-heap on duration
+_requested: deque = deque()
+_seq = itertools.count()
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "end", "children", "trace", "_token")
+
+    def __init__(self, name: str, trace: "Trace", attrs: Optional[dict] = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: list[Span] = []
+        self.trace = trace
+        self._token = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def to_dict(self, origin: float) -> dict:
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            **({"attrs": self.attrs} if self.attrs else {}),
+            **({"children": [c.to_dict(origin) for c in self.children]} if self.children else {}),
+        }
+
+
+class Trace:
+    def __init__(self, reason: str, method: str, path: str):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.reason = reason
+        self.method = method
+        self.path = path
+        self.username: Optional[str] = None
+        self.status: Optional[int] = None
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.span_count = 1
+        self.dropped_spans = 0
+        self.root = Span(f"{method} {path}", self)
+
+    @property
+    def duration(self) -> float:
+        return self.root.duration
+
+    def summary(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "reason": self.reason,
+            "method": self.method,
+            "route": self.root.name.split(" ", 1)[1],
+            "path": self.path,
+            "status": self.status,
+            "username": self.username,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "spans": self.span_count,
+            "dropped_spans": self.dropped_spans,
+        }
+
+    def to_dict(self) -> dict:
+        return {**self.summary(), "root": self.root.to_dict(self.root.start)}
+
+    def folded(self) -> dict[str, int]:
+        """Folded stacks: "a;b;c" -> microseconds of self time spent in c."""
+        stacks: dict[str, int] = {}
+
+        def walk(span: Span, prefix: str) -> None:
+            stack = f"{prefix};{span.name}" if prefix else span.name
+            # Children running concurrently can overlap, so self time is clamped
+            self_time = max(span.duration - sum(c.duration for c in span.children), 0.0)
+            stacks[stack] = stacks.get(stack, 0) + int(self_time * 1_000_000)
+            for child in span.children:
+                walk(child, stack)
+
+        walk(self.root, "")
+        return stacks
+
+
+class _NoopSpan:
+    """Returned by span() when the request is not traced."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _ActiveSpan:
+    __slots__ = ("span",)
+
+    def __init__(self, span: Span):
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self.span._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self.span
+        span.end = time.perf_counter()
+        if exc_type is not None:
+            span.attrs["error"] = exc_type.__name__
+        try:
+            _current.reset(span._token)
+        except ValueError:
+            # Exited from another context (e.g. a generator finished by a different task)
+            _current.set(None)
+        return False
+
+
+def span(name: str, **attrs):
+    """Context manager recording a child of the current span (no-op when untraced)."""
+    parent = _current.get()
+    if parent is None:
+        return _NOOP
+    trace = parent.trace
+    if trace.span_count >= MAX_SPANS:
+        trace.dropped_spans += 1
+        return _NOOP
+    trace.span_count += 1
+    child = Span(name, trace, attrs)
+    parent.children.append(child)
+    return _ActiveSpan(child)
+
+
+def traced(name: str):
+    """Decorator wrapping a sync or async function in span(name)."""
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if _current.get() is None:
+                    return await fn(*args, **kwargs)
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def is_active() -> bool:
+    return _current.get() is not None
+
+
+def set_user(username: str) -> None:
+    """Attribute the current trace to a user (called after authentication)."""
+    current = _current.get()
+    if current is not None:
+        current.trace.username = username
+
+
+# Trace store
+
+def _store(trace: Trace) -> None:
+    settings = get_settings()
+    with _lock:
+        if trace.reason == "requested":
+            _requested.append(trace)
+            while len(_requested) > settings.trace_keep_requested:
+                _requested.popleft()
+            return
+        entry = (trace.duration, next(_seq), trace)
+        if len(_slowest) < settings.trace_keep_slowest:
+            heapq.heappush(_slowest, entry)
+        elif entry[0] > _slowest[0][0]:
+            heapq.heapreplace(_slowest, entry)
+
+
+def list_traces() -> list[dict]:
+    """Summaries of all kept traces, slowest first."""
+    with _lock:
+        traces = [t for _, _, t in _slowest] + list(_requested)
+    return [t.summary() for t in sorted(traces, key=lambda t: t.duration, reverse=True)]
+
+
+def get_trace(trace_id: str) -> Optional[Trace]:
+    with _lock:
+        for trace in itertools.chain((t for _, _, t in _slowest), _requested):
+            if trace.trace_id == trace_id:
+                return trace
+    return None
+
+
+def folded_stacks(traces: Optional[list[Trace]] = None) -> str:
+    """Folded-stack text for the given traces (all kept traces by default)."""
+    if traces is None:
+        with _lock:
+            traces = [t for _, _, t in _slowest] + list(_requested)
+    merged: dict[str, int] = {}
+    for trace in traces:
+        for stack, micros in trace.folded().items():
+            merged[stack] = merged.get(stack, 0) + micros
+    return "".join(f"{stack} {micros}\n" for stack, micros in sorted(merged.items()) if micros > 0)
+
+
+def clear() -> int:
+    with _lock:
+        count = len(_slowest) + len(_requested)
+        _slowest.clear()
+        _requested.clear()
+    return count
+
+
+# Middleware
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value
+    return None
+
+
+def _is_admin_request(scope) -> bool:
+    """True when the bearer token belongs to a configured admin."""
+    authorization = _header(scope, b"authorization")
+    if not authorization or not authorization.lower().startswith(b"bearer "):
+        return False
+    token = authorization[7:].decode("latin-1").strip()
+    username = auth_cache.get_token_subject(token)
+    if username is None:
+        payload = decode_access_token(token)
+        username = payload.get("sub") if payload else None
+    return username is not None and username in get_settings().admin_usernames
+
+
+class TracingMiddleware:
+    """
+    Starts a trace for admin requests carrying X-Trace and for sampled requests;
+    every other request passes straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        settings = get_settings()
+        reason = None
+        flag = _header(scope, TRACE_HEADER)
+        if flag and flag not in (b"0", b"false") and _is_admin_request(scope):
+            reason = "requested"
+        elif settings.trace_sample_rate > 0 and random.random() < settings.trace_sample_rate:
+            reason = "sampled"
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(reason, scope["method"], scope["path"])
+        token = _current.set(trace.root)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+                if reason == "requested":
+                    message["headers"] = [*message.get("headers", []), (b"x-trace-id", trace.trace_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            trace.root.end = time.perf_counter()
+            trace.root.name = f"{scope['method']} {metrics.route_template(scope)}"
+            _store(trace)
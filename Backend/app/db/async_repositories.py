@@ -0,0 +1,151 @@
+"""Async (aiosqlite) counterparts of the repository functions used on hot async routes.
+
+Function names and return shapes mirror app.db.repositories so routes can switch
+between the two by import alone.
+"""
+
+import json
+import logging
+from typing import AsyncIterator, Optional
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+# Document Repository
+
+async def get_document(conn: aiosqlite.Connection, doc_id: str) -> Optional[dict]:
+    """Fetch a document by ID."""
+    cursor = await conn.execute(
+        "SELECT id, filename, uploaded_by, page_count, parent_id, version, created_at FROM documents WHERE id = ?",
+        (doc_id,),
+    )
+    row = await cursor.fetchone()
+    return dict(row) if row else None
+
+# Clause Repository
+
+async def get_clauses_by_document(conn: aiosqlite.Connection, document_id: str) -> list[dict]:
+    """Fetch all clauses for a given document."""
+    cursor = await conn.execute(
+        "SELECT * FROM clauses WHERE document_id = ? ORDER BY page, id",
+        (document_id,),
+    )
+    return [dict(row) for row in await cursor.fetchall()]
+
+async def iter_clauses_by_document(
+    conn: aiosqlite.Connection, document_id: str, batch_size: int = 256
+) -> AsyncIterator[dict]:
+    """Stream a document's clauses from the cursor, fetching batch_size rows at a time."""
+    async with conn.execute(
+        "SELECT * FROM clauses WHERE document_id = ? ORDER BY page, id",
+        (document_id,),
+    ) as cursor:
+        cursor.iter_chunk_size = batch_size
+        async for row in cursor:
+            yield dict(row)
+
+async def get_risk_distribution(conn: aiosqlite.Connection, document_id: str) -> dict:
+    """Clause counts per risk level (High/Medium/Low) plus the total."""
+    cursor = await conn.execute(
+        "SELECT risk_level, count(*) AS n FROM clauses WHERE document_id = ? GROUP BY risk_level",
+        (document_id,),
+    )
+    counts = {row["risk_level"]: row["n"] for row in await cursor.fetchall()}
+    return {
+        "total_clauses": sum(counts.values()),
+        "risk_distribution": {level: counts.get(level, 0) for level in ("High", "Medium", "Low")},
+    }
+
+async def is_document_analyzed(conn: aiosqlite.Connection, doc_id: str) -> bool:
+    """
+    Check if a document has been analyzed: it has clauses and none is still
+    unlabeled (a new version's carried-over labels alone do not count).
+    """
+    cursor = await conn.execute(
+        """SELECT EXISTS (SELECT 1 FROM clauses WHERE document_id = ?)
+              AND NOT EXISTS (SELECT 1 FROM clauses WHERE document_id = ? AND clause_type IS NULL)""",
+        (doc_id, doc_id),
+    )
+    return bool((await cursor.fetchone())[0])
+
+async def update_clause_classifications(conn: aiosqlite.Connection, updates: list[tuple]) -> None:
+    """
+    Bulk-update clauses with classification and risk results in one transaction.
+    Each tuple is (clause_id, clause_type, importance, risk_level, risk_reason,
+    label_source, duplicate_of, duplicate_similarity, type_source).
+    """
+    await conn.executemany(
+        """UPDATE clauses
+           SET clause_type = ?, importance = ?, risk_level = ?, risk_reason = ?,
+               label_source = ?, duplicate_of = ?, duplicate_similarity = ?, type_source = ?
+           WHERE id = ?""",
+        [(*labels, cid) for cid, *labels in updates],
+    )
+    await conn.commit()
+
+# Chat Repository
+
+async def create_chat_session(
+    conn: aiosqlite.Connection, session_id: str, username: str, title: str, doc_id: str = None
+) -> dict:
+    await conn.execute(
+        "INSERT INTO chat_sessions (id, username, doc_id, title) VALUES (?, ?, ?, ?)",
+        (session_id, username, doc_id, title),
+    )
+    await conn.commit()
+    return {"id": session_id, "username": username, "doc_id": doc_id, "title": title}
+
+async def add_chat_message(
+    conn: aiosqlite.Connection, session_id: str, role: str, content: str, meta: dict = None
+) -> int:
+    cursor = await conn.execute(
+        "INSERT INTO chat_messages (session_id, role, content, meta) VALUES (?, ?, ?, ?)",
+        (session_id, role, content, json.dumps(meta) if meta else None),
+    )
+    await conn.commit()
+    return cursor.lastrowid
+
+async def get_chat_messages(conn: aiosqlite.Connection, session_id: str) -> list[dict]:
+    cursor = await conn.execute(
+        "SELECT * FROM chat_messages WHERE session_id = ? ORDER BY created_at ASC",
+        (session_id,),
+    )
+    rows = [dict(row) for row in await cursor.fetchall()]
+    for r in rows:
+        if r.get("meta"):
+            r["meta"] = json.loads(r["meta"])
+    return rows
+
+async def get_recent_chat_messages(
+    conn: aiosqlite.Connection, session_id: str, limit: int, before_id: Optional[int] = None
+) -> list[dict]:
+    """Last `limit` messages of a session (oldest first), without decoding meta."""
+    cursor = await conn.execute(
+        """SELECT id, role, content FROM chat_messages
+           WHERE session_id = ? AND id < ?
+           ORDER BY id DESC LIMIT ?""",
+        (session_id, before_id if before_id is not None else 2**63 - 1, limit),
+    )
+    return [dict(row) for row in reversed(await cursor.fetchall())]
+
+async def get_chat_summary(conn: aiosqlite.Connection, session_id: str) -> Optional[dict]:
+    cursor = await conn.execute(
+        "SELECT summary, last_message_id FROM chat_summaries WHERE session_id = ?",
+        (session_id,),
+    )
+    row = await cursor.fetchone()
+    return dict(row) if row else None
+
+async def upsert_chat_summary(
+    conn: aiosqlite.Connection, session_id: str, summary: str, last_message_id: int
+) -> None:
+    await conn.execute(
+        """INSERT INTO chat_summaries (session_id, summary, last_message_id) VALUES (?, ?, ?)
+           ON CONFLICT(session_id) DO UPDATE SET
+               summary = excluded.summary,
+               last_message_id = excluded.last_message_id,
+               updated_at = datetime('now', 'localtime')""",
+        (session_id, summary, last_message_id),
+    )
+    await conn.commit()
@@ -2,7 +2,10 @@
 
 import sqlite3
 import logging
+import time
 from pathlib import Path
+import aiosqlite
+from app.core import metrics, tracing
 from app.core.config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -36,6 +39,17 @@ CREATE TABLE IF NOT EXISTS clauses (
     risk_reason TEXT
 );
 
+CREATE INDEX IF NOT EXISTS idx_clauses_document_page ON clauses(document_id, page, id);
+
+-- Full-text index over clauses, maintained by the clause repository functions
+CREATE VIRTUAL TABLE IF NOT EXISTS clauses_fts USING fts5(
+    clause_id UNINDEXED,
+    document_id UNINDEXED,
+    section_title,
+    text,
+    tokenize = 'porter unicode61'
+);
+
 CREATE TABLE IF NOT EXISTS chat_sessions (
     id TEXT PRIMARY KEY,
     username TEXT NOT NULL,
@@ -44,6 +58,13 @@ CREATE TABLE IF NOT EXISTS chat_sessions (
     created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
 );
 
+CREATE TABLE IF NOT EXISTS chat_summaries (
+    session_id TEXT PRIMARY KEY REFERENCES chat_sessions(id),
+    summary TEXT NOT NULL,
+    last_message_id INTEGER NOT NULL,
+    updated_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
 CREATE TABLE IF NOT EXISTS chat_messages (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     session_id TEXT NOT NULL REFERENCES chat_sessions(id),
@@ -52,11 +73,79 @@ CREATE TABLE IF NOT EXISTS chat_messages (
     meta TEXT,
     created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
 );
+
+-- One row per LLM call, attributed to whoever triggered it
+CREATE TABLE IF NOT EXISTS llm_usage (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT,
+    document_id TEXT,
+    session_id TEXT,
+    prompt_type TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_usage_user_created ON llm_usage(username, created_at);
+CREATE INDEX IF NOT EXISTS idx_llm_usage_document ON llm_usage(document_id);
+
+-- MinHash signatures of LLM-labeled clauses and their LSH band keys (near-duplicate lookup)
+CREATE TABLE IF NOT EXISTS clause_signatures (
+    clause_id TEXT PRIMARY KEY,
+    document_id TEXT NOT NULL,
+    signature BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS clause_signature_bands (
+    band_key INTEGER NOT NULL,
+    clause_id TEXT NOT NULL,
+    document_id TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_clause_signature_bands_key ON clause_signature_bands(band_key);
+CREATE INDEX IF NOT EXISTS idx_clause_signature_bands_document ON clause_signature_bands(document_id);
 """
 
+# Columns added after the first release; init_db adds them to older databases
+_ADDED_COLUMNS = {
+    "documents": (
+        ("parent_id", "TEXT"),  # previous version of the same contract
+        ("version", "INTEGER NOT NULL DEFAULT 1"),
+    ),
+    "clauses": (
+        ("label_source", "TEXT"),         # 'llm', 'duplicate', 'previous_version' or 'triage'
+        ("duplicate_of", "TEXT"),         # clause whose labels were reused
+        ("duplicate_similarity", "REAL"),  # estimated Jaccard similarity to it
+        ("provisional_risk", "TEXT"),     # keyword-only risk level set at upload
+        ("type_source", "TEXT"),          # 'llm', 'local' (embedding classifier) or 'fallback'
+    ),
+}
+
 def get_db_path() -> str:
     return get_settings().database_path
 
+def _backfill_fts(conn: sqlite3.Connection) -> None:
+    """Populate the clause full-text index for databases created before it existed."""
+    indexed = conn.execute("SELECT count(*) FROM clauses_fts").fetchone()[0]
+    if indexed:
+        return
+    conn.execute(
+        "INSERT INTO clauses_fts (clause_id, document_id, section_title, text) "
+        "SELECT id, document_id, section_title, text FROM clauses"
+    )
+    backfilled = conn.execute("SELECT count(*) FROM clauses_fts").fetchone()[0]
+    if backfilled:
+        logger.info("Backfilled full-text index with %d clauses", backfilled)
+
+def _add_missing_columns(conn: sqlite3.Connection) -> None:
+    """ALTER TABLE ADD COLUMN for any _ADDED_COLUMNS an existing database lacks."""
+    for table, columns in _ADDED_COLUMNS.items():
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name, decl in columns:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+                logger.info("Added column %s.%s", table, name)
+
 def init_db() -> None:
     db_path = get_db_path()
     Path(db_path).parent.mkdir(parents=True, exist_ok=True)
@@ -65,6 +154,8 @@ def init_db() -> None:
      
     try:
         conn.executescript(_CREATE_TABLES_SQL)
+        _add_missing_columns(conn)
+        _backfill_fts(conn)
         conn.commit()
         logger.info("Database initialized at %s", db_path)
     except Exception as e:
@@ -72,7 +163,40 @@ def init_db() -> None:
     finally:
         conn.close()
 
+def _statement_kind(sql: str) -> str:
+    kind = sql.lstrip()[:6].lower()
+    return kind if kind in ("select", "insert", "update", "delete") else "other"
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection that records statement execution time in metrics and traces."""
+
+    def execute(self, sql, parameters=(), /):
+        kind = _statement_kind(sql)
+        started = time.perf_counter()
+        try:
+            with tracing.span(f"sqlite.{kind}"):
+                return super().execute(sql, parameters)
+        finally:
+            metrics.SQLITE_SECONDS.observe(time.perf_counter() - started, statement=kind)
+
+    def executemany(self, sql, parameters, /):
+        kind = _statement_kind(sql)
+        started = time.perf_counter()
+        try:
+            with tracing.span(f"sqlite.{kind}"):
+                return super().executemany(sql, parameters)
+        finally:
+            metrics.SQLITE_SECONDS.observe(time.perf_counter() - started, statement=kind)
+
+
 def get_db() -> sqlite3.Connection:
-    conn = sqlite3.connect(get_db_path())
+    conn = sqlite3.connect(get_db_path(), factory=TimedConnection)
     conn.row_factory = sqlite3.Row
-    return conn
\ No newline at end of file
+    return conn
+
+async def get_async_db() -> aiosqlite.Connection:
+    """Open an aiosqlite connection for async routes. Caller must close it."""
+    conn = await aiosqlite.connect(get_db_path(), factory=TimedConnection)
+    conn.row_factory = aiosqlite.Row
+    return conn
@@ -28,6 +28,32 @@ def get_user_by_username(conn: sqlite3.Connection, username: str) -> Optional[di
     return dict(row) if row else None
 
 
+def get_user_principal(conn: sqlite3.Connection, username: str) -> Optional[dict]:
+    """Fetch the public fields of a user (no password hash). Returns None if not found."""
+    cursor = conn.execute(
+        "SELECT id, username, created_at FROM users WHERE username = ?",
+        (username,),
+    )
+    row = cursor.fetchone()
+    return dict(row) if row else None
+
+
+def delete_user(conn: sqlite3.Connection, username: str) -> None:
+    """Delete a user along with their chat sessions and messages."""
+    conn.execute(
+        "DELETE FROM chat_messages WHERE session_id IN (SELECT id FROM chat_sessions WHERE username = ?)",
+        (username,),
+    )
+    conn.execute(
+        "DELETE FROM chat_summaries WHERE session_id IN (SELECT id FROM chat_sessions WHERE username = ?)",
+        (username,),
+    )
+    conn.execute("DELETE FROM chat_sessions WHERE username = ?", (username,))
+    conn.execute("DELETE FROM users WHERE username = ?", (username,))
+    conn.commit()
+    logger.info("Deleted user %s", username)
+
+
 def user_exists(conn: sqlite3.Connection, username: str) -> bool:
     """Check if a username is already taken."""
     cursor = conn.execute(
@@ -43,18 +69,47 @@ def create_document(
     filename: str,
     uploaded_by: str,
     page_count: int,
+    parent_id: Optional[str] = None,
+    version: int = 1,
 ) -> dict:
-    """Insert a new document record."""
+    """Insert a new document record (optionally a new version of parent_id)."""
     conn.execute(
-        "INSERT INTO documents (id, filename, uploaded_by, page_count) VALUES (?, ?, ?, ?)",
-        (doc_id, filename, uploaded_by, page_count),
+        "INSERT INTO documents (id, filename, uploaded_by, page_count, parent_id, version) VALUES (?, ?, ?, ?, ?, ?)",
+        (doc_id, filename, uploaded_by, page_count, parent_id, version),
     )
     conn.commit()
     return get_document(conn, doc_id)
+def create_documents_with_clauses(conn: sqlite3.Connection, documents: list[dict]) -> None:
+    """
+    Insert several documents and their clauses (and full-text rows) in one transaction.
+    Each dict has: doc_id, filename, uploaded_by, page_count, clauses.
+    """
+    conn.executemany(
+        "INSERT INTO documents (id, filename, uploaded_by, page_count) VALUES (?, ?, ?, ?)",
+        [(d["doc_id"], d["filename"], d["uploaded_by"], d["page_count"]) for d in documents],
+    )
+    conn.executemany(
+        "INSERT INTO clauses (id, document_id, section_title, text, page, provisional_risk) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (c["clause_id"], d["doc_id"], c["section_title"], c["text"], c["page"], c.get("provisional_risk"))
+            for d in documents for c in d["clauses"]
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO clauses_fts (clause_id, document_id, section_title, text) VALUES (?, ?, ?, ?)",
+        [
+            (c["clause_id"], d["doc_id"], c["section_title"], c["text"])
+            for d in documents for c in d["clauses"]
+        ],
+    )
+    conn.commit()
+    logger.info(
+        "Inserted %d documents with %d clauses", len(documents), sum(len(d["clauses"]) for d in documents),
+    )
 def get_document(conn: sqlite3.Connection, doc_id: str) -> Optional[dict]:
     """Fetch a document by ID."""
     cursor = conn.execute(
-        "SELECT id, filename, uploaded_by, page_count, created_at FROM documents WHERE id = ?",
+        "SELECT id, filename, uploaded_by, page_count, parent_id, version, created_at FROM documents WHERE id = ?",
         (doc_id,),
     )
     row = cursor.fetchone()
@@ -62,7 +117,7 @@ def get_document(conn: sqlite3.Connection, doc_id: str) -> Optional[dict]:
 def list_user_documents(conn: sqlite3.Connection, username: str) -> list[dict]:
     """List all documents uploaded by a user."""
     cursor = conn.execute(
-        "SELECT id, filename, uploaded_by, page_count, created_at FROM documents WHERE uploaded_by = ? ORDER BY created_at DESC",
+        "SELECT id, filename, uploaded_by, page_count, parent_id, version, created_at FROM documents WHERE uploaded_by = ? ORDER BY created_at DESC",
         (username,),
     )
     return [dict(row) for row in cursor.fetchall()]
@@ -70,11 +125,18 @@ def list_user_documents(conn: sqlite3.Connection, username: str) -> list[dict]:
 # Clause Repository
 
 def insert_clauses(conn: sqlite3.Connection, document_id: str, clauses: list[dict]) -> None:
-    """Bulk insert clauses for a document."""
+    """Bulk insert clauses for a document (and into the full-text index)."""
     conn.executemany(
-        "INSERT INTO clauses (id, document_id, section_title, text, page) VALUES (?, ?, ?, ?, ?)",
+        "INSERT INTO clauses (id, document_id, section_title, text, page, provisional_risk) VALUES (?, ?, ?, ?, ?, ?)",
         [
-            (c["clause_id"], document_id, c["section_title"], c["text"], c["page"])
+            (c["clause_id"], document_id, c["section_title"], c["text"], c["page"], c.get("provisional_risk"))
+            for c in clauses
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO clauses_fts (clause_id, document_id, section_title, text) VALUES (?, ?, ?, ?)",
+        [
+            (c["clause_id"], document_id, c["section_title"], c["text"])
             for c in clauses
         ],
     )
@@ -98,6 +160,21 @@ def update_clause_classification(
     )
     conn.commit()
 
+def update_clause_classifications(conn: sqlite3.Connection, updates: list[tuple]) -> None:
+    """
+    Bulk-update clauses with classification and risk results in one transaction.
+    Each tuple is (clause_id, clause_type, importance, risk_level, risk_reason,
+    label_source, duplicate_of, duplicate_similarity, type_source).
+    """
+    conn.executemany(
+        """UPDATE clauses
+           SET clause_type = ?, importance = ?, risk_level = ?, risk_reason = ?,
+               label_source = ?, duplicate_of = ?, duplicate_similarity = ?, type_source = ?
+           WHERE id = ?""",
+        [(*labels, cid) for cid, *labels in updates],
+    )
+    conn.commit()
+
 def get_clauses_by_document(conn: sqlite3.Connection, document_id: str) -> list[dict]:
     """Fetch all clauses for a given document."""
     cursor = conn.execute(
@@ -106,21 +183,145 @@ def get_clauses_by_document(conn: sqlite3.Connection, document_id: str) -> list[
     )
     return [dict(row) for row in cursor.fetchall()]
 
+def get_clauses_page(
+    conn: sqlite3.Connection,
+    document_id: str,
+    limit: Optional[int] = None,
+    after: Optional[tuple[int, str]] = None,
+    risk_levels: Optional[list[str]] = None,
+    clause_types: Optional[list[str]] = None,
+) -> list[dict]:
+    """
+    Keyset page of a document's clauses ordered by (page, id), starting after
+    the (page, id) cursor and optionally filtered by risk level / clause type.
+    """
+    sql = "SELECT * FROM clauses WHERE document_id = ?"
+    params: list = [document_id]
+    if after is not None:
+        sql += " AND (page, id) > (?, ?)"
+        params.extend(after)
+    if risk_levels:
+        sql += f" AND risk_level IN ({', '.join('?' * len(risk_levels))})"
+        params.extend(risk_levels)
+    if clause_types:
+        sql += f" AND clause_type IN ({', '.join('?' * len(clause_types))})"
+        params.extend(clause_types)
+    sql += " ORDER BY page, id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    cursor = conn.execute(sql, params)
+    return [dict(row) for row in cursor.fetchall()]
+
+def search_clauses_fts(
+    conn: sqlite3.Connection, match_query: str, limit: int, doc_id: Optional[str] = None
+) -> list[dict]:
+    """
+    BM25-ranked full-text search over clause text and section titles
+    (titles weighted double). Best matches first.
+    """
+    sql = """SELECT c.id AS clause_id, c.document_id, c.section_title, c.text, c.page,
+                    c.clause_type, c.risk_level, bm25(clauses_fts, 0, 0, 2.0, 1.0) AS rank
+             FROM clauses_fts JOIN clauses c ON c.id = clauses_fts.clause_id
+             WHERE clauses_fts MATCH ?"""
+    params: list = [match_query]
+    if doc_id:
+        sql += " AND clauses_fts.document_id = ?"
+        params.append(doc_id)
+    sql += " ORDER BY rank LIMIT ?"
+    params.append(limit)
+    cursor = conn.execute(sql, params)
+    return [dict(row) for row in cursor.fetchall()]
+
+def get_llm_labeled_clauses(conn: sqlite3.Connection, limit: int) -> list[dict]:
+    """Most recent clauses whose type was assigned by the LLM itself (training data for the local classifier)."""
+    cursor = conn.execute(
+        """SELECT id, text, clause_type, importance FROM clauses
+           WHERE clause_type IS NOT NULL
+             AND coalesce(label_source, 'llm') = 'llm' AND coalesce(type_source, 'llm') = 'llm'
+           ORDER BY rowid DESC LIMIT ?""",
+        (limit,),
+    )
+    return [dict(row) for row in cursor.fetchall()]
+
 def is_document_analyzed(conn: sqlite3.Connection, doc_id: str) -> bool:
-    """Check if a document has been analyzed (any clause has a clause_type)."""
+    """
+    Check if a document has been analyzed: it has clauses and none is still
+    unlabeled (a new version's carried-over labels alone do not count).
+    """
     cursor = conn.execute(
-        "SELECT 1 FROM clauses WHERE document_id = ? AND clause_type IS NOT NULL LIMIT 1",
-        (doc_id,),
+        """SELECT EXISTS (SELECT 1 FROM clauses WHERE document_id = ?)
+              AND NOT EXISTS (SELECT 1 FROM clauses WHERE document_id = ? AND clause_type IS NULL)""",
+        (doc_id, doc_id),
     )
-    return cursor.fetchone() is not None
+    return bool(cursor.fetchone()[0])
 
 def delete_document(conn: sqlite3.Connection, doc_id: str) -> None:
     """Delete a document and all its clauses."""
+    conn.execute("DELETE FROM clause_signature_bands WHERE document_id = ?", (doc_id,))
+    conn.execute("DELETE FROM clause_signatures WHERE document_id = ?", (doc_id,))
+    conn.execute("DELETE FROM clauses_fts WHERE document_id = ?", (doc_id,))
     conn.execute("DELETE FROM clauses WHERE document_id = ?", (doc_id,))
     conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
     conn.commit()
     logger.info("Deleted document %s and its clauses", doc_id)
 
+# Clause Signature Repository
+
+def replace_clause_signatures(conn: sqlite3.Connection, document_id: str, rows: list[tuple]) -> None:
+    """
+    Replace a document's stored clause signatures in one transaction.
+    Each tuple is (clause_id, signature_bytes, band_keys).
+    """
+    conn.execute("DELETE FROM clause_signature_bands WHERE document_id = ?", (document_id,))
+    conn.execute("DELETE FROM clause_signatures WHERE document_id = ?", (document_id,))
+    conn.executemany(
+        "INSERT INTO clause_signatures (clause_id, document_id, signature) VALUES (?, ?, ?)",
+        [(cid, document_id, sig) for cid, sig, _ in rows],
+    )
+    conn.executemany(
+        "INSERT INTO clause_signature_bands (band_key, clause_id, document_id) VALUES (?, ?, ?)",
+        [(key, cid, document_id) for cid, _, keys in rows for key in keys],
+    )
+    conn.commit()
+
+def find_clause_signature_candidates(
+    conn: sqlite3.Connection,
+    band_keys: list[int],
+    owner: str,
+    exclude_document_ids: list[str] = (),
+    chunk_size: int = 500,
+) -> list[dict]:
+    """
+    LLM-labeled clauses of the owner's documents (other than exclude_document_ids),
+    excluding placeholder labels from failed classification calls, sharing any of the band keys, with their signature, labels and the matching
+    keys (band_keys).
+    """
+    exclude = list(exclude_document_ids) or [""]
+    found: dict[str, dict] = {}
+    for start in range(0, len(band_keys), chunk_size):
+        chunk = band_keys[start:start + chunk_size]
+        cursor = conn.execute(
+            f"""SELECT b.band_key, s.clause_id, s.signature, c.clause_type, c.importance,
+                       c.risk_level, c.risk_reason, c.type_source
+                FROM clause_signature_bands b
+                JOIN clause_signatures s ON s.clause_id = b.clause_id
+                JOIN clauses c ON c.id = b.clause_id
+                JOIN documents d ON d.id = b.document_id
+                WHERE b.band_key IN ({', '.join('?' * len(chunk))})
+                  AND d.uploaded_by = ? AND c.label_source = 'llm'
+                  AND coalesce(c.type_source, 'llm') != 'fallback'
+                  AND b.document_id NOT IN ({', '.join('?' * len(exclude))})""",
+            [*chunk, owner, *exclude],
+        )
+        for row in cursor.fetchall():
+            entry = found.get(row["clause_id"])
+            if entry is None:
+                entry = found[row["clause_id"]] = {k: row[k] for k in row.keys() if k != "band_key"}
+                entry["band_keys"] = []
+            entry["band_keys"].append(row["band_key"])
+    return list(found.values())
+
 # Chat Repository
 def create_chat_session(conn: sqlite3.Connection, session_id: str, username: str, title: str, doc_id: str = None) -> dict:
     conn.execute(
@@ -141,12 +342,13 @@ def list_chat_sessions(conn: sqlite3.Connection, username: str, doc_id: str = No
             (username,),
         )
     return [dict(row) for row in cursor.fetchall()]
-def add_chat_message(conn: sqlite3.Connection, session_id: str, role: str, content: str, meta: dict = None) -> None:
-    conn.execute(
+def add_chat_message(conn: sqlite3.Connection, session_id: str, role: str, content: str, meta: dict = None) -> int:
+    cursor = conn.execute(
         "INSERT INTO chat_messages (session_id, role, content, meta) VALUES (?, ?, ?, ?)",
         (session_id, role, content, json.dumps(meta) if meta else None),
     )
     conn.commit()
+    return cursor.lastrowid
 def get_chat_messages(conn: sqlite3.Connection, session_id: str) -> list[dict]:
     cursor = conn.execute(
         "SELECT * FROM chat_messages WHERE session_id = ? ORDER BY created_at ASC",
@@ -157,7 +359,97 @@ def get_chat_messages(conn: sqlite3.Connection, session_id: str) -> list[dict]:
         if r.get("meta"):
             r["meta"] = json.loads(r["meta"])
     return rows
+def get_recent_chat_messages(
+    conn: sqlite3.Connection, session_id: str, limit: int, before_id: Optional[int] = None
+) -> list[dict]:
+    """Last `limit` messages of a session (oldest first), without decoding meta."""
+    cursor = conn.execute(
+        """SELECT id, role, content FROM chat_messages
+           WHERE session_id = ? AND id < ?
+           ORDER BY id DESC LIMIT ?""",
+        (session_id, before_id if before_id is not None else 2**63 - 1, limit),
+    )
+    return [dict(row) for row in reversed(cursor.fetchall())]
+def get_chat_summary(conn: sqlite3.Connection, session_id: str) -> Optional[dict]:
+    cursor = conn.execute(
+        "SELECT summary, last_message_id FROM chat_summaries WHERE session_id = ?",
+        (session_id,),
+    )
+    row = cursor.fetchone()
+    return dict(row) if row else None
+def upsert_chat_summary(conn: sqlite3.Connection, session_id: str, summary: str, last_message_id: int) -> None:
+    conn.execute(
+        """INSERT INTO chat_summaries (session_id, summary, last_message_id) VALUES (?, ?, ?)
+           ON CONFLICT(session_id) DO UPDATE SET
+               summary = excluded.summary,
+               last_message_id = excluded.last_message_id,
+               updated_at = datetime('now', 'localtime')""",
+        (session_id, summary, last_message_id),
+    )
+    conn.commit()
 def delete_chat_session(conn: sqlite3.Connection, session_id: str) -> None:
+    conn.execute("DELETE FROM chat_summaries WHERE session_id = ?", (session_id,))
     conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
     conn.execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,))
-    conn.commit()
\ No newline at end of file
+    conn.commit()
+
+
+# LLM Usage Repository
+
+_USAGE_GROUPS = {
+    "user": "username",
+    "document": "document_id",
+    "session": "session_id",
+    "prompt_type": "prompt_type",
+    "day": "date(created_at)",
+}
+
+
+def insert_llm_usage(conn: sqlite3.Connection, rows: list[tuple]) -> None:
+    """rows: (username, document_id, session_id, prompt_type, prompt_tokens, completion_tokens, created_at)."""
+    conn.executemany(
+        """INSERT INTO llm_usage
+               (username, document_id, session_id, prompt_type, prompt_tokens, completion_tokens, created_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        rows,
+    )
+    conn.commit()
+
+
+def get_user_tokens_since(conn: sqlite3.Connection, username: str, since: str) -> int:
+    cursor = conn.execute(
+        "SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0) FROM llm_usage "
+        "WHERE username = ? AND created_at >= ?",
+        (username, since),
+    )
+    return cursor.fetchone()[0]
+
+
+def get_llm_usage_report(
+    conn: sqlite3.Connection,
+    since: str,
+    group_by: list[str],
+    username: Optional[str] = None,
+    document_id: Optional[str] = None,
+) -> list[dict]:
+    """Call and token totals since a timestamp, grouped by any of _USAGE_GROUPS."""
+    columns = [f"{_USAGE_GROUPS[g]} AS {g}" for g in group_by]
+    query = (
+        f"SELECT {', '.join(columns + [''])}"
+        "COUNT(*) AS calls, SUM(prompt_tokens) AS prompt_tokens, "
+        "SUM(completion_tokens) AS completion_tokens, "
+        "SUM(prompt_tokens + completion_tokens) AS total_tokens "
+        "FROM llm_usage WHERE created_at >= ?"
+    )
+    params: list = [since]
+    if username is not None:
+        query += " AND username = ?"
+        params.append(username)
+    if document_id is not None:
+        query += " AND document_id = ?"
+        params.append(document_id)
+    if group_by:
+        query += f" GROUP BY {', '.join(_USAGE_GROUPS[g] for g in group_by)}"
+    query += " ORDER BY total_tokens DESC"
+    cursor = conn.execute(query, params)
+    return [dict(row) for row in cursor.fetchall()]
@@ -0,0 +1,102 @@
+"""Offline bulk ingestion of a directory of contracts.
+
+Runs the same pipeline as POST /documents/bulk without going through HTTP:
+
+    python -m app.ingest /path/to/contracts --user alice
+    python -m app.ingest /path/to/contracts --user alice --recursive --analyze --workers 8
+
+Documents are owned by --user (which must exist). Heavy imports stay inside
+main() because spawned extraction workers re-import this module.
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+
+def _find_pdfs(directory: Path, recursive: bool) -> list[Path]:
+    pattern = "**/*" if recursive else "*"
+    return sorted(p for p in directory.glob(pattern) if p.is_file() and p.suffix.lower() == ".pdf")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-ingest a directory of PDF contracts")
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--user", required=True, help="Username that will own the documents")
+    parser.add_argument("--recursive", action="store_true", help="Include PDFs in subdirectories")
+    parser.add_argument("--no-index", action="store_true", help="Skip embedding (documents won't be searchable)")
+    parser.add_argument("--analyze", action="store_true", help="Classify and risk-score clauses with the LLM")
+    parser.add_argument("--workers", type=int, default=None, help="Extraction processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    if not args.directory.is_dir():
+        parser.error(f"{args.directory} is not a directory")
+    if args.workers is not None:
+        os.environ["INGEST_WORKERS"] = str(args.workers)
+
+    from app.core.config import get_settings
+    from app.core.logging import setup_logging
+    from app.db.database import get_db, init_db
+    from app.db.repositories import user_exists
+    from app.services import ingestion
+    from app.services.vector_store import load_index
+
+    setup_logging()
+    settings = get_settings()
+    Path(settings.upload_dir).mkdir(parents=True, exist_ok=True)
+    Path(settings.faiss_index_path).mkdir(parents=True, exist_ok=True)
+    init_db()
+
+    conn = get_db()
+    try:
+        if not user_exists(conn, args.user):
+            parser.error(f"user {args.user!r} does not exist")
+    finally:
+        conn.close()
+
+    pdfs = _find_pdfs(args.directory, args.recursive)
+    if not pdfs:
+        print(f"No PDF files found in {args.directory}")
+        return 0
+    if not args.no_index:
+        load_index()
+
+    job = ingestion.create_job(args.user, index=not args.no_index, analyze=args.analyze)
+    paths = {}
+    for pdf in pdfs:
+        if pdf.stat().st_size > settings.ingest_max_file_bytes:
+            ingestion.add_file(job, pdf.name, error=f"File exceeds {settings.ingest_max_file_bytes} bytes")
+            continue
+        with open(pdf, "rb") as source:
+            doc_id, path = ingestion.stage_pdf(source)
+        paths[doc_id] = path
+        ingestion.add_file(job, pdf.name, doc_id)
+
+    done = 0
+
+    def on_progress(entry: dict) -> None:
+        nonlocal done
+        done += 1
+        detail = entry["error"] or (f"{entry['clauses']} clauses" if entry["clauses"] is not None else "")
+        print(f"[{done}] {entry['status']:<9} {entry['filename']}  {detail}", flush=True)
+
+    print(f"Ingesting {len(paths)} PDFs with {ingestion.worker_count()} workers")
+    started = time.perf_counter()
+    try:
+        summary = ingestion.run_job(job, paths, on_progress=on_progress)
+    finally:
+        ingestion.shutdown_pool()
+    elapsed = time.perf_counter() - started
+
+    failed = summary["counts"].get("failed", 0)
+    print(
+        f"Done in {elapsed:.1f}s ({len(paths) / elapsed:.1f} files/s): "
+        + ", ".join(f"{n} {s}" for s, n in sorted(summary["counts"].items()))
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,8 +2,9 @@ import logging
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from app.core import metrics, tracing
 from app.core.config import get_settings
 from app.core.logging import setup_logging
 from app.db.database import init_db
@@ -12,7 +13,10 @@ from app.api.auth_routes import router as auth_router
 from app.api.document_routes import router as document_router
 from app.api.query_routes import router as query_router
 from app.api.chat_routes import router as chat_router
+from app.api.admin_routes import router as admin_router
+from app.api.usage_routes import router as usage_router
 
+from app.services import ingestion, usage
 from app.services.vector_store import load_index
 from app.services.vector_store import add_clauses as add_clauses_to_index
 
@@ -41,6 +45,8 @@ async def lifespan(app: FastAPI):
 
     # FAISS loading will be added in later phases
     yield
+    usage.flush()
+    ingestion.shutdown_pool()
     logger.info("Shutting down AI Legal Analyzer")
 
 def create_app() -> FastAPI:
@@ -57,8 +63,21 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Trace-Id", "X-LLM-Calls-Avoided"],
     )
 
+    settings = get_settings()
+    # Without admins or sampling no request can be traced, so skip the middleware
+    if settings.admin_usernames or settings.trace_sample_rate > 0:
+        app.add_middleware(tracing.TracingMiddleware)
+
+    if settings.metrics_enabled:
+        app.add_middleware(metrics.MetricsMiddleware)
+
+        @app.get("/metrics", tags=["System"], include_in_schema=False)
+        async def get_metrics():
+            return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
     @app.get("/health", tags=["System"])
     async def health_check():
         return {"status": "healthy",  "service": "legal-analyzer"}
@@ -67,6 +86,8 @@ def create_app() -> FastAPI:
     app.include_router(document_router, prefix="/documents", tags=["Documents"])
     app.include_router(query_router, prefix="/query", tags=["Query"])
     app.include_router(chat_router, prefix="/chat", tags=["Chat"])
+    app.include_router(usage_router, prefix="/usage", tags=["Usage"])
+    app.include_router(admin_router, prefix="/admin", tags=["Admin"])
     
     return app
 
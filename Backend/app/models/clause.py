@@ -9,6 +9,7 @@ class Clause(BaseModel):
     section_title: str
     text: str
     page: int
+    provisional_risk: Optional[Literal["Low", "Medium", "High"]] = None  # keyword-only, set at upload
 
 class ClassifiedClause(Clause):
     """A clause with classification and risk metadata."""
@@ -16,10 +17,19 @@ class ClassifiedClause(Clause):
     importance: Optional[Literal["Low", "Medium", "High"]] = None
     risk_level: Optional[Literal["Low", "Medium", "High"]] = None
     risk_reason: Optional[str] = None
+    label_source: Optional[Literal["llm", "duplicate", "previous_version", "triage"]] = None
+    duplicate_of: Optional[str] = None  # clause the labels were copied from
+    duplicate_similarity: Optional[float] = None
+    # local when the embedding classifier assigned the type, fallback when the LLM call failed
+    type_source: Optional[Literal["llm", "local", "fallback"]] = None
+    risk_source: Optional[Literal["llm", "keywords", "fallback"]] = None  # keywords: LLM skipped; fallback: LLM failed
 
 class DocumentOut(BaseModel):
     """Respomse body for an uploaded document."""
     doc_id: str
     filename: str
     page_count: int
-    clauses: List[Clause]
\ No newline at end of file
+    clauses: List[Clause]
+    parent_id: Optional[str] = None  # previous version, for uploads of a revised draft
+    version: int = 1
+    changes: Optional[dict] = None  # clause diff counts against the previous version
\ No newline at end of file
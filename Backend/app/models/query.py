@@ -7,11 +7,15 @@ class ClassificationResult(BaseModel):
     """LLM output for clause classification."""
     clause_type: str = Field(description="e.g. Termination, Liability, Payment, Confidentiality, Indemnity, IP, Warranty, etc.")
     importance: Literal["Low", "Medium", "High"] = Field(description="How important this clause is")
+    source: Literal["llm", "fallback"] = Field(default="llm", description="fallback when the LLM call failed")
 
 class RiskResult(BaseModel):
     """LLM output for risk assessment."""
     risk_level: Literal["Low", "Medium", "High"] = Field(description="Risk level of the clause")
     risk_reason: str = Field(description="Brief explanation of why this risk level was assigned")
+    source: Literal["llm", "keywords", "fallback"] = Field(
+        default="llm", description="keywords when the LLM was skipped, fallback when the LLM call failed",
+    )
 
 class QueryRequest(BaseModel):
     """Request body for RAG question answering."""
@@ -24,4 +28,5 @@ class QueryResponse(BaseModel):
     answer: str
     referenced_clauses: list[str]
     overall_risk: Literal["Low", "Medium", "High"]
-    confidence: float = Field(ge=0.0, le=1.0)
\ No newline at end of file
+    confidence: float = Field(ge=0.0, le=1.0)
+    cached: bool = Field(default=False, description="True if served from the semantic answer cache")
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""Clause-level alignment of a document against a reference (e.g. a standard template).
+
+Both documents' clause vectors come from the FAISS index, so a whole-document
+comparison is one similarity-matrix product and no LLM calls. Clauses are
+paired one-to-one by optimal assignment (scipy's linear_sum_assignment) or,
+without scipy or for very large documents, greedily by descending similarity.
+Pairs below ALIGN_MATCH_THRESHOLD count as unmatched.
+"""
+
+import logging
+import re
+
+import numpy as np
+
+from app.core import tracing
+from app.core.config import get_settings
+from app.services.vector_store import get_clause_vectors
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # greedy assignment only
+    linear_sum_assignment = None
+
+logger = logging.getLogger(__name__)
+
+
+def _normalized(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def _greedy_assignment(similarity: np.ndarray, threshold: float) -> list[tuple[int, int]]:
+    """Pairs (row, col) taken in descending similarity, each row/col used once."""
+    rows, cols = np.nonzero(similarity >= threshold)
+    order = np.argsort(-similarity[rows, cols], kind="stable")
+    used_rows, used_cols = set(), set()
+    pairs = []
+    for i in order:
+        r, c = int(rows[i]), int(cols[i])
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        pairs.append((r, c))
+    return pairs
+
+
+def _optimal_assignment(similarity: np.ndarray, threshold: float) -> list[tuple[int, int]]:
+    """Maximum-total-similarity pairing; pairs under the threshold are dropped afterwards."""
+    rows, cols = linear_sum_assignment(similarity, maximize=True)
+    return [(int(r), int(c)) for r, c in zip(rows, cols) if similarity[r, c] >= threshold]
+
+
+def _clause_out(row: dict) -> dict:
+    return {
+        "clause_id": row["id"],
+        "section_title": row.get("section_title") or "Untitled",
+        "page": row.get("page"),
+        "text": row["text"],
+        "clause_type": row.get("clause_type"),
+        "risk_level": row.get("risk_level"),
+    }
+
+
+@tracing.traced("align")
+def align_clauses(clauses: list[dict], reference: list[dict]) -> dict:
+    """
+    Align clauses (rows from the clauses table) to the reference document's clauses.
+    Returns matched pairs with similarity, reference clauses missing from the
+    document and document clauses absent from the reference.
+    """
+    settings = get_settings()
+    threshold = settings.align_match_threshold
+    if not clauses or not reference:
+        pairs, method = [], "none"
+    else:
+        vectors = get_clause_vectors(clauses)
+        reference_vectors = get_clause_vectors(reference)
+        # Vectors are unit-normalized, so the dot product is the cosine similarity
+        similarity = vectors @ reference_vectors.T
+        size = max(len(clauses), len(reference))
+        if linear_sum_assignment is not None and size <= settings.align_optimal_max_clauses:
+            pairs, method = _optimal_assignment(similarity, threshold), "optimal"
+        else:
+            pairs, method = _greedy_assignment(similarity, threshold), "greedy"
+
+    matched_rows = {r for r, _ in pairs}
+    matched_cols = {c for _, c in pairs}
+    matched = [
+        {
+            "similarity": round(float(similarity[r, c]), 4),
+            "identical": _normalized(clauses[r]["text"]) == _normalized(reference[c]["text"]),
+            "clause": _clause_out(clauses[r]),
+            "reference": _clause_out(reference[c]),
+        }
+        for r, c in sorted(pairs, key=lambda p: p[1])
+    ]
+    missing = [_clause_out(row) for c, row in enumerate(reference) if c not in matched_cols]
+    added = [_clause_out(row) for r, row in enumerate(clauses) if r not in matched_rows]
+    logger.info(
+        "Aligned %d clauses to %d reference clauses (%s): %d matched, %d missing, %d added",
+        len(clauses), len(reference), method, len(matched), len(missing), len(added),
+    )
+    return {
+        "method": method,
+        "threshold": threshold,
+        "summary": {
+            "matched": len(matched),
+            "identical": sum(1 for m in matched if m["identical"]),
+            "missing": len(missing),
+            "added": len(added),
+        },
+        "matched": matched,
+        "missing": missing,
+        "added": added,
+    }
@@ -0,0 +1,190 @@
+"""Document analysis: classify clauses, score risk, store labels and patch the index.
+
+Clauses carried over unchanged from a previous version, non-substantive
+segments (app.services.triage) and near-duplicates of already labeled clauses
+(app.services.dedup) get their labels without the LLM; only novel clauses are
+sent to it, and of those only the ones the local embedding classifier
+(app.services.local_classifier) or the keyword engine (app.services.risk_scorer)
+is unsure about get an LLM classification or risk call.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from app.core import metrics, tracing
+from app.db import async_repositories as arepo
+from app.db.repositories import update_clause_classifications
+from app.models.clause import ClassifiedClause
+from app.models.query import ClassificationResult, RiskResult
+from app.services import answer_cache, dedup, local_classifier, triage
+from app.services.classifier import aclassify_clauses, classify_clauses
+from app.services.risk_scorer import ascore_clauses, score_clauses
+from app.services.vector_store import upsert_document as upsert_document_in_index
+
+logger = logging.getLogger(__name__)
+
+
+def split_clauses(clause_dicts: list[dict], doc: dict) -> tuple[list[dict], dict, dict]:
+    """
+    (novel clauses for the LLM, clauses that reuse labels, signatures). Callers that
+    need the novel clauses first (e.g. for a quota estimate) pass the result on to
+    analyze_document / aanalyze_document as split.
+    """
+    # Unchanged clauses of a new version got the previous version's labels at upload
+    matches = {
+        c["id"]: {
+            "source": "previous_version",
+            "duplicate_of": c["duplicate_of"],
+            "similarity": c["duplicate_similarity"],
+            "labels": c,
+        }
+        for c in clause_dicts if c.get("label_source") == "previous_version"
+    }
+    for clause_id, why in triage.triage([c for c in clause_dicts if c["id"] not in matches]).items():
+        matches[clause_id] = {"source": "triage", "duplicate_of": None, "similarity": None, "labels": triage.labels(why)}
+    # A revised version's changed clauses must not inherit their own previous labels
+    exclude = [doc["id"]] + ([doc["parent_id"]] if doc.get("parent_id") else [])
+    duplicates, signatures = dedup.find_duplicates(
+        [c for c in clause_dicts if c["id"] not in matches], doc["uploaded_by"], exclude,
+    )
+    matches.update(duplicates)
+    novel = [c for c in clause_dicts if c["id"] not in matches]
+    return novel, matches, signatures
+
+
+def _label(
+    clause_dicts: list[dict],
+    novel: list[dict],
+    classifications: list[ClassificationResult],
+    type_sources: list[str],
+    risks: list[RiskResult],
+    matches: dict[str, dict],
+) -> tuple[list[ClassifiedClause], list[tuple]]:
+    """
+    Build the response models and the DB updates, copying labels onto near-duplicates
+    from their stored match or from the clause of this document they duplicate.
+    """
+    fresh = {
+        c["id"]: (cls.clause_type, cls.importance, risk.risk_level, risk.risk_reason)
+        for c, cls, risk in zip(novel, classifications, risks)
+    }
+    risk_sources = {c["id"]: risk.source for c, risk in zip(novel, risks)}
+    fresh_type_sources = {c["id"]: source for c, source in zip(novel, type_sources)}
+    results = []
+    updates = []
+    for row in clause_dicts:
+        match = matches.get(row["id"])
+        if match is None:
+            labels = fresh[row["id"]]
+            source = ("llm", None, None, fresh_type_sources[row["id"]])
+        else:
+            stored = match["labels"]
+            if stored is None:
+                labels = fresh[match["duplicate_of"]]
+                type_source = fresh_type_sources[match["duplicate_of"]]
+            else:
+                labels = (stored["clause_type"], stored["importance"], stored["risk_level"], stored["risk_reason"])
+                type_source = stored.get("type_source")
+            source = (match["source"], match["duplicate_of"], match["similarity"], type_source)
+        updates.append((row["id"], *labels, *source))
+        clause_type, importance, risk_level, risk_reason = labels
+        results.append(ClassifiedClause(
+            clause_id=row["id"],
+            section_title=row["section_title"] or "Untitled",
+            text=row["text"],
+            page=row["page"],
+            clause_type=clause_type,
+            importance=importance,
+            risk_level=risk_level,
+            risk_reason=risk_reason,
+            label_source=source[0],
+            duplicate_of=source[1],
+            duplicate_similarity=source[2],
+            type_source=source[3] if source[0] == "llm" else None,
+            risk_source=risk_sources.get(row["id"]),
+        ))
+    return results, updates
+
+
+def _reusable_ids(novel: list[dict], type_sources: list[str], risks: list[RiskResult]) -> list[str]:
+    """Novel clauses whose labels may be copied onto near-duplicates (no failed LLM call behind them)."""
+    return [
+        c["id"] for c, type_source, risk in zip(novel, type_sources, risks)
+        if type_source != "fallback" and risk.source != "fallback"
+    ]
+
+
+def calls_avoided(results: list[ClassifiedClause]) -> int:
+    """LLM calls (classification + risk) saved on an analysis result by reusing labels, local types or keyword risk."""
+    reused = sum(1 for r in results if r.label_source != "llm")
+    local = sum(1 for r in results if r.type_source == "local")
+    return 2 * reused + local + sum(1 for r in results if r.risk_source == "keywords")
+
+
+def _record_avoided(doc_id: str, matches: dict[str, dict]) -> None:
+    by_source: dict[str, int] = {}
+    for match in matches.values():
+        by_source[match["source"]] = by_source.get(match["source"], 0) + 1
+    for source, clauses in by_source.items():
+        metrics.LLM_CALLS_AVOIDED.inc(2 * clauses, reason=source)
+    if by_source:
+        logger.info("Document %s reused labels for %s (%d LLM calls avoided)", doc_id, by_source, 2 * len(matches))
+
+
+async def asplit_clauses(clause_dicts: list[dict], doc: dict) -> tuple[list[dict], dict, dict]:
+    """split_clauses off the event loop (it reads the signature tables)."""
+    with tracing.span("dedup", clauses=len(clause_dicts)):
+        return await asyncio.to_thread(split_clauses, clause_dicts, doc)
+
+
+async def aanalyze_document(
+    conn, doc: dict, clause_dicts: list[dict], split: Optional[tuple] = None,
+) -> list[ClassifiedClause]:
+    """Analyze a document's clauses (rows from the clauses table) on an aiosqlite connection."""
+    doc_id = doc["id"]
+    novel, matches, signatures = split or await asplit_clauses(clause_dicts, doc)
+    with tracing.span("classify.local", clauses=len(novel)):
+        predictions, vectors = await asyncio.to_thread(local_classifier.predict_clauses, novel)
+    escalate = [novel[i] for i in local_classifier.needs_llm(predictions)]
+    with tracing.span("classify", clauses=len(escalate)):
+        llm_classifications = await aclassify_clauses(escalate)
+    classifications, type_sources = local_classifier.resolve(novel, vectors, predictions, llm_classifications)
+    with tracing.span("score_risk", clauses=len(novel)):
+        risks = await ascore_clauses(novel)
+
+    results, updates = _label(clause_dicts, novel, classifications, type_sources, risks, matches)
+    with tracing.span("db.write_labels"):
+        await arepo.update_clause_classifications(conn, updates)
+        await asyncio.to_thread(dedup.remember, doc_id, _reusable_ids(novel, type_sources, risks), signatures)
+
+    # Patch labels onto the vectors indexed at upload (no re-embedding)
+    with tracing.span("index.upsert"):
+        await asyncio.to_thread(upsert_document_in_index, doc_id, triage.indexable([r.model_dump() for r in results]))
+    answer_cache.invalidate_document(doc_id)
+    _record_avoided(doc_id, matches)
+    logger.info("Analyzed %d clauses for document %s (%d sent to the LLM)", len(results), doc_id, len(novel))
+    return results
+
+
+def analyze_document(
+    conn, doc: dict, clause_dicts: list[dict], split: Optional[tuple] = None,
+) -> list[ClassifiedClause]:
+    """Blocking variant of aanalyze_document for worker threads and scripts."""
+    doc_id = doc["id"]
+    novel, matches, signatures = split or split_clauses(clause_dicts, doc)
+    predictions, vectors = local_classifier.predict_clauses(novel)
+    escalate = [novel[i] for i in local_classifier.needs_llm(predictions)]
+    classifications, type_sources = local_classifier.resolve(
+        novel, vectors, predictions, classify_clauses(escalate),
+    )
+    risks = score_clauses(novel)
+
+    results, updates = _label(clause_dicts, novel, classifications, type_sources, risks, matches)
+    update_clause_classifications(conn, updates)
+    dedup.remember(doc_id, _reusable_ids(novel, type_sources, risks), signatures)
+    upsert_document_in_index(doc_id, triage.indexable([r.model_dump() for r in results]))
+    answer_cache.invalidate_document(doc_id)
+    _record_avoided(doc_id, matches)
+    logger.info("Analyzed %d clauses for document %s (%d sent to the LLM)", len(results), doc_id, len(novel))
+    return results
@@ -0,0 +1,129 @@
+"""Semantic answer cache for the RAG QA chain.
+
+Answers are indexed by question embedding and document scope. A new question
+is served from the cache when it is close enough (cosine similarity) to a
+cached one and none of the documents behind the cached answer have changed.
+Unscoped (all-documents) answers are also dropped whenever the index changes,
+since a newly added document may answer the question better.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+from app.core import metrics
+from app.core.config import get_settings
+from app.models.query import QueryResponse
+from app.services.vector_store import get_document_version, get_index_version
+
+logger = logging.getLogger(__name__)
+
+# entry id -> {"scope", "vector", "response", "doc_versions", "index_version"}
+_entries: OrderedDict[int, dict] = OrderedDict()
+_lock = threading.Lock()
+_next_id = 0
+_stats = {"hits": 0, "misses": 0}
+
+
+def _unit(vector: list[float]) -> np.ndarray:
+    arr = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(arr)
+    return arr / norm if norm else arr
+
+
+def _is_fresh(entry: dict) -> bool:
+    """
+    An entry is valid only while every document it was built from is unchanged
+    and, for unscoped answers, while no document has been added or removed.
+    """
+    if entry["index_version"] is not None and entry["index_version"] != get_index_version():
+        return False
+    return all(
+        get_document_version(doc_id) == version
+        for doc_id, version in entry["doc_versions"].items()
+    )
+
+
+def lookup(question_vector: list[float], scope: Optional[str]) -> Optional[QueryResponse]:
+    """Return a cached answer for a semantically equivalent question, if any."""
+    settings = get_settings()
+    query = _unit(question_vector)
+
+    with _lock:
+        candidates = [(eid, e) for eid, e in _entries.items() if e["scope"] == scope]
+        if not candidates:
+            _stats["misses"] += 1
+            return None
+
+        matrix = np.stack([e["vector"] for _, e in candidates])
+        scores = matrix @ query
+        # Walk candidates best-first, evicting stale ones we run into
+        for idx in np.argsort(-scores):
+            if scores[idx] < settings.answer_cache_similarity_threshold:
+                break
+            eid, entry = candidates[idx]
+            if not _is_fresh(entry):
+                del _entries[eid]
+                continue
+            _entries.move_to_end(eid)
+            _stats["hits"] += 1
+            logger.info("Answer cache hit (similarity %.3f, scope %s)", scores[idx], scope)
+            return entry["response"].model_copy(update={"cached": True})
+
+        _stats["misses"] += 1
+        return None
+
+
+def store(
+    question_vector: list[float],
+    scope: Optional[str],
+    response: QueryResponse,
+    doc_ids: set[str],
+) -> None:
+    """Cache an answer along with the versions of the documents it was built from."""
+    global _next_id
+    settings = get_settings()
+    entry = {
+        "scope": scope,
+        "vector": _unit(question_vector),
+        "response": response,
+        "doc_versions": {doc_id: get_document_version(doc_id) for doc_id in doc_ids},
+        "index_version": get_index_version() if scope is None else None,
+    }
+    with _lock:
+        _entries[_next_id] = entry
+        _next_id += 1
+        while len(_entries) > settings.answer_cache_size:
+            _entries.popitem(last=False)
+
+
+def invalidate_document(doc_id: str) -> None:
+    """Drop every cached answer scoped to, or built from, a document."""
+    with _lock:
+        stale = [
+            eid for eid, e in _entries.items()
+            if e["scope"] == doc_id or doc_id in e["doc_versions"]
+        ]
+        for eid in stale:
+            del _entries[eid]
+    if stale:
+        logger.info("Invalidated %d cached answers for document %s", len(stale), doc_id)
+
+
+def get_stats() -> dict:
+    """Return answer cache hit/miss counters for this process."""
+    with _lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+        size = len(_entries)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / total if total else 0.0,
+        "size": size,
+    }
+
+
+metrics.register_cache("answer", get_stats)
@@ -0,0 +1,122 @@
+"""Token-budgeted chat history with a rolling per-session summary.
+
+Each turn only the last few messages are read from SQLite. The newest ones that
+fit the token budget are passed to the QA prompt verbatim; anything older that
+falls out of the budget is folded into a running summary stored per session, so
+the prompt keeps long-range context at a bounded size. Folding waits until
+CHAT_HISTORY_FOLD_BATCH messages have overflowed the message cap (one summary
+call every few turns, not every turn) unless the unfolded turns would exceed the
+token budget; until then, and whenever a fold fails, they stay in the history
+as far as the budget allows. This module owns the history limits; the QA prompt
+uses the history as given.
+"""
+
+import logging
+from typing import Optional
+
+import aiosqlite
+from app.core.config import get_settings
+from app.db import async_repositories as arepo
+from app.services import llm
+from app.services.tokenizer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and a legal analyst assistant.
+
+Current summary:
+{summary}
+
+New messages to fold in:
+{messages}
+
+Rewrite the summary so it includes the new messages. Keep the facts, clause references,
+questions asked and conclusions reached. Be concise (at most a short paragraph).
+Return ONLY the updated summary text."""
+
+
+def _format_message(msg: dict) -> str:
+    role = "User" if msg["role"] == "user" else "Assistant"
+    return f"{role}: {msg['content']}"
+
+
+def select_history(messages: list[dict], summary: str) -> tuple[list[dict], list[dict]]:
+    """
+    Split messages (oldest first) into (kept, overflow): kept are the newest
+    messages that fit the message cap and the token budget left after the summary.
+    """
+    settings = get_settings()
+    budget = settings.chat_history_token_budget - count_tokens(summary)
+    kept: list[dict] = []
+    used = 0
+    for msg in reversed(messages):
+        cost = count_tokens(_format_message(msg))
+        if len(kept) >= settings.chat_history_max_messages or used + cost > budget:
+            break
+        kept.append(msg)
+        used += cost
+    kept.reverse()
+    return kept, messages[:len(messages) - len(kept)]
+
+
+async def _afold_summary(summary: str, messages: list[dict]) -> Optional[str]:
+    """Ask the LLM to fold messages into the summary. Returns None on failure."""
+    prompt = SUMMARY_PROMPT.format(
+        summary=summary or "(empty)",
+        messages="\n".join(_format_message(m) for m in messages),
+    )
+    try:
+        response = await llm.ainvoke(prompt, "summary")
+        return response.content.strip()
+    except Exception as e:
+        logger.warning("Chat summary update failed: %s", str(e))
+        return None
+
+
+async def abuild_history(
+    conn: aiosqlite.Connection,
+    session_id: str,
+    before_id: Optional[int] = None,
+) -> tuple[list[dict], Optional[str]]:
+    """
+    Return (recent messages as {"role", "content"}, summary of earlier turns)
+    for the messages of a session older than before_id.
+    """
+    settings = get_settings()
+    stored = await arepo.get_chat_summary(conn, session_id)
+    summary = stored["summary"] if stored else ""
+    summarized_upto = stored["last_message_id"] if stored else 0
+
+    window = await arepo.get_recent_chat_messages(
+        conn, session_id, settings.chat_history_window, before_id
+    )
+    window = [m for m in window if m["id"] > summarized_upto]
+    kept, overflow = select_history(window, summary)
+
+    def cost(messages: list[dict]) -> int:
+        return sum(count_tokens(_format_message(m)) for m in messages)
+
+    room = settings.chat_history_token_budget - count_tokens(summary) - cost(kept)
+    # Fold in batches, or straight away when the unfolded turns no longer fit the budget
+    if overflow and (len(overflow) >= settings.chat_history_fold_batch or cost(overflow) > room):
+        folded = await _afold_summary(summary, overflow)
+        if folded is not None:
+            summary = folded
+            await arepo.upsert_chat_summary(conn, session_id, summary, overflow[-1]["id"])
+            logger.info(
+                "Folded %d messages into summary for session %s (%d tokens)",
+                len(overflow), session_id, count_tokens(summary),
+            )
+            overflow = []
+    # Turns not folded yet (or whose fold failed) stay verbatim as far as the budget allows;
+    # any that do not fit are left out of this prompt only and folded on a later turn
+    carried: list[dict] = []
+    for msg in reversed(overflow):
+        room -= count_tokens(_format_message(msg))
+        if room < 0:
+            break
+        carried.append(msg)
+    kept = carried[::-1] + kept
+
+    history = [{"role": m["role"], "content": m["content"]} for m in kept]
+    return history, summary or None
@@ -2,8 +2,8 @@
 
 import json
 import logging
-from langchain_groq import ChatGroq
-from app.core.config import get_settings
+from app.services import llm
+from app.services.tokenizer import count_tokens
 from app.models.query import ClassificationResult
 
 logger = logging.getLogger(__name__)
@@ -18,34 +18,41 @@ Clause text:
 \"\"\"
 Return ONLY valid JSON, no other text."""
 
-def _get_llm() -> ChatGroq:
-    """Create a Groq LLM instance."""
-    settings = get_settings()
-    return ChatGroq(
-        api_key=settings.groq_api_key,
-        model_name=settings.llm_model,
-        temperature=0,
-        max_tokens=200,
-    )
+def _parse_classification(content: str) -> ClassificationResult:
+    """Parse JSON from the LLM response (handles markdown code blocks)."""
+    content = content.strip()
+    if "```" in content:
+        content = content.split("```")[1]
+        if content.startswith("json"):
+            content = content[4:]
+        content = content.strip()
+    data = json.loads(content)
+    return ClassificationResult(**data)
+
+def estimate_tokens(clause_texts: list[str]) -> int:
+    """Upper bound on the tokens classifying these clauses will use (for quota checks)."""
+    overhead = count_tokens(CLASSIFICATION_PROMPT) + llm.max_tokens("classification")
+    return sum(overhead + count_tokens(text[:2000]) for text in clause_texts)
 
 def classify_clause(clause_text: str) -> ClassificationResult:
     """Classify a single clause using the LLM."""
-    llm = _get_llm()
     prompt = CLASSIFICATION_PROMPT.format(clause_text=clause_text[:2000])
     try:
-        response = llm.invoke(prompt)
-        content = response.content.strip()
-        # Parse JSON from response (handle markdown code blocks)
-        if "```" in content:
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-            content = content.strip()
-        data = json.loads(content)
-        return ClassificationResult(**data)
+        response = llm.invoke(prompt, "classification")
+        return _parse_classification(response.content)
+    except Exception as e:
+        logger.warning("Classification failed for clause: %s", str(e))
+        return ClassificationResult(clause_type="General", importance="Medium", source="fallback")
+
+async def aclassify_clause(clause_text: str) -> ClassificationResult:
+    """Async variant of classify_clause using the LLM's ainvoke."""
+    prompt = CLASSIFICATION_PROMPT.format(clause_text=clause_text[:2000])
+    try:
+        response = await llm.ainvoke(prompt, "classification")
+        return _parse_classification(response.content)
     except Exception as e:
         logger.warning("Classification failed for clause: %s", str(e))
-        return ClassificationResult(clause_type="General", importance="Medium")
+        return ClassificationResult(clause_type="General", importance="Medium", source="fallback")
 
 def classify_clauses(clauses: list[dict]) -> list[ClassificationResult]:
     """Classify a batch of clauses. Processes sequentially to respect rate limits."""
@@ -54,4 +61,13 @@ def classify_clauses(clauses: list[dict]) -> list[ClassificationResult]:
         logger.info("Classifying clause %d/%d: %s", i + 1, len(clauses), clause.get("clause_id", ""))
         result = classify_clause(clause["text"])
         results.append(result)
-    return results
\ No newline at end of file
+    return results
+
+async def aclassify_clauses(clauses: list[dict]) -> list[ClassificationResult]:
+    """Async variant of classify_clauses. Still sequential to respect rate limits."""
+    results = []
+    for i, clause in enumerate(clauses):
+        logger.info("Classifying clause %d/%d: %s", i + 1, len(clauses), clause.get("clause_id", ""))
+        result = await aclassify_clause(clause["text"])
+        results.append(result)
+    return results
@@ -0,0 +1,139 @@
+"""Token-aware context packing for RAG prompts.
+
+Retrieved chunks of the same section (ids ending in "-chunk-<n>", produced by
+segmenter._chunk_text with a character overlap) are merged back together with
+their overlapping spans removed. The merged passages are ranked by retrieval
+score and added to the prompt until the token budget is spent.
+"""
+
+import logging
+import re
+
+from app.services.tokenizer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_ID = re.compile(r"^(?P<base>.+)-chunk-(?P<idx>\d+)$")
+
+# Overlaps shorter than this are treated as coincidence rather than chunk overlap
+_MIN_OVERLAP = 20
+_MAX_OVERLAP = 400
+
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of left that is also a prefix of right."""
+    limit = min(len(left), len(right), _MAX_OVERLAP)
+    for size in range(limit, _MIN_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _group_key(meta: dict) -> tuple[str, str, int]:
+    """(document, section base id, chunk index) for a retrieved clause."""
+    clause_id = meta.get("clause_id", "")
+    match = _CHUNK_ID.match(clause_id)
+    if match:
+        return meta.get("document_id", ""), match["base"], int(match["idx"])
+    return meta.get("document_id", ""), clause_id, 0
+
+
+def merge_chunks(documents: list) -> list[dict]:
+    """
+    Merge retrieved chunks belonging to the same section.
+    Returns passages: {"clause_ids", "metadata", "text", "score"}.
+    """
+    groups: dict[tuple[str, str], list[tuple[int, object]]] = {}
+    for doc in documents:
+        doc_id, base, idx = _group_key(doc.metadata)
+        groups.setdefault((doc_id, base), []).append((idx, doc))
+
+    passages = []
+    for members in groups.values():
+        members.sort(key=lambda m: m[0])
+        first_idx, first_doc = members[0]
+        text = first_doc.page_content
+        clause_ids = [first_doc.metadata.get("clause_id", "unknown")]
+        score = first_doc.metadata.get("score", 0.0)
+        prev_idx = first_idx
+        for idx, doc in members[1:]:
+            if idx == prev_idx:
+                continue  # same chunk retrieved twice
+            if idx == prev_idx + 1:
+                cut = _overlap(text, doc.page_content)
+                text = text + (" " if cut == 0 else "") + doc.page_content[cut:]
+            else:
+                text = text + "\n[...]\n" + doc.page_content
+            clause_ids.append(doc.metadata.get("clause_id", "unknown"))
+            score = max(score, doc.metadata.get("score", 0.0))
+            prev_idx = idx
+        passages.append({
+            "clause_ids": clause_ids,
+            "metadata": first_doc.metadata,
+            "text": text,
+            "score": score,
+        })
+    return passages
+
+
+def format_passage(passage: dict) -> str:
+    """Render one passage the way the QA prompt expects clauses."""
+    meta = passage["metadata"]
+    header = f"[Clause_ID: {passage['clause_ids'][0]}]\n"
+    if len(passage["clause_ids"]) > 1:
+        header += f"Merged chunks: {', '.join(passage['clause_ids'][1:])}\n"
+    return (
+        header
+        + f"Type: {meta.get('clause_type', 'Unknown')} |"
+        f"Risk: {meta.get('risk_level', 'Unknown')} |"
+        f"Page: {meta.get('page', '?')}\n"
+        f"Text: {passage['text']}\n"
+    )
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Trim text so that it fits roughly within max_tokens."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    max_tokens = max(max_tokens - count_tokens(" [...]"), 1)
+    # Proportional cut, then tighten until it fits
+    cut = int(len(text) * max_tokens / max(count_tokens(text), 1))
+    while cut > 0 and count_tokens(text[:cut]) > max_tokens:
+        cut = int(cut * 0.9)
+    return text[:cut].rstrip() + " [...]"
+
+
+def pack_context(documents: list, token_budget: int) -> tuple[str, dict]:
+    """
+    Merge, rank and pack retrieved documents into a context string within token_budget.
+    Returns (context, stats) with the packed token count and passage counts.
+    """
+    separator = "\n---\n"
+    passages = sorted(merge_chunks(documents), key=lambda p: p["score"], reverse=True)
+
+    parts: list[str] = []
+    used = 0
+    dropped = 0
+    for passage in passages:
+        block = format_passage(passage)
+        cost = count_tokens(block) + (count_tokens(separator) if parts else 0)
+        if used + cost <= token_budget:
+            parts.append(block)
+            used += cost
+        elif not parts:
+            # Always include the best passage, trimmed to fit
+            header_cost = count_tokens(format_passage({**passage, "text": ""}))
+            passage = {**passage, "text": _truncate_to_tokens(passage["text"], max(token_budget - header_cost, 1))}
+            parts.append(format_passage(passage))
+            used += count_tokens(parts[-1])
+        else:
+            dropped += 1
+
+    context = separator.join(parts)
+    stats = {
+        "retrieved": len(documents),
+        "passages": len(passages),
+        "dropped": dropped,
+        "packed_tokens": count_tokens(context),
+    }
+    return context, stats
@@ -0,0 +1,174 @@
+"""Near-duplicate clause detection (MinHash + LSH over word shingles).
+
+Standard-form contracts repeat the same boilerplate with different party
+names, dates and numbering, which the exact-text caches miss. Before analysis
+each clause gets a MinHash signature of its word 3-shingles (hashed with
+xxhash), with leading numbering dropped and dates masked. Other numbers
+(amounts, notice periods, caps) stay part of the text, so clauses that differ
+only in them are not treated as duplicates. Signatures of LLM-labeled clauses
+are stored with their LSH band keys in SQLite, so any process (API or
+app.ingest) can look up candidates with one indexed query and verify them by
+estimated Jaccard similarity.
+
+Clauses at or above DEDUP_SIMILARITY_THRESHOLD inherit the labels of their
+match instead of going to the LLM. Shingle overlap cannot tell "shall" from
+"shall not", so keep the threshold high. Matches are limited to the owner's own
+documents, since inherited risk reasons were written about the other clause.
+"""
+
+import logging
+import re
+from typing import Optional
+
+import numpy as np
+import xxhash
+
+from app.core.config import get_settings
+from app.db.database import get_db
+from app.db.repositories import find_clause_signature_candidates, replace_clause_signatures
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS  # LSH candidate threshold ~ (1/16) ** (1/4) = 0.5 Jaccard
+
+_PRIME = np.uint64((1 << 61) - 1)
+_MASK = np.uint64(0xFFFFFFFF)
+_rng = np.random.default_rng(20240901)  # fixed: stored signatures must stay comparable
+_A = _rng.integers(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+_WORD_RE = re.compile(r"\w+")
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+_DAY = r"\d{1,2}(?:st|nd|rd|th)?"
+# "2024-03-01", "01/03/24", "1 March 2024", "March 1st, 2024", "1st day of March, 2024"
+_DATE_RE = re.compile(
+    rf"\b(?:\d{{1,4}}[/.-]\d{{1,2}}[/.-]\d{{2,4}}"
+    rf"|(?:{_DAY}\s+(?:day\s+of\s+)?)?{_MONTH},?\s+(?:{_DAY},?\s+)?\d{{4}})\b",
+    re.IGNORECASE,
+)
+# Leading enumeration such as "12.3", "12.3.", "(a)", "iv)" or "Section 4."
+NUMBERING_RE = re.compile(
+    r"^\s*(?:(?:section|clause|article)\s+)?(?:\d+(?:\.\d+)+\s+|\(?(?:\d+(?:\.\d+)*|[a-z]|[ivxlc]+)[.)]\s*)+",
+    re.IGNORECASE,
+)
+
+
+def _shingles(text: str) -> set[str]:
+    # Drop the clause's own numbering and mask dates; amounts and periods must match
+    words = _WORD_RE.findall(_DATE_RE.sub(" date ", NUMBERING_RE.sub("", text)).lower())
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def signature(text: str) -> Optional[np.ndarray]:
+    """MinHash signature (NUM_PERM uint32 values), or None for text without words."""
+    shingles = _shingles(text)
+    if not shingles:
+        return None
+    hashes = np.fromiter((xxhash.xxh32_intdigest(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # (a*h + b) mod p, truncated to 32 bits; a, h < 2**32 so nothing overflows uint64
+    permuted = ((hashes[:, None] * _A + _B) % _PRIME) & _MASK
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_keys(sig: np.ndarray) -> list[int]:
+    """One signed 64-bit key per LSH band (SQLite INTEGER range)."""
+    keys = []
+    for band in range(BANDS):
+        key = xxhash.xxh64_intdigest(sig[band * ROWS:(band + 1) * ROWS].tobytes(), seed=band)
+        keys.append(key - (1 << 64) if key >= 1 << 63 else key)
+    return keys
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def find_duplicates(
+    clauses: list[dict], owner: str, exclude_document_ids: list[str]
+) -> tuple[dict[str, dict], dict[str, np.ndarray]]:
+    """
+    Match a document's clauses (rows from the clauses table) against the owner's
+    previously labeled clauses (outside exclude_document_ids) and against each other.
+
+    Returns (matches, signatures). matches maps clause_id to
+    {"source", "duplicate_of", "similarity", "labels"}; labels is the matched clause's
+    row for stored matches and None when the match is an earlier clause of
+    this same document, which will be labeled in this run.
+    """
+    signatures = {}
+    for c in clauses:
+        sig = signature(c["text"])
+        if sig is not None:
+            signatures[c["id"]] = sig
+    if not get_settings().dedup_enabled or not signatures:
+        return {}, signatures
+    threshold = get_settings().dedup_similarity_threshold
+    keys = {clause_id: band_keys(sig) for clause_id, sig in signatures.items()}
+
+    conn = get_db()
+    try:
+        candidates = find_clause_signature_candidates(
+            conn, sorted({k for ks in keys.values() for k in ks}), owner, exclude_document_ids,
+        )
+    finally:
+        conn.close()
+    by_key: dict[int, list[dict]] = {}
+    for row in candidates:
+        row["sig"] = np.frombuffer(row.pop("signature"), dtype=np.uint32)
+        for key in row.pop("band_keys"):
+            by_key.setdefault(key, []).append(row)
+
+    matches: dict[str, dict] = {}
+    local_buckets: dict[int, list[str]] = {}
+    for c in clauses:
+        clause_id = c["id"]
+        sig = signatures.get(clause_id)
+        if sig is None:
+            continue
+        best: Optional[dict] = None
+        seen = set()
+        for key in keys[clause_id]:
+            for row in by_key.get(key, ()):
+                if row["clause_id"] in seen:
+                    continue
+                seen.add(row["clause_id"])
+                score = similarity(sig, row["sig"])
+                if score >= threshold and (best is None or score > best["similarity"]):
+                    best = {"source": "duplicate", "duplicate_of": row["clause_id"], "similarity": score, "labels": row}
+        if best is None:
+            # Earlier clauses of this document that will be sent to the LLM
+            for key in keys[clause_id]:
+                for other in local_buckets.get(key, ()):
+                    if other in seen:
+                        continue
+                    seen.add(other)
+                    score = similarity(sig, signatures[other])
+                    if score >= threshold and (best is None or score > best["similarity"]):
+                        best = {"source": "duplicate", "duplicate_of": other, "similarity": score, "labels": None}
+        if best is not None:
+            best["similarity"] = round(best["similarity"], 3)
+            matches[clause_id] = best
+        else:
+            for key in keys[clause_id]:
+                local_buckets.setdefault(key, []).append(clause_id)
+    return matches, signatures
+
+
+def remember(doc_id: str, labeled_ids: list[str], signatures: dict[str, np.ndarray]) -> None:
+    """Store the signatures of a document's LLM-labeled clauses for future matching."""
+    rows = [
+        (clause_id, signatures[clause_id].tobytes(), band_keys(signatures[clause_id]))
+        for clause_id in labeled_ids if clause_id in signatures
+    ]
+    conn = get_db()
+    try:
+        replace_clause_signatures(conn, doc_id, rows)
+    finally:
+        conn.close()
+
@@ -0,0 +1,26 @@
+"""Document lifecycle helpers shared by the API routes."""
+
+import logging
+from pathlib import Path
+
+from app.core.config import get_settings
+from app.db.repositories import delete_document
+from app.services import answer_cache
+from app.services.vector_store import delete_document as delete_document_from_index
+
+logger = logging.getLogger(__name__)
+
+
+def purge_document(conn, doc_id: str) -> None:
+    """Remove a document from the DB, the FAISS index, the answer cache and disk."""
+    # Delete from DB and FAISS
+    delete_document(conn, doc_id)
+    delete_document_from_index(doc_id)
+    answer_cache.invalidate_document(doc_id)
+
+    # Delete PDF file
+    settings = get_settings()
+    pdf_path = Path(settings.upload_dir) / f"{doc_id}.pdf"
+    if pdf_path.exists():
+        pdf_path.unlink()
+        logger.info("Deleted PDF file: %s", pdf_path)
@@ -1,11 +1,46 @@
 """Embedding generation service using local HuggingFace model."""
 
 import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import xxhash
 from langchain_huggingface import HuggingFaceEmbeddings
+from app.core import metrics
+from app.core.tracing import traced
 from app.core.config import get_settings
+from app.services.embedding_batcher import EmbeddingBatcher
 
 logger = logging.getLogger(__name__)
 _embeddings_model = None
+_batcher: EmbeddingBatcher | None = None
+_batcher_lock = threading.Lock()
+
+# Persistent embedding cache: (model, text hash) -> packed float32 vector
+_CREATE_CACHE_SQL = """
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    PRIMARY KEY (model, text_hash)
+);
+"""
+# Stay well below SQLite's host-parameter limit when looking up hashes
+_LOOKUP_BATCH = 500
+
+_cache_lock = threading.Lock()
+_cache_initialized = False
+_cache_stats = {"hits": 0, "misses": 0}
+
+# In-process LRU for query embeddings (questions repeat far more than clauses)
+_query_cache: OrderedDict[str, list[float]] = OrderedDict()
+_query_cache_lock = threading.Lock()
+_query_cache_stats = {"hits": 0, "misses": 0}
+
 
 def get_embeddings_model() -> HuggingFaceEmbeddings:
     """Return a cached embeddings model instance."""
@@ -21,12 +56,171 @@ def get_embeddings_model() -> HuggingFaceEmbeddings:
         logger.info("Embedding model loaded successfully")
     return _embeddings_model
 
+
+def get_batcher() -> EmbeddingBatcher:
+    """Return the shared micro-batching embedding worker, starting it on first use."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                settings = get_settings()
+                _batcher = EmbeddingBatcher(
+                    lambda texts: get_embeddings_model().embed_documents(texts),
+                    max_batch_size=settings.embedding_batch_max_size,
+                    window_ms=settings.embedding_batch_window_ms,
+                    torch_threads=settings.embedding_torch_threads,
+                )
+    return _batcher
+
+
+def _encode(texts: list[str]) -> list[list[float]]:
+    """Run texts through the model, via the shared batcher when enabled."""
+    if get_settings().embedding_batch_enabled:
+        return get_batcher().embed(texts)
+    metrics.EMBEDDING_BATCH_SIZE.observe(len(texts))
+    with metrics.EMBEDDING_BATCH_SECONDS.time():
+        return get_embeddings_model().embed_documents(texts)
+
+
+def _text_hash(text: str) -> str:
+    """Stable 128-bit content hash used as the cache key."""
+    return xxhash.xxh3_128_hexdigest(text.encode("utf-8"))
+
+
+def _get_cache_conn() -> sqlite3.Connection:
+    """Open a connection to the embedding cache, creating the table on first use."""
+    global _cache_initialized
+    cache_path = Path(get_settings().embedding_cache_path)
+    if not _cache_initialized:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(cache_path))
+    if not _cache_initialized:
+        conn.executescript(_CREATE_CACHE_SQL)
+        _cache_initialized = True
+    return conn
+
+
+def _load_cached(conn: sqlite3.Connection, model_name: str, hashes: list[str]) -> dict[str, np.ndarray]:
+    """Fetch cached vectors for the given text hashes."""
+    found = {}
+    for i in range(0, len(hashes), _LOOKUP_BATCH):
+        batch = hashes[i:i + _LOOKUP_BATCH]
+        placeholders = ",".join("?" * len(batch))
+        cursor = conn.execute(
+            f"SELECT text_hash, vector FROM embedding_cache WHERE model = ? AND text_hash IN ({placeholders})",
+            (model_name, *batch),
+        )
+        for text_hash, blob in cursor:
+            found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+    return found
+
+
+def _store_cached(conn: sqlite3.Connection, model_name: str, vectors: dict[str, np.ndarray]) -> None:
+    """Write freshly computed vectors to the cache."""
+    conn.executemany(
+        "INSERT OR REPLACE INTO embedding_cache (model, text_hash, dim, vector) VALUES (?, ?, ?, ?)",
+        [(model_name, h, v.shape[0], v.tobytes()) for h, v in vectors.items()],
+    )
+    conn.commit()
+
+
+def get_cache_stats() -> dict:
+    """Return embedding cache hit/miss counters for this process."""
+    with _cache_lock:
+        hits, misses = _cache_stats["hits"], _cache_stats["misses"]
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / total if total else 0.0,
+    }
+
+
+@traced("embed")
 def embed_texts(texts: list[str]) -> list[list[float]]:
-    """Generate embeddings for a list of texts."""
-    model = get_embeddings_model()
-    return model.embed_documents(texts)
+    """
+    Generate embeddings for a list of texts.
+    Vectors are served from the persistent cache where possible; only
+    unseen texts are batched into the model.
+    """
+    if not texts:
+        return []
+
+    model_name = get_settings().embedding_model
+    hashes = [_text_hash(t) for t in texts]
+
+    conn = _get_cache_conn()
+    try:
+        vectors = _load_cached(conn, model_name, list(set(hashes)))
+        # Deduplicate misses so repeated boilerplate is embedded once
+        missing: dict[str, str] = {}
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in vectors:
+                missing.setdefault(text_hash, text)
+
+        if missing:
+            computed = _encode(list(missing.values()))
+            fresh = {
+                text_hash: np.asarray(vector, dtype=np.float32)
+                for text_hash, vector in zip(missing.keys(), computed)
+            }
+            _store_cached(conn, model_name, fresh)
+            vectors.update(fresh)
+    finally:
+        conn.close()
+
+    with _cache_lock:
+        _cache_stats["hits"] += len(texts) - len(missing)
+        _cache_stats["misses"] += len(missing)
 
+    stats = get_cache_stats()
+    logger.info(
+        "Embedded %d texts: %d cache hits, %d computed (lifetime hit rate %.1f%%)",
+        len(texts), len(texts) - len(missing), len(missing), stats["hit_rate"] * 100,
+    )
+    return [vectors[h].tolist() for h in hashes]
+
+
+def get_query_cache_stats() -> dict:
+    """Return query-embedding LRU hit/miss counters for this process."""
+    with _query_cache_lock:
+        hits, misses = _query_cache_stats["hits"], _query_cache_stats["misses"]
+        size = len(_query_cache)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / total if total else 0.0,
+        "size": size,
+    }
+
+
+@traced("embed_query")
 def embed_query(text: str) -> list[float]:
-    """Generate embedding for a single query."""
-    model = get_embeddings_model()
-    return model.embed_query(text)
\ No newline at end of file
+    """Generate embedding for a single query, memoized in an in-process LRU."""
+    with _query_cache_lock:
+        vector = _query_cache.get(text)
+        if vector is not None:
+            _query_cache.move_to_end(text)
+            _query_cache_stats["hits"] += 1
+            return vector
+        _query_cache_stats["misses"] += 1
+
+    vector = _encode([text])[0]
+
+    max_size = get_settings().query_embedding_cache_size
+    with _query_cache_lock:
+        _query_cache[text] = vector
+        _query_cache.move_to_end(text)
+        while len(_query_cache) > max_size:
+            _query_cache.popitem(last=False)
+    return vector
+
+
+metrics.register_cache("embedding", get_cache_stats)
+metrics.register_cache("query_embedding", get_query_cache_stats)
+metrics.register_gauge_callback(
+    "embedding_queue_depth",
+    "Embedding requests waiting for the batch worker",
+    lambda: _batcher.queue_depth() if _batcher is not None else 0,
+)
@@ -0,0 +1,135 @@
+"""Dynamic micro-batching for embedding requests.
+
+Concurrent callers submit texts to a single worker thread, which gathers
+everything that arrives within a short window (up to a maximum batch size)
+and runs one forward pass for the whole group. Each caller gets a Future
+for its own slice of the results.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """Collects embedding requests from many threads into shared model calls."""
+
+    def __init__(
+        self,
+        embed_fn: Callable[[list[str]], list[list[float]]],
+        max_batch_size: int = 64,
+        window_ms: float = 5.0,
+        torch_threads: int = 0,
+    ):
+        self._embed_fn = embed_fn
+        self._max_batch_size = max(1, max_batch_size)
+        self._window = window_ms / 1000.0
+        self._torch_threads = torch_threads
+        self._queue: queue.Queue[tuple[list[str], Future]] = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._stats = {"batches": 0, "texts": 0, "requests": 0, "busy_seconds": 0.0}
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: list[str]) -> Future:
+        """Queue texts for embedding. The Future resolves to one vector per text."""
+        future: Future = Future()
+        if not texts:
+            future.set_result([])
+        else:
+            self._queue.put((texts, future))
+        return future
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        """
+        Embed texts through the batcher and wait for the result.
+        Large inputs are split so interactive queries can interleave with them.
+        """
+        futures = [
+            self.submit(texts[i:i + self._max_batch_size])
+            for i in range(0, len(texts), self._max_batch_size)
+        ]
+        vectors = []
+        for future in futures:
+            vectors.extend(future.result())
+        return vectors
+
+    def queue_depth(self) -> int:
+        """Requests waiting for the worker (approximate)."""
+        return self._queue.qsize()
+
+    def get_stats(self) -> dict:
+        """Return batch counters since startup."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["avg_batch_size"] = stats["texts"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def _configure_threads(self) -> None:
+        if self._torch_threads <= 0:
+            return
+        try:
+            import torch
+            torch.set_num_threads(self._torch_threads)
+            logger.info("Embedding batcher using %d torch threads", self._torch_threads)
+        except ImportError:
+            logger.warning("torch not available, ignoring embedding thread setting")
+
+    def _collect(self) -> list[tuple[list[str], Future]]:
+        """Block for the first request, then gather more until the window or size limit."""
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self._window
+        while size < self._max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self) -> None:
+        self._configure_threads()
+        while True:
+            batch = self._collect()
+            # Identical texts (e.g. the same question from several users) are embedded once
+            unique: dict[str, int] = {}
+            for texts, _ in batch:
+                for text in texts:
+                    unique.setdefault(text, len(unique))
+
+            started = time.perf_counter()
+            try:
+                vectors = self._embed_fn(list(unique))
+            except Exception as e:
+                logger.error("Embedding batch of %d texts failed: %s", len(unique), str(e))
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            elapsed = time.perf_counter() - started
+            metrics.EMBEDDING_BATCH_SIZE.observe(len(unique))
+            metrics.EMBEDDING_BATCH_SECONDS.observe(elapsed)
+
+            for texts, future in batch:
+                future.set_result([vectors[unique[t]] for t in texts])
+
+            with self._stats_lock:
+                self._stats["batches"] += 1
+                self._stats["texts"] += len(unique)
+                self._stats["requests"] += len(batch)
+                self._stats["busy_seconds"] += elapsed
+            logger.debug(
+                "Embedded batch: %d requests, %d unique texts in %.1f ms",
+                len(batch), len(unique), elapsed * 1000,
+            )
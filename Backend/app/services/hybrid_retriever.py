@@ -0,0 +1,137 @@
+"""Hybrid lexical + vector retrieval over clauses.
+
+Dense FAISS results are good at paraphrase but weak on exact legal wording,
+defined terms and section numbers; the SQLite FTS5 index (BM25) is the opposite.
+Both rankings are fused with reciprocal rank fusion. Queries that are clearly
+lexical (quoted phrases, section references) are answered from FTS5 alone,
+without embedding the question.
+"""
+
+import logging
+import re
+from typing import Optional
+
+from langchain_core.documents import Document
+from app.core.config import get_settings
+from app.core.tracing import traced
+from app.db.database import get_db
+from app.db.repositories import search_clauses_fts
+from app.services.vector_store import search as faiss_search
+
+logger = logging.getLogger(__name__)
+
+_QUOTED = re.compile(r'"([^"]{2,})"')
+_SECTION_REF = re.compile(
+    r"\b(?:section|article|clause|schedule|annex)\s+\d+(?:\.\d+)*\b"
+    r"|§\s*\d+(?:\.\d+)*",
+    re.IGNORECASE,
+)
+_WORD = re.compile(r"\w+")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i if in is it its "
+    "me my of on or our should that the their there this to under us was we what "
+    "when where which who why will with would you your".split()
+)
+
+
+def _phrase(text: str) -> Optional[str]:
+    """FTS5 phrase literal for text, or None if it has no searchable words."""
+    words = _WORD.findall(text.lower())
+    return '"' + " ".join(words) + '"' if words else None
+
+
+def lexical_query(question: str) -> Optional[str]:
+    """
+    FTS5 query for a clearly lexical question (quoted phrases or section
+    references, all required), or None if the question should go through
+    hybrid retrieval.
+    """
+    spans = _QUOTED.findall(question) + [m.lstrip("§ ") for m in _SECTION_REF.findall(question)]
+    phrases = [p for p in (_phrase(s) for s in spans) if p]
+    return " AND ".join(phrases) if phrases else None
+
+
+def keyword_query(question: str) -> Optional[str]:
+    """FTS5 OR-query over the non-stopword terms of a free-text question."""
+    terms = [w for w in _WORD.findall(question.lower()) if w not in _STOPWORDS and len(w) > 1]
+    return " OR ".join(f'"{t}"' for t in dict.fromkeys(terms)) if terms else None
+
+
+@traced("fts")
+def lexical_search(match_query: str, k: int, doc_id: Optional[str] = None) -> list[Document]:
+    """BM25 search of the clause full-text index, as Documents shaped like FAISS results."""
+    conn = get_db()
+    try:
+        rows = search_clauses_fts(conn, match_query, k, doc_id)
+    except Exception as e:
+        logger.warning("Full-text search failed for %r: %s", match_query, str(e))
+        return []
+    finally:
+        conn.close()
+    return [
+        Document(
+            page_content=row["text"],
+            metadata={
+                "clause_id": row["clause_id"],
+                "document_id": row["document_id"],
+                "section_title": row["section_title"],
+                "page": row["page"],
+                "clause_type": row["clause_type"] or "Unclassified",
+                "risk_level": row["risk_level"] or "Unknown",
+            },
+        )
+        for row in rows
+    ]
+
+
+def reciprocal_rank_fusion(rankings: list[list[Document]], k: int, rrf_k: int) -> list[Document]:
+    """
+    Fuse ranked result lists: each clause scores sum(1 / (rrf_k + rank)).
+    The fused score replaces metadata["score"]; the top k are returned.
+    """
+    scores: dict[str, float] = {}
+    docs: dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            clause_id = doc.metadata.get("clause_id", "")
+            scores[clause_id] = scores.get(clause_id, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(clause_id, doc)
+
+    fused = []
+    for clause_id in sorted(scores, key=scores.get, reverse=True)[:k]:
+        doc = docs[clause_id]
+        fused.append(Document(
+            page_content=doc.page_content,
+            metadata={**doc.metadata, "score": round(scores[clause_id], 6)},
+        ))
+    return fused
+
+
+def _rank_scored(docs: list[Document], rrf_k: int) -> list[Document]:
+    """Give single-source results the same score scale as fused ones."""
+    return reciprocal_rank_fusion([docs], len(docs), rrf_k)
+
+
+@traced("retrieval")
+def retrieve(question: str, k: int = 5, doc_id: Optional[str] = None) -> list[Document]:
+    """
+    Retrieve the k most relevant clauses for a question, optionally within one document.
+    """
+    settings = get_settings()
+    if not settings.hybrid_retrieval_enabled:
+        return faiss_search(question, k=k, doc_id=doc_id)
+
+    exact = lexical_query(question)
+    if exact:
+        results = lexical_search(exact, k, doc_id)
+        if results:
+            logger.info("Lexical fast path: %d results for %r", len(results), exact)
+            return _rank_scored(results, settings.rrf_k)
+
+    dense = faiss_search(question, k=k, doc_id=doc_id)
+    keywords = keyword_query(question)
+    lexical = lexical_search(keywords, k, doc_id) if keywords else []
+    if not lexical:
+        return dense
+    return reciprocal_rank_fusion([dense, lexical], k, settings.rrf_k)
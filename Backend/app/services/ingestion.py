@@ -0,0 +1,286 @@
+"""Bulk ingestion of many PDFs (multi-file/zip uploads and the offline CLI).
+
+Extraction and segmentation run in a process pool, so throughput scales with
+cores. Parsed documents are written to SQLite in batches (one transaction per
+INGEST_WRITE_BATCH_SIZE documents), embedded once per batch and, optionally,
+analyzed afterwards at bulk LLM priority. Progress and failures are tracked
+per file in an in-memory job record.
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+from typing import BinaryIO, Callable, Optional
+
+from app.core.config import get_settings
+from app.db.database import get_db
+from app.db.repositories import create_documents_with_clauses, get_clauses_by_document, get_document
+from app.services import classifier, risk_scorer, triage, usage
+from app.services.analysis import analyze_document, calls_avoided, split_clauses
+from app.services.ingestion_worker import parse_pdf
+from app.services.vector_store import add_clauses as add_clauses_to_index
+
+logger = logging.getLogger(__name__)
+
+MAX_JOBS = 100  # finished jobs kept for GET /documents/bulk/{job_id}
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_jobs: OrderedDict[str, dict] = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def worker_count() -> int:
+    return get_settings().ingest_workers or os.cpu_count() or 1
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Shared extraction pool. Workers are spawned (not forked) because the server is multi-threaded."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=worker_count(), mp_context=get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# Staging uploads
+
+def stage_pdf(source: BinaryIO) -> tuple[str, Path]:
+    """Copy an uploaded PDF into the upload dir as {doc_id}.pdf."""
+    doc_id = str(uuid.uuid4())
+    path = Path(get_settings().upload_dir) / f"{doc_id}.pdf"
+    with open(path, "wb") as out:
+        shutil.copyfileobj(source, out, length=1024 * 1024)
+    return doc_id, path
+
+
+def list_zip_pdfs(archive: zipfile.ZipFile) -> list[tuple[str, Optional[zipfile.ZipInfo], Optional[str]]]:
+    """
+    (filename, member, error) for each file in a zip archive. Non-PDF and
+    oversized members come back with an error instead of a member; member
+    paths are never used on disk, only their base names as display names.
+    """
+    max_bytes = get_settings().ingest_max_file_bytes
+    entries = []
+    for info in archive.infolist():
+        name = Path(info.filename).name
+        if info.is_dir() or not name or info.filename.startswith("__MACOSX/"):
+            continue
+        if not name.lower().endswith(".pdf"):
+            entries.append((name, None, "Only PDF files are accepted"))
+        elif info.file_size > max_bytes:
+            entries.append((name, None, f"File exceeds {max_bytes} bytes"))
+        else:
+            entries.append((name, info, None))
+    return entries
+
+
+# Jobs
+
+def create_job(username: str, index: bool, analyze: bool) -> dict:
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "username": username,
+        "status": "queued",
+        "index": index,
+        "analyze": analyze,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "finished_at": None,
+        "elapsed_s": None,
+        "error": None,
+        "files": [],
+    }
+    with _jobs_lock:
+        _jobs[job["job_id"]] = job
+        while len(_jobs) > MAX_JOBS:
+            _jobs.popitem(last=False)
+    return job
+
+
+def add_file(job: dict, filename: str, doc_id: Optional[str] = None, error: Optional[str] = None) -> dict:
+    entry = {
+        "filename": filename,
+        "doc_id": None if error else doc_id,
+        "status": "failed" if error else "queued",
+        "page_count": None,
+        "clauses": None,
+        "analysis": None,
+        "llm_calls_avoided": None,
+        "error": error,
+    }
+    job["files"].append(entry)
+    return entry
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is None:
+        return None
+    counts: dict[str, int] = {}
+    for entry in job["files"]:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    return {**job, "total": len(job["files"]), "counts": counts}
+
+
+# Pipeline
+
+def _fail(entry: dict, error: str) -> None:
+    entry["status"] = "failed"
+    entry["error"] = error
+    logger.warning("Ingestion failed for %s: %s", entry["filename"], error)
+
+
+def _store_batch(batch: list[tuple[dict, dict]], username: str, index: bool) -> None:
+    """One SQLite transaction and one embedding pass for a batch of parsed files."""
+    documents = [
+        {
+            "doc_id": entry["doc_id"],
+            "filename": entry["filename"],
+            "uploaded_by": username,
+            "page_count": parsed["page_count"],
+            "clauses": parsed["clauses"],
+        }
+        for entry, parsed in batch
+    ]
+    conn = get_db()
+    try:
+        create_documents_with_clauses(conn, documents)
+    except Exception as e:
+        for entry, _ in batch:
+            _fail(entry, f"Database write failed: {e}")
+        return
+    finally:
+        conn.close()
+    for entry, _ in batch:
+        entry["status"] = "stored"
+
+    if not index:
+        return
+    try:
+        add_clauses_to_index(triage.indexable([
+            {**c, "document_id": d["doc_id"]} for d in documents for c in d["clauses"]
+        ]))
+    except Exception as e:
+        logger.error("Indexing failed for an ingestion batch of %d documents: %s", len(batch), str(e))
+        for entry, _ in batch:
+            entry["error"] = f"Indexing failed: {e}"
+        return
+    for entry, _ in batch:
+        entry["status"] = "indexed"
+
+
+def _analyze(entry: dict, username: str) -> None:
+    doc_id = entry["doc_id"]
+    conn = get_db()
+    try:
+        clause_dicts = get_clauses_by_document(conn, doc_id)
+        doc = get_document(conn, doc_id)
+        split = split_clauses(clause_dicts, doc)
+        texts = [c["text"] for c in split[0]]
+        usage.set_context(user=username, document_id=doc_id)
+        try:
+            usage.check_quota(
+                username, lambda: classifier.estimate_tokens(texts) + risk_scorer.estimate_tokens(texts),
+            )
+        except usage.QuotaExceededError:
+            entry["analysis"] = "skipped: daily LLM token quota exceeded"
+            return
+        results = analyze_document(conn, doc, clause_dicts, split)
+        entry["analysis"] = "done"
+        entry["llm_calls_avoided"] = calls_avoided(results)
+        entry["status"] = "analyzed"
+    except Exception as e:
+        logger.error("Analysis failed for %s: %s", doc_id, str(e))
+        entry["analysis"] = f"failed: {e}"
+    finally:
+        conn.close()
+
+
+def run_job(
+    job: dict,
+    paths: dict[str, Path],
+    on_progress: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Ingest the staged files of a job (doc_id -> path). Blocking; the API runs
+    it as a background task and the CLI calls it directly.
+    """
+    settings = get_settings()
+    started = time.perf_counter()
+    job["status"] = "running"
+    notify = on_progress or (lambda entry: None)
+    entries = {e["doc_id"]: e for e in job["files"] if e["status"] == "queued"}
+    try:
+        pool = get_pool()
+        futures = {pool.submit(parse_pdf, str(paths[doc_id]), doc_id): entry for doc_id, entry in entries.items()}
+        batch: list[tuple[dict, dict]] = []
+        for future in as_completed(futures):
+            entry = futures[future]
+            try:
+                parsed = future.result()
+            except Exception as e:
+                _fail(entry, f"Extraction failed: {e}")
+                notify(entry)
+                continue
+            if not parsed["page_count"]:
+                _fail(entry, "Could not extract any text from PDF")
+                notify(entry)
+                continue
+            entry.update(status="parsed", page_count=parsed["page_count"], clauses=len(parsed["clauses"]))
+            batch.append((entry, parsed))
+            if len(batch) >= settings.ingest_write_batch_size:
+                _store_batch(batch, job["username"], job["index"])
+                for stored, _ in batch:
+                    notify(stored)
+                batch = []
+        if batch:
+            _store_batch(batch, job["username"], job["index"])
+            for stored, _ in batch:
+                notify(stored)
+
+        if job["analyze"]:
+            for entry in entries.values():
+                if entry["status"] in ("stored", "indexed"):
+                    _analyze(entry, job["username"])
+                    notify(entry)
+        job["status"] = "completed"
+    except Exception as e:
+        # e.g. BrokenProcessPool: fail whatever had not been stored yet instead of leaving the job running
+        logger.exception("Ingestion job %s failed", job["job_id"])
+        job.update(status="failed", error=str(e))
+        for entry in entries.values():
+            if entry["status"] in ("queued", "parsed"):
+                _fail(entry, f"Ingestion job failed: {e}")
+                notify(entry)
+    finally:
+        # Files that never made it into the database leave no orphaned upload behind
+        for doc_id, entry in entries.items():
+            if entry["status"] == "failed":
+                paths[doc_id].unlink(missing_ok=True)
+        elapsed = time.perf_counter() - started
+        job.update(finished_at=datetime.now(timezone.utc).isoformat(), elapsed_s=round(elapsed, 3))
+
+    summary = get_job(job["job_id"])
+    logger.info(
+        "Ingestion job %s finished in %.1fs: %s", job["job_id"], elapsed, summary["counts"],
+    )
+    return summary
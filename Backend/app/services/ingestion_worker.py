@@ -0,0 +1,20 @@
+"""Process-pool entry point for bulk ingestion.
+
+Kept import-light (pdfplumber, the segmenter and the keyword engine only) so spawned worker
+processes never load the embedding model, FAISS or the LLM clients.
+"""
+
+from pathlib import Path
+
+from app.services.pdf_extractor import extract_pages
+from app.services.risk_lexicon import provisional_risk
+from app.services.segmenter import segment_document
+
+
+def parse_pdf(path: str, doc_id: str) -> dict:
+    """Extract and segment one PDF. Returns {"page_count", "clauses"} as plain dicts."""
+    pages = extract_pages(Path(path))
+    clauses = segment_document(pages, doc_id) if pages else []
+    for clause, level in zip(clauses, provisional_risk([c.text for c in clauses])):
+        clause.provisional_risk = level
+    return {"page_count": len(pages), "clauses": [c.model_dump() for c in clauses]}
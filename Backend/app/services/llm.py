@@ -0,0 +1,136 @@
+"""Central entry point for every Groq LLM call.
+
+Services call invoke / ainvoke / astream with a prompt type ("classification",
+"risk", "qa", "summary") instead of holding their own ChatGroq. One client is
+kept per prompt type (they differ only in max_tokens), and every call records
+latency, token usage and errors per prompt type, and adds a row to the usage
+ledger (app.services.usage). Calls wait for a slot from app.services.llm_scheduler,
+which dispatches interactive prompts ahead of bulk analysis.
+"""
+
+import logging
+import threading
+import time
+from typing import AsyncIterator
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_groq import ChatGroq
+from app.core import metrics, tracing
+from app.core.config import get_settings
+from app.services import llm_scheduler, usage
+from app.services.tokenizer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+_clients: dict[str, ChatGroq] = {}
+_clients_lock = threading.Lock()
+
+
+def max_tokens(prompt_type: str) -> int:
+    """Completion token limit for a prompt type."""
+    if prompt_type == "qa":
+        return 1000
+    if prompt_type == "summary":
+        return get_settings().chat_summary_max_tokens
+    return 200
+
+
+def get_llm(prompt_type: str) -> ChatGroq:
+    """Return the shared client for a prompt type (created on first use)."""
+    client = _clients.get(prompt_type)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(prompt_type)
+            if client is None:
+                settings = get_settings()
+                client = ChatGroq(
+                    api_key=settings.groq_api_key,
+                    model_name=settings.llm_model,
+                    base_url=settings.llm_base_url,
+                    temperature=0,
+                    max_tokens=max_tokens(prompt_type),
+                )
+                _clients[prompt_type] = client
+    return client
+
+
+def _usage(prompt: str, message, completion: str) -> tuple[int, int]:
+    """(prompt tokens, completion tokens), estimated when the provider reports none."""
+    usage = getattr(message, "usage_metadata", None) if message is not None else None
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    return count_tokens(prompt), count_tokens(completion)
+
+
+def _cost(prompt: str, prompt_type: str) -> int:
+    """Approximate tokens a call will use, for fair queuing."""
+    return len(prompt) // 4 + max_tokens(prompt_type)
+
+
+def _record(prompt_type: str, started: float, prompt_tokens: int, completion_tokens: int) -> None:
+    metrics.LLM_LATENCY.observe(time.perf_counter() - started, prompt_type=prompt_type)
+    metrics.LLM_TOKENS.inc(prompt_tokens, prompt_type=prompt_type, direction="prompt")
+    metrics.LLM_TOKENS.inc(completion_tokens, prompt_type=prompt_type, direction="completion")
+    usage.record(prompt_type, prompt_tokens, completion_tokens)
+
+
+def _record_error(prompt_type: str, error: Exception) -> None:
+    metrics.LLM_ERRORS.inc(prompt_type=prompt_type, error=type(error).__name__)
+
+
+def invoke(prompt: str, prompt_type: str) -> AIMessage:
+    """Blocking LLM call."""
+    with llm_scheduler.sync_slot(prompt_type, _cost(prompt, prompt_type)):
+        return _invoke(prompt, prompt_type)
+
+
+def _invoke(prompt: str, prompt_type: str) -> AIMessage:
+    started = time.perf_counter()
+    try:
+        with tracing.span(f"llm.{prompt_type}"):
+            message = get_llm(prompt_type).invoke(prompt)
+    except Exception as e:
+        _record_error(prompt_type, e)
+        raise
+    _record(prompt_type, started, *_usage(prompt, message, message.content))
+    return message
+
+
+async def ainvoke(prompt: str, prompt_type: str) -> AIMessage:
+    """Async LLM call."""
+    async with llm_scheduler.slot(prompt_type, _cost(prompt, prompt_type)):
+        return await _ainvoke(prompt, prompt_type)
+
+
+async def _ainvoke(prompt: str, prompt_type: str) -> AIMessage:
+    started = time.perf_counter()
+    try:
+        with tracing.span(f"llm.{prompt_type}"):
+            message = await get_llm(prompt_type).ainvoke(prompt)
+    except Exception as e:
+        _record_error(prompt_type, e)
+        raise
+    _record(prompt_type, started, *_usage(prompt, message, message.content))
+    return message
+
+
+async def astream(prompt: str, prompt_type: str) -> AsyncIterator[AIMessageChunk]:
+    """
+    Stream completion chunks; usage is taken from the final chunk when reported.
+    The dispatch slot is held until the stream ends.
+    """
+    async with llm_scheduler.slot(prompt_type, _cost(prompt, prompt_type)):
+        started = time.perf_counter()
+        parts: list[str] = []
+        usage_chunk = None
+        try:
+            with tracing.span(f"llm.{prompt_type}"):
+                async for chunk in get_llm(prompt_type).astream(prompt):
+                    if getattr(chunk, "usage_metadata", None):
+                        usage_chunk = chunk
+                    parts.append(chunk.content if isinstance(chunk.content, str) else "")
+                    yield chunk
+        except Exception as e:
+            _record_error(prompt_type, e)
+            raise
+        _record(prompt_type, started, *_usage(prompt, usage_chunk, "".join(parts)))
@@ -0,0 +1,278 @@
+"""Priority dispatch for LLM calls.
+
+Every call made through app.services.llm takes one of LLM_MAX_CONCURRENCY slots
+before it reaches Groq. Waiting calls are ordered by:
+
+- priority class: interactive prompts (chat answers, history summaries) always
+  dispatch before bulk prompts (clause classification, risk scoring), and bulk
+  work may never hold the LLM_INTERACTIVE_RESERVED_SLOTS slots kept for chat;
+- weighted fair queuing across users within a class (start-time fair queuing on
+  estimated tokens), so one user's 500-clause analysis cannot starve another's.
+
+Admission control watches the interactive latency (queue wait + call) against
+LLM_INTERACTIVE_SLO_SECONDS. While the recent p90 is at risk, bulk work is
+throttled to LLM_BULK_DEGRADED_SLOTS (at least one, so bulk always makes
+progress) and new bulk jobs are shed (admit_bulk
+raises) once LLM_BULK_SHED_QUEUE_DEPTH bulk calls are already waiting.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, Optional
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.services import usage
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+
+PROMPT_PRIORITY = {
+    "qa": INTERACTIVE,
+    "summary": INTERACTIVE,
+    "classification": BULK,
+    "risk": BULK,
+}
+
+_SLO_WINDOW_SECONDS = 60.0
+_SLO_MIN_SAMPLES = 5
+# Waiters re-run dispatch this often, so bulk work resumes when the SLO window
+# clears even if no other call starts or finishes
+_RECHECK_SECONDS = 1.0
+
+QUEUE_DEPTH = metrics.gauge("llm_queue_depth", "LLM calls waiting for a dispatch slot", ("priority",))
+IN_FLIGHT = metrics.gauge("llm_in_flight", "LLM calls holding a dispatch slot", ("priority",))
+QUEUE_WAIT = metrics.histogram(
+    "llm_queue_wait_seconds", "Time LLM calls waited for a dispatch slot", ("priority",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+SHED = metrics.counter("llm_bulk_jobs_shed_total", "Bulk jobs rejected by admission control")
+
+
+class LLMOverloadedError(Exception):
+    """Raised by admit_bulk when bulk work is being shed to protect chat latency."""
+
+
+class _Waiter:
+    __slots__ = ("priority", "user", "enqueued", "event", "loop", "future", "granted", "cancelled")
+
+    def __init__(self, priority: str, user: str):
+        self.priority = priority
+        self.user = user
+        self.enqueued = time.perf_counter()
+        self.event: Optional[threading.Event] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.future: Optional[asyncio.Future] = None
+        self.granted = False
+        self.cancelled = False
+
+
+class _ClassQueue:
+    """Start-time fair queue for one priority class."""
+
+    def __init__(self):
+        self.heap: list[tuple[float, int, _Waiter]] = []
+        self.virtual_time = 0.0
+        self.last_finish: dict[str, float] = {}
+        self.waiting = 0
+        self.in_flight = 0
+
+    def push(self, waiter: _Waiter, cost: float, weight: float, seq: int) -> None:
+        start = max(self.virtual_time, self.last_finish.get(waiter.user, 0.0))
+        self.last_finish[waiter.user] = start + cost / weight
+        heapq.heappush(self.heap, (start, seq, waiter))
+        self.waiting += 1
+
+    def pop(self) -> Optional[_Waiter]:
+        while self.heap:
+            start, _, waiter = heapq.heappop(self.heap)
+            if waiter.cancelled:
+                continue
+            self.waiting -= 1
+            self.virtual_time = start
+            if not self.heap:
+                self.last_finish.clear()
+            return waiter
+        return None
+
+
+_lock = threading.Lock()
+_queues = {p: _ClassQueue() for p in PRIORITIES}
+_seq = itertools.count()
+_interactive_latencies: deque = deque(maxlen=200)  # (finished_at, seconds)
+
+
+def _slo_at_risk_locked() -> bool:
+    cutoff = time.monotonic() - _SLO_WINDOW_SECONDS
+    recent = sorted(s for t, s in _interactive_latencies if t >= cutoff)
+    if len(recent) < _SLO_MIN_SAMPLES:
+        return False
+    p90 = recent[min(len(recent) - 1, int(len(recent) * 0.9))]
+    return p90 > get_settings().llm_interactive_slo_seconds
+
+
+def slo_at_risk() -> bool:
+    """True while recent interactive LLM latency (p90) exceeds the SLO."""
+    with _lock:
+        return _slo_at_risk_locked()
+
+
+def _bulk_limit_locked() -> int:
+    settings = get_settings()
+    if _slo_at_risk_locked():
+        return max(settings.llm_bulk_degraded_slots, 1)
+    return max(settings.llm_max_concurrency - settings.llm_interactive_reserved_slots, 1)
+
+
+def _update_gauges_locked() -> None:
+    for priority, queue in _queues.items():
+        QUEUE_DEPTH.set(queue.waiting, priority=priority)
+        IN_FLIGHT.set(queue.in_flight, priority=priority)
+
+
+def _grant(waiter: _Waiter) -> None:
+    waiter.granted = True
+    _queues[waiter.priority].in_flight += 1
+    QUEUE_WAIT.observe(time.perf_counter() - waiter.enqueued, priority=waiter.priority)
+    if waiter.event is not None:
+        waiter.event.set()
+    else:
+        waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def _dispatch_locked() -> None:
+    """Hand free slots to waiters: interactive first, then bulk up to its limit."""
+    interactive, bulk = _queues[INTERACTIVE], _queues[BULK]
+    free = get_settings().llm_max_concurrency - interactive.in_flight - bulk.in_flight
+    bulk_limit = None
+    while free > 0:
+        waiter = interactive.pop()
+        if waiter is None:
+            if bulk_limit is None:
+                bulk_limit = _bulk_limit_locked()
+            if bulk.in_flight >= bulk_limit:
+                break
+            waiter = bulk.pop()
+            if waiter is None:
+                break
+        _grant(waiter)
+        free -= 1
+    _update_gauges_locked()
+
+
+def _enqueue(priority: str, cost: float) -> _Waiter:
+    user = usage.current_user() or ""
+    waiter = _Waiter(priority, user)
+    weight = get_settings().llm_user_weights.get(user, 1.0) or 1.0
+    _queues[priority].push(waiter, max(cost, 1.0), weight, next(_seq))
+    return waiter
+
+
+def _release(waiter: _Waiter) -> None:
+    finished = time.perf_counter()
+    with _lock:
+        _queues[waiter.priority].in_flight -= 1
+        if waiter.priority == INTERACTIVE:
+            _interactive_latencies.append((time.monotonic(), finished - waiter.enqueued))
+        _dispatch_locked()
+
+
+@asynccontextmanager
+async def slot(prompt_type: str, cost: float) -> AsyncIterator[None]:
+    """Hold a dispatch slot for the duration of an async LLM call."""
+    if not get_settings().llm_scheduler_enabled:
+        yield
+        return
+    waiter_loop = asyncio.get_running_loop()
+    with _lock:
+        waiter = _enqueue(PROMPT_PRIORITY.get(prompt_type, INTERACTIVE), cost)
+        waiter.loop = waiter_loop
+        waiter.future = waiter_loop.create_future()
+        _dispatch_locked()
+    try:
+        while not waiter.future.done():
+            await asyncio.wait({waiter.future}, timeout=_RECHECK_SECONDS)
+            if not waiter.future.done():
+                with _lock:
+                    _dispatch_locked()
+    except asyncio.CancelledError:
+        with _lock:
+            granted = waiter.granted
+            if not granted:
+                waiter.cancelled = True
+                _queues[waiter.priority].waiting -= 1
+                _update_gauges_locked()
+        if granted:
+            _release(waiter)
+        raise
+    try:
+        yield
+    finally:
+        _release(waiter)
+
+
+@contextmanager
+def sync_slot(prompt_type: str, cost: float) -> Iterator[None]:
+    """Hold a dispatch slot for the duration of a blocking LLM call."""
+    if not get_settings().llm_scheduler_enabled:
+        yield
+        return
+    with _lock:
+        waiter = _enqueue(PROMPT_PRIORITY.get(prompt_type, INTERACTIVE), cost)
+        waiter.event = threading.Event()
+        _dispatch_locked()
+    while not waiter.event.wait(_RECHECK_SECONDS):
+        with _lock:
+            _dispatch_locked()
+    try:
+        yield
+    finally:
+        _release(waiter)
+
+
+def admit_bulk() -> None:
+    """
+    Admission check before starting a bulk job (e.g. analyzing a document).
+    Raises LLMOverloadedError while chat latency is at risk and bulk calls are
+    already backed up.
+    """
+    settings = get_settings()
+    if not settings.llm_scheduler_enabled:
+        return
+    with _lock:
+        at_risk = _slo_at_risk_locked()
+        waiting = _queues[BULK].waiting
+    if at_risk and waiting >= settings.llm_bulk_shed_queue_depth:
+        SHED.inc()
+        logger.warning("Shedding bulk LLM job: chat latency over SLO and %d bulk calls queued", waiting)
+        raise LLMOverloadedError("LLM capacity is reserved for interactive requests; retry later")
+
+
+def get_stats() -> dict:
+    with _lock:
+        return {
+            "slo_at_risk": _slo_at_risk_locked(),
+            "bulk_limit": _bulk_limit_locked(),
+            **{f"{p}_waiting": q.waiting for p, q in _queues.items()},
+            **{f"{p}_in_flight": q.in_flight for p, q in _queues.items()},
+        }
+
+
+metrics.register_gauge_callback(
+    "llm_interactive_slo_at_risk", "1 while recent interactive LLM latency exceeds the SLO",
+    lambda: int(slo_at_risk()),
+)
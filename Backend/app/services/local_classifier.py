@@ -0,0 +1,222 @@
+"""Local clause-type classifier over clause embeddings (nearest centroid).
+
+Clause types are a fixed taxonomy and every clause already has a MiniLM
+vector, so clauses the LLM has classified are kept as per-type vector sums.
+Bootstrapped from the clauses table on first use and updated after every
+analysis. A new clause goes to its most similar type centroid (one small
+matrix product). It is sent to classify_clause instead when the margin over the
+runner-up is below LOCAL_CLASSIFIER_MIN_MARGIN, or the type has fewer than
+LOCAL_CLASSIFIER_MIN_EXAMPLES examples. Importance is the type's most common
+LLM importance.
+
+Agreement with the LLM is measured on escalated clauses that had a
+prediction, and on a LOCAL_CLASSIFIER_SHADOW_RATE sample of confident
+predictions that still go to the LLM, for an unbiased estimate.
+"""
+
+import logging
+import random
+import threading
+from collections import Counter
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.db.database import get_db
+from app.db.repositories import get_llm_labeled_clauses
+from app.models.query import ClassificationResult
+from app.services.vector_store import get_clause_vectors
+
+logger = logging.getLogger(__name__)
+
+AGREEMENT = metrics.counter(
+    "local_classifier_agreement_total",
+    "Local clause-type predictions checked against the LLM, by margin (confident/low) and result",
+    ("margin", "result"),
+)
+
+
+class Prediction(NamedTuple):
+    clause_type: str
+    importance: str
+    margin: float
+    use: bool  # confident enough to skip the LLM (False for shadow samples)
+
+
+_lock = threading.Lock()
+_sums: dict[str, np.ndarray] = {}
+_counts: dict[str, int] = {}
+_importance: dict[str, Counter] = {}
+_learned: set[str] = set()
+_loaded = False
+_centroids: Optional[tuple[list[str], np.ndarray]] = None
+_stats = {"local": 0, "escalated": 0, "shadow": 0}
+_agreement = {"confident": [0, 0], "low": [0, 0]}  # [agree, checked]
+
+
+def _learn_locked(ids: list[str], vectors: np.ndarray, labels: list[ClassificationResult]) -> int:
+    global _centroids
+    added = 0
+    for clause_id, vector, label in zip(ids, vectors, labels):
+        if clause_id in _learned:
+            continue
+        _learned.add(clause_id)
+        if label.clause_type in _sums:
+            _sums[label.clause_type] += vector
+        else:
+            _sums[label.clause_type] = vector.astype(np.float64)
+        _counts[label.clause_type] = _counts.get(label.clause_type, 0) + 1
+        _importance.setdefault(label.clause_type, Counter())[label.importance] += 1
+        added += 1
+    if added:
+        _centroids = None
+    return added
+
+
+def _ensure_loaded() -> None:
+    """Train on the LLM-labeled clauses already in the database (once per process)."""
+    global _loaded
+    if _loaded:
+        return
+    conn = get_db()
+    try:
+        rows = get_llm_labeled_clauses(conn, get_settings().local_classifier_max_training)
+    finally:
+        conn.close()
+    vectors = get_clause_vectors(rows) if rows else None
+    with _lock:
+        if _loaded:
+            return
+        if rows:
+            labels = [ClassificationResult(clause_type=r["clause_type"], importance=r["importance"]) for r in rows]
+            _learn_locked([r["id"] for r in rows], vectors, labels)
+        _loaded = True
+    logger.info("Local classifier trained on %d clauses across %d types", len(_learned), len(_counts))
+
+
+def _get_centroids() -> tuple[list[str], np.ndarray]:
+    """Caller holds the lock."""
+    global _centroids
+    if _centroids is None:
+        types = sorted(_sums)
+        if not types:
+            return types, np.zeros((0, 0), dtype=np.float32)
+        matrix = np.vstack([_sums[t] for t in types])
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        _centroids = (types, matrix.astype(np.float32))
+    return _centroids
+
+
+def predict(vectors: np.ndarray) -> list[Optional[Prediction]]:
+    """Nearest-centroid type for each vector, or None while the model cannot tell."""
+    settings = get_settings()
+    with _lock:
+        types, centroids = _get_centroids()
+        counts = dict(_counts)
+        importance = {t: c.most_common(1)[0][0] for t, c in _importance.items()}
+    if len(types) < 2 or not len(vectors):
+        return [None] * len(vectors)
+    similarity = vectors @ centroids.T
+    top2 = np.argsort(-similarity, axis=1)[:, :2]
+    predictions = []
+    for row, (best, second) in zip(similarity, top2):
+        clause_type = types[best]
+        margin = float(row[best] - row[second])
+        use = margin >= settings.local_classifier_min_margin and counts[clause_type] >= settings.local_classifier_min_examples
+        predictions.append(Prediction(clause_type, importance[clause_type], round(margin, 4), use))
+    return predictions
+
+
+def predict_clauses(clauses: list[dict]) -> tuple[list[Optional[Prediction]], np.ndarray]:
+    """
+    Predictions for clauses (dicts with id and text) plus their vectors. With the
+    classifier disabled every prediction is None and the LLM classifies everything.
+    """
+    settings = get_settings()
+    if not settings.local_classifier_enabled or not clauses:
+        return [None] * len(clauses), np.zeros((0, 0), dtype=np.float32)
+    _ensure_loaded()
+    vectors = get_clause_vectors(clauses)
+    predictions = predict(vectors)
+    for i, p in enumerate(predictions):
+        if p is not None and p.use and random.random() < settings.local_classifier_shadow_rate:
+            predictions[i] = p._replace(use=False)
+            with _lock:
+                _stats["shadow"] += 1
+    return predictions, vectors
+
+
+def needs_llm(predictions: list[Optional[Prediction]]) -> list[int]:
+    """Positions of the clauses to send to the LLM."""
+    return [i for i, p in enumerate(predictions) if p is None or not p.use]
+
+
+def resolve(
+    clauses: list[dict],
+    vectors: np.ndarray,
+    predictions: list[Optional[Prediction]],
+    llm_results: list[ClassificationResult],
+) -> tuple[list[ClassificationResult], list[str]]:
+    """
+    Merge local predictions with the LLM results for the escalated clauses (in
+    needs_llm order). Returns (classification per clause, type source per clause),
+    records agreement and learns from the new LLM labels (never from the
+    placeholder labels of failed LLM calls).
+    """
+    escalated = dict(zip(needs_llm(predictions), llm_results))
+    results, sources = [], []
+    learn_ids, learn_rows, learn_labels = [], [], []
+    checks = []
+    for i, (clause, p) in enumerate(zip(clauses, predictions)):
+        if i not in escalated:
+            results.append(ClassificationResult(clause_type=p.clause_type, importance=p.importance))
+            sources.append("local")
+            continue
+        label = escalated[i]
+        results.append(label)
+        sources.append(label.source)
+        if label.source == "fallback":
+            # The LLM call failed; its placeholder label is not evidence either way
+            continue
+        if p is not None:
+            # Shadow samples are confident predictions that went to the LLM anyway
+            confident = p.margin >= get_settings().local_classifier_min_margin
+            checks.append(("confident" if confident else "low", p.clause_type == label.clause_type))
+        if len(vectors):
+            learn_ids.append(clause["id"])
+            learn_rows.append(i)
+            learn_labels.append(label)
+
+    local = sources.count("local")
+    with _lock:
+        if learn_rows:
+            _learn_locked(learn_ids, vectors[learn_rows], learn_labels)
+        _stats["local"] += local
+        _stats["escalated"] += len(escalated)
+        for margin, agreed in checks:
+            _agreement[margin][0] += agreed
+            _agreement[margin][1] += 1
+    for margin, agreed in checks:
+        AGREEMENT.inc(margin=margin, result="agree" if agreed else "disagree")
+    if local:
+        metrics.LLM_CALLS_AVOIDED.inc(local, reason="local_classifier")
+    return results, sources
+
+
+def get_stats() -> dict:
+    settings = get_settings()
+    with _lock:
+        agreement = {
+            margin: {"checked": checked, "agreement": round(agree / checked, 4) if checked else None}
+            for margin, (agree, checked) in _agreement.items()
+        }
+        return {
+            "enabled": settings.local_classifier_enabled,
+            "min_margin": settings.local_classifier_min_margin,
+            "examples": len(_learned),
+            "types": dict(sorted(_counts.items())),
+            **_stats,
+            "agreement": agreement,
+        }
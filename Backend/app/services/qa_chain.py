@@ -1,12 +1,18 @@
 """RAG question-answering chain using FAISS retrieval + Groq LLM."""
 
+import asyncio
 import json
 import logging
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-from langchain_groq import ChatGroq
 from app.core.config import get_settings
-from app.services.vector_store import search as faiss_search
+from app.core.tracing import traced
+from app.services import llm
+from app.services.hybrid_retriever import lexical_query, retrieve
+from app.services.embedding import embed_query
+from app.services import answer_cache
+from app.services.context_packer import pack_context
+from app.services.tokenizer import count_tokens
 from app.models.query import QueryResponse
 logger = logging.getLogger(__name__)
 
@@ -35,17 +41,36 @@ Return a JSON object with exactly these fields:
 Return ONLY valid JSON, no other text.
 """
 
-def get_llm() -> ChatGroq: 
-    settings = get_settings()
-    return ChatGroq(
-        api_key=settings.groq_api_key,
-        model_name=settings.llm_model,
-        temperature=0,
-        max_tokens=1000
-    )
+# Streaming variant: prose first so tokens can be forwarded as they arrive,
+# then the structured fields after a marker line.
+STREAM_META_MARKER = "###META###"
 
-def _format_context(documents: list) -> str:
-    """Format retrieved FAISS documents into a context string for the LLM."""
+STREAM_QA_PROMPT = """You are a legal analyst. Answer the user's question based ONLY on the provided legal clauses below.
+
+Rules:
+- Only use information from the provided clauses — do NOT make up information
+- Cite specific clause IDs in your answer
+- If the clauses don't contain enough information, say so clearly
+- Assess the overall risk based on the clauses found
+- Use the conversation history to understand follow-up questions
+
+Provided clauses:
+{context}
+
+{history_section}
+
+User question: {question}
+
+First write your detailed answer as plain text (cite only the section title part and not the complete id).
+Then, on a new line, write the marker """ + STREAM_META_MARKER + """ followed by a JSON object with exactly these fields:
+- "referenced_clauses": list of clause IDs you referenced
+- "overall_risk": one of ["Low", "Medium", "High"] based on the relevant clauses
+- "confidence": a float between 0.0 and 1.0 indicating how confident you are
+"""
+
+
+def _format_context_raw(documents: list) -> str:
+    """Concatenate retrieved clauses verbatim (used to measure packing savings in debug logs)."""
     parts = []
     for doc in documents:
         meta = doc.metadata
@@ -58,67 +83,275 @@ def _format_context(documents: list) -> str:
         )
     return "\n---\n".join(parts)
 
+def _format_context(documents: list) -> str:
+    """Format retrieved FAISS documents into a token-budgeted context string for the LLM."""
+    budget = get_settings().context_token_budget
+    context, stats = pack_context(documents, budget)
+    logger.info(
+        "Packed %d retrieved clauses into %d passages: %d tokens (dropped %d)",
+        stats["retrieved"], stats["passages"], stats["packed_tokens"], stats["dropped"],
+    )
+    if logger.isEnabledFor(logging.DEBUG):
+        # Tokenizing the unpacked context costs as much as packing it, so only when asked
+        raw_tokens = count_tokens(_format_context_raw(documents))
+        logger.debug(
+            "Context packing saved %d tokens (%d unpacked)", raw_tokens - stats["packed_tokens"], raw_tokens,
+        )
+    return context
+
+@traced("answer_cache")
+def _lookup_answer_cache(
+    question: str,
+    doc_id: Optional[str],
+    has_history: bool,
+) -> tuple[Optional[list[float]], Optional[QueryResponse]]:
+    """
+    Serve near-identical standalone questions from the answer cache.
+    Follow-ups depend on conversation history, so they always go to the LLM, and
+    exact-wording questions skip the cache (and the embedding) entirely.
+    Returns (question vector or None if caching is off, cached response or None).
+    """
+    if not get_settings().answer_cache_enabled or has_history or lexical_query(question):
+        return None, None
+    question_vector = embed_query(question)
+    return question_vector, answer_cache.lookup(question_vector, doc_id)
+
+
+def _no_results_response() -> QueryResponse:
+    return QueryResponse(
+        answer="No relevant clauses found for your question. Please upload and analyze a document first.",
+        referenced_clauses=[],
+        overall_risk="Low",
+        confidence=0.0,
+    )
+
+
+@traced("prompt")
+def _build_prompt(
+    question: str,
+    results: list,
+    conversation_history: Optional[list],
+    template: str = QA_PROMPT,
+    history_summary: Optional[str] = None,
+) -> str:
+    """Build the QA prompt from retrieved clauses and conversation history."""
+    context = _format_context(results)
+
+    # Format conversation history
+    history_section = ""
+    if history_summary:
+        history_section = "Summary of earlier conversation:\n" + history_summary + "\n\n"
+    if conversation_history:
+        history_lines = []
+        for msg in conversation_history:
+            role = "User" if msg["role"] == "user" else "Assistant"
+            history_lines.append(f"{role}: {msg['content']}")
+        history_section += "Conversation history:\n" + "\n".join(history_lines)
+
+    return template.format(context=context, question=question, history_section=history_section)
+
+
+def _parse_answer(content: str) -> QueryResponse:
+    """Parse the LLM's JSON answer (handles markdown code blocks)."""
+    content = content.strip()
+    if "```" in content:
+        content = content.split("```")[1]
+        if content.startswith("json"):
+            content = content[4:]
+        content = content.strip()
+    return QueryResponse(**json.loads(content))
+
+
+def _fallback_response(results: list) -> QueryResponse:
+    """Graceful answer when the LLM call or its parsing fails."""
+    clause_ids = [r.metadata.get("clause_id", "") for r in results]
+    return QueryResponse(
+        answer=f"I found {len(results)} relevant clauses but encountered an error generating the answer.",
+        referenced_clauses=clause_ids,
+        overall_risk="Medium",
+        confidence=0.2,
+    )
+
+
+def _remember_answer(
+    question_vector: Optional[list[float]],
+    doc_id: Optional[str],
+    response: QueryResponse,
+    results: list,
+) -> None:
+    if question_vector is None:
+        return
+    doc_ids = {r.metadata.get("document_id", "") for r in results}
+    answer_cache.store(question_vector, doc_id, response, doc_ids)
+
+
+def estimate_tokens(question: str, with_history: bool = False) -> int:
+    """Upper bound on the tokens answering a question will use (for quota checks)."""
+    settings = get_settings()
+    tokens = count_tokens(QA_PROMPT) + count_tokens(question) + settings.context_token_budget
+    if with_history:
+        tokens += settings.chat_history_token_budget
+    return tokens + llm.max_tokens("qa")
+
+
 def ask_question(
     question: str,
     top_k: int = 5,
     doc_id: Optional[str] = None,
     conversation_history: list = None,
+    history_summary: Optional[str] = None,
 ) -> QueryResponse:
     """Answer a question using RAG with conversation memory.
     If doc_id is provided, only search within that document."""
 
-    # Step 1: Retrieve from FAISS
-    # Fetch extra results if filtering by doc_id
-    fetch_k = top_k * 3 if doc_id else top_k
-    results = faiss_search(question, k=fetch_k)
+    # Step 0: Semantic answer cache
+    question_vector, cached = _lookup_answer_cache(
+        question, doc_id, bool(conversation_history or history_summary)
+    )
+    if cached is not None:
+        return cached
 
-    # Step 2: Filter by document if specified
-    if doc_id:
-        results = [r for r in results if r.metadata.get("document_id") == doc_id][:top_k]
+    # Step 1: Retrieve from FAISS (scoped to doc_id if specified)
+    results = retrieve(question, k=top_k, doc_id=doc_id)
     if not results:
-        return QueryResponse(
-            answer="No relevant clauses found for your question. Please upload and analyze a document first.",
-            referenced_clauses=[],
-            overall_risk="Low",
-            confidence=0.0,
-        )
+        return _no_results_response()
 
-    # Step 3: Build context and query LLM
-    context = _format_context(results)
-    llm = get_llm()
+    # Step 2: Build context and query LLM
+    prompt = _build_prompt(question, results, conversation_history, history_summary=history_summary)
+    try:
+        response = _parse_answer(llm.invoke(prompt, "qa").content)
+    except Exception as e:
+        logger.error("QA chain failed: %s", str(e))
+        return _fallback_response(results)
 
-    # Format conversation history
-    history_section = ""
-    if conversation_history:
-        history_lines = []
-        for msg in conversation_history[-10:]:  # Last 10 messages max
-            role = "User" if msg["role"] == "user" else "Assistant"
-            history_lines.append(f"{role}: {msg['content']}")
-        history_section = "Conversation history:\n" + "\n".join(history_lines)
+    _remember_answer(question_vector, doc_id, response, results)
+    return response
+
+
+async def aask_question(
+    question: str,
+    top_k: int = 5,
+    doc_id: Optional[str] = None,
+    conversation_history: list = None,
+    history_summary: Optional[str] = None,
+) -> QueryResponse:
+    """Async variant of ask_question: embedding and FAISS run in worker threads,
+    the LLM call is awaited so no thread is held during generation."""
+
+    question_vector, cached = await asyncio.to_thread(
+        _lookup_answer_cache, question, doc_id, bool(conversation_history or history_summary)
+    )
+    if cached is not None:
+        return cached
 
-    prompt = QA_PROMPT.format(context=context, question=question, history_section=history_section)
+    results = await asyncio.to_thread(retrieve, question, top_k, doc_id)
+    if not results:
+        return _no_results_response()
 
+    prompt = _build_prompt(question, results, conversation_history, history_summary=history_summary)
     try:
-        response = llm.invoke(prompt)
-        content = response.content.strip()
-
-        # Parse JSON (handle markdown code blocks)
-        if "```" in content:
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-                content = content.strip()
-
-        data = json.loads(content)
-        return QueryResponse(**data)
+        message = await llm.ainvoke(prompt, "qa")
+        response = _parse_answer(message.content)
     except Exception as e:
         logger.error("QA chain failed: %s", str(e))
+        return _fallback_response(results)
+
+    _remember_answer(question_vector, doc_id, response, results)
+    return response
+
+
+def _reference_payload(results: list) -> list[dict]:
+    return [
+        {
+            "clause_id": r.metadata.get("clause_id", ""),
+            "section_title": r.metadata.get("section_title", "Untitled"),
+            "page": r.metadata.get("page"),
+            "clause_type": r.metadata.get("clause_type"),
+            "risk_level": r.metadata.get("risk_level"),
+            "score": r.metadata.get("score"),
+        }
+        for r in results
+    ]
+
+
+def _parse_stream_meta(answer: str, meta_text: str) -> QueryResponse:
+    """Build the final response from streamed prose plus the trailing JSON block."""
+    meta_text = meta_text.strip()
+    if "```" in meta_text:
+        meta_text = meta_text.split("```")[1]
+        if meta_text.startswith("json"):
+            meta_text = meta_text[4:]
+    data = json.loads(meta_text.strip())
+    return QueryResponse(answer=answer.strip(), **data)
+
+
+async def astream_answer(
+    question: str,
+    top_k: int = 5,
+    doc_id: Optional[str] = None,
+    conversation_history: list = None,
+    history_summary: Optional[str] = None,
+) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Streaming variant of ask_question. Yields (event, data) pairs:
+    - "references": the retrieved clauses, as soon as retrieval finishes
+    - "token": a chunk of answer text, as the LLM produces it
+    - "done": the final QueryResponse fields (overall_risk, confidence, ...)
+    """
+    question_vector, cached = await asyncio.to_thread(
+        _lookup_answer_cache, question, doc_id, bool(conversation_history or history_summary)
+    )
+    if cached is not None:
+        yield "references", {"clauses": [{"clause_id": cid} for cid in cached.referenced_clauses]}
+        yield "token", {"text": cached.answer}
+        yield "done", cached.model_dump()
+        return
+
+    results = await asyncio.to_thread(retrieve, question, top_k, doc_id)
+    yield "references", {"clauses": _reference_payload(results)}
+    if not results:
+        response = _no_results_response()
+        yield "token", {"text": response.answer}
+        yield "done", response.model_dump()
+        return
+
+    prompt = _build_prompt(
+        question, results, conversation_history,
+        template=STREAM_QA_PROMPT, history_summary=history_summary,
+    )
+    answer_parts: list[str] = []
+    buffer = ""
+    meta_text = None
+    # Hold back enough characters that a marker split across chunks is never emitted
+    holdback = len(STREAM_META_MARKER) - 1
+    try:
+        async for chunk in llm.astream(prompt, "qa"):
+            if meta_text is not None:
+                meta_text += chunk.content
+                continue
+            buffer += chunk.content
+            if STREAM_META_MARKER in buffer:
+                text, meta_text = buffer.split(STREAM_META_MARKER, 1)
+                buffer = ""
+            elif len(buffer) > holdback:
+                text, buffer = buffer[:-holdback], buffer[-holdback:]
+            else:
+                continue
+            if text:
+                answer_parts.append(text)
+                yield "token", {"text": text}
+        if buffer:
+            answer_parts.append(buffer)
+            yield "token", {"text": buffer}
+
+        response = _parse_stream_meta("".join(answer_parts), meta_text or "")
+    except Exception as e:
+        logger.error("Streaming QA chain failed: %s", str(e))
+        response = _fallback_response(results)
+        if answer_parts:
+            response = response.model_copy(update={"answer": "".join(answer_parts).strip()})
+        yield "done", response.model_dump()
+        return
 
-        # Return a graceful fallback
-        clause_ids = [r.metadata.get("clause_id", "") for r in results]
-        return QueryResponse(
-            answer=f"I found {len(results)} relevant clauses but encountered an error generating the answer.",
-            referenced_clauses=clause_ids,
-            overall_risk="Medium",
-            confidence=0.2,
-        )
\ No newline at end of file
+    _remember_answer(question_vector, doc_id, response, results)
+    yield "done", response.model_dump()
@@ -0,0 +1,101 @@
+"""Weighted risk keyword engine.
+
+All lexicon terms are compiled into one regex alternation and matched in a
+single pass per clause, with word boundaries: a term must not be preceded or
+followed by a letter, digit or hyphen (so "exclusive" does not fire inside
+"non-exclusive"), may span whitespace or a hyphen ("non compete" /
+"non-compete") and takes simple inflections (-s, -es, -d, -ed, -ing).
+
+Each distinct term found adds its weight to the clause's score, which maps to a
+provisional risk level (RISK_HIGH_SCORE / RISK_MEDIUM_SCORE) and a confidence:
+0.5 at the High boundary rising to 1.0 at twice it, at most 0.5 for Medium and
+0 when nothing matched (absence of keywords says little). The default lexicon
+can be extended or overridden with RISK_KEYWORDS (weight <= 0 removes a term).
+"""
+
+import re
+import threading
+from typing import NamedTuple, Optional
+
+from app.core.config import get_settings
+
+HIGH = 3.0
+MEDIUM = 1.0
+
+DEFAULT_LEXICON: dict[str, float] = {
+    # Terms that on their own make a clause high risk
+    "indemnify": HIGH, "indemnifies": HIGH, "indemnification": HIGH, "hold harmless": HIGH,
+    "unlimited liability": HIGH, "sole discretion": HIGH, "waive": HIGH, "waiver": HIGH,
+    "penalty": HIGH, "penalties": HIGH, "liquidated damages": HIGH, "consequential damages": HIGH,
+    "termination for convenience": HIGH, "non-compete": HIGH, "non-solicitation": HIGH,
+    "exclusive": HIGH, "irrevocable": HIGH,
+    # Terms that suggest obligations or exposure
+    "liability": MEDIUM, "liabilities": MEDIUM, "limitation": MEDIUM, "damages": MEDIUM, "breach": MEDIUM,
+    "default": MEDIUM, "terminate": MEDIUM, "confidential": MEDIUM, "obligation": MEDIUM,
+    "warranty": MEDIUM, "warranties": MEDIUM, "guarantee": MEDIUM,
+}
+
+_SUFFIX = r"(?:s|es|d|ed|ing)?"
+
+
+class Assessment(NamedTuple):
+    level: str  # "High", "Medium" or "Low"
+    score: float
+    confidence: float
+    keywords: list[str]
+
+
+_lock = threading.Lock()
+_engine: Optional[tuple[re.Pattern, list[str], list[float]]] = None
+
+
+def _term_pattern(term: str) -> str:
+    return r"[\s-]+".join(re.escape(part) for part in re.split(r"[\s-]+", term.strip()))
+
+
+def _compile() -> tuple[re.Pattern, list[str], list[float]]:
+    lexicon = {**DEFAULT_LEXICON, **{k.lower(): v for k, v in get_settings().risk_keywords.items()}}
+    terms = sorted((t for t, w in lexicon.items() if w > 0), key=len, reverse=True)
+    if not terms:
+        return re.compile(r"(?!)"), [], []
+    alternation = "|".join(f"({_term_pattern(t)})" for t in terms)
+    pattern = re.compile(rf"(?<![\w-])(?:{alternation}){_SUFFIX}(?![\w-])", re.IGNORECASE)
+    return pattern, terms, [lexicon[t] for t in terms]
+
+
+def _get_engine() -> tuple[re.Pattern, list[str], list[float]]:
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                _engine = _compile()
+    return _engine
+
+
+def matches(text: str) -> dict[str, float]:
+    """Distinct lexicon terms found in text, with their weights."""
+    pattern, terms, weights = _get_engine()
+    found = {}
+    for match in pattern.finditer(text):
+        i = match.lastindex - 1
+        found[terms[i]] = weights[i]
+    return found
+
+
+def assess(text: str) -> Assessment:
+    settings = get_settings()
+    found = matches(text)
+    score = sum(found.values(), 0.0)
+    high, medium = settings.risk_high_score, settings.risk_medium_score
+    if score >= high:
+        level, confidence = "High", min(1.0, 0.5 + 0.5 * (score - high) / high)
+    elif score >= medium:
+        level, confidence = "Medium", 0.5 * (score - medium) / max(high - medium, 1e-9)
+    else:
+        level, confidence = "Low", 0.0
+    return Assessment(level, score, round(confidence, 3), sorted(found, key=found.get, reverse=True))
+
+
+def provisional_risk(texts: list[str]) -> list[str]:
+    """Instant keyword-only risk level for each text (used at upload, before analysis)."""
+    return [assess(text).level for text in texts]
@@ -1,26 +1,21 @@
-"""Risk scoring service — hybrid heuristic + LLM approach."""
+"""Risk scoring service — tiered keyword + LLM approach.
+
+Every clause first goes through the compiled keyword engine (risk_lexicon).
+When its confidence reaches RISK_LLM_CONFIDENCE_THRESHOLD the keyword verdict
+is final and no LLM call is made; otherwise the LLM scores the clause and a
+keyword High still wins.
+"""
 
 import json
 import logging
-from langchain_groq import ChatGroq
+from app.core import metrics
 from app.core.config import get_settings
+from app.services import llm, risk_lexicon
+from app.services.tokenizer import count_tokens
 from app.models.query import RiskResult
 
 logger = logging.getLogger(__name__)
 
-# Keywords that indicate elevated risk
-HIGH_RISK_KEYWORDS = [
-    "indemnify", "indemnification", "unlimited liability",
-    "sole discretion", "waive", "waiver", "penalty", "penalties",
-    "liquidated damages", "consequential damages", "termination for convenience",
-    "non-compete", "non-solicitation", "exclusive", "irrevocable",
-]
-
-MEDIUM_RISK_KEYWORDS = [
-    "liability", "limitation", "damages", "breach", "default",
-    "terminate", "confidential", "obligation", "warranty", "guarantee",
-]
-
 RISK_PROMPT = """You are a legal risk analyst. Assess the risk level of the following legal clause.
 
 Consider:
@@ -40,69 +35,92 @@ Clause text:
 Return ONLY valid JSON, no other text."""
 
 
-def _get_llm() -> ChatGroq:
-    settings = get_settings()
-    return ChatGroq(
-        api_key=settings.groq_api_key,
-        model_name=settings.llm_model,
-        temperature=0,
-        max_tokens=200,
+def _keyword_verdict(text: str) -> tuple[str | None, RiskResult | None]:
+    """(heuristic level, final result when the keyword engine is confident enough)."""
+    assessment = risk_lexicon.assess(text)
+    heuristic = assessment.level if assessment.level != "Low" else None
+    if heuristic is None or assessment.confidence < get_settings().risk_llm_confidence_threshold:
+        return heuristic, None
+    metrics.LLM_CALLS_AVOIDED.inc(reason="keywords")
+    return heuristic, RiskResult(
+        risk_level=assessment.level,
+        risk_reason=f"[Keyword flagged] Contains {', '.join(assessment.keywords)}",
+        source="keywords",
     )
 
 
-def _heuristic_risk(text: str) -> str | None:
-    """
-    Keyword-based risk check. Returns 'High', 'Medium', or None.
-    None means defer to LLM.
-    """
-    text_lower = text.lower()
-    for keyword in HIGH_RISK_KEYWORDS:
-        if keyword in text_lower:
-            return "High"
-    for keyword in MEDIUM_RISK_KEYWORDS:
-        if keyword in text_lower:
-            return "Medium"
-    return None
+def _parse_risk(content: str) -> RiskResult:
+    """Parse JSON from the LLM response (handles markdown code blocks)."""
+    content = content.strip()
+    if "```" in content:
+        content = content.split("```")[1]
+        if content.startswith("json"):
+            content = content[4:]
+        content = content.strip()
+    data = json.loads(content)
+    return RiskResult(**data)
+
+
+def _combine(heuristic: str | None, llm_result: RiskResult) -> RiskResult:
+    """Combine heuristic and LLM verdicts — heuristic High always wins."""
+    if heuristic == "High":
+        return RiskResult(
+            risk_level="High",
+            risk_reason=f"[Keyword flagged] {llm_result.risk_reason}",
+        )
+    return llm_result
+
+
+def _fallback(heuristic: str | None) -> RiskResult:
+    return RiskResult(
+        risk_level=heuristic or "Medium",
+        risk_reason="Risk assessment unavailable — defaulted based on heuristics",
+        source="fallback",
+    )
+
+
+def estimate_tokens(clause_texts: list[str]) -> int:
+    """Upper bound on the tokens scoring these clauses will use (for quota checks)."""
+    overhead = count_tokens(RISK_PROMPT) + llm.max_tokens("risk")
+    return sum(overhead + count_tokens(text[:2000]) for text in clause_texts)
 
 
 def score_risk(clause_text: str) -> RiskResult:
     """Score risk for a single clause using heuristics + LLM."""
 
-    # Step 1: Heuristic check
-    heuristic = _heuristic_risk(clause_text)
+    # Step 1: Heuristic check; a confident keyword verdict skips the LLM
+    heuristic, verdict = _keyword_verdict(clause_text)
+    if verdict is not None:
+        return verdict
 
     # Step 2: LLM reasoning
-    llm = _get_llm()
     prompt = RISK_PROMPT.format(clause_text=clause_text[:2000])
 
     try:
-        response = llm.invoke(prompt)
-        content = response.content.strip()
+        response = llm.invoke(prompt, "risk")
+        llm_result = _parse_risk(response.content)
 
-        if "```" in content:
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-            content = content.strip()
+        # Step 3: Combine
+        return _combine(heuristic, llm_result)
 
-        data = json.loads(content)
-        llm_result = RiskResult(**data)
+    except Exception as e:
+        logger.warning("Risk scoring failed: %s", str(e))
+        return _fallback(heuristic)
 
-        # Step 3: Combine — heuristic High always wins
-        if heuristic == "High":
-            return RiskResult(
-                risk_level="High",
-                risk_reason=f"[Keyword flagged] {llm_result.risk_reason}",
-            )
 
-        return llm_result
+async def ascore_risk(clause_text: str) -> RiskResult:
+    """Async variant of score_risk using the LLM's ainvoke."""
+    heuristic, verdict = _keyword_verdict(clause_text)
+    if verdict is not None:
+        return verdict
+    prompt = RISK_PROMPT.format(clause_text=clause_text[:2000])
 
+    try:
+        response = await llm.ainvoke(prompt, "risk")
+        return _combine(heuristic, _parse_risk(response.content))
     except Exception as e:
         logger.warning("Risk scoring failed: %s", str(e))
-        return RiskResult(
-            risk_level=heuristic or "Medium",
-            risk_reason="Risk assessment unavailable — defaulted based on heuristics",
-        )
+        return _fallback(heuristic)
 
 
 def score_clauses(clauses: list[dict]) -> list[RiskResult]:
@@ -113,3 +131,13 @@ def score_clauses(clauses: list[dict]) -> list[RiskResult]:
         result = score_risk(clause["text"])
         results.append(result)
     return results
+
+
+async def ascore_clauses(clauses: list[dict]) -> list[RiskResult]:
+    """Async variant of score_clauses. Still sequential to respect rate limits."""
+    results = []
+    for i, clause in enumerate(clauses):
+        logger.info("Scoring risk %d/%d: %s", i + 1, len(clauses), clause.get("clause_id", ""))
+        result = await ascore_risk(clause["text"])
+        results.append(result)
+    return results
@@ -0,0 +1,40 @@
+"""Token counting for prompt budgeting.
+
+Uses tiktoken's cl100k_base encoding as a close proxy for the Groq models'
+tokenizers. If the encoding cannot be loaded (e.g. offline without a cached
+BPE file) it falls back to the ~4 characters per token estimate.
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_ENCODING_NAME = "cl100k_base"
+_encoding = None
+_encoding_failed = False
+_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        with _lock:
+            if _encoding is None and not _encoding_failed:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(_ENCODING_NAME)
+                except Exception as e:
+                    logger.warning("tiktoken unavailable (%s), estimating tokens from length", str(e))
+                    _encoding_failed = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Return the number of tokens in text."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
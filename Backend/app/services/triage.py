@@ -0,0 +1,99 @@
+"""Triage of non-substantive segments before analysis.
+
+segment_document keeps every regex hit and chunk, including title pages,
+tables of contents, signature blocks, page-number fragments and bare ALL-CAPS
+headings. Those carry no obligations, so they are labeled General/Low here
+instead of costing a classification and a risk call each (and, with
+TRIAGE_EXCLUDE_FROM_INDEX, an embedding). Detectors are plain regex/length
+checks; thresholds come from the TRIAGE_* settings. Short or low-density text
+is kept when it contains an obligation word or a risk keyword.
+"""
+
+import logging
+import re
+from typing import Optional
+
+from app.core.config import get_settings
+from app.services.risk_lexicon import matches as risk_keywords
+
+logger = logging.getLogger(__name__)
+
+CLAUSE_TYPE = "General"
+IMPORTANCE = "Low"
+RISK_LEVEL = "Low"
+
+_WORD_RE = re.compile(r"[A-Za-z]{2,}")
+_PAGE_NUMBER_RE = re.compile(r"^\s*(?:page\s+)?\d+(?:\s*(?:of|/)\s*\d+)?\s*$", re.IGNORECASE)
+# "1. Definitions ........ 3" or "Termination    12"
+_TOC_LINE_RE = re.compile(r"(?:\.{3,}|\s{2,}|\t)\s*\d+\s*$")
+_TOC_TITLE_RE = re.compile(r"\b(?:table of contents|contents)\b", re.IGNORECASE)
+_SIGNATURE_FIELD_RE = re.compile(
+    r"^\s*(?:by|name|title|date|signature|signed|witness)\s*:", re.IGNORECASE | re.MULTILINE,
+)
+_WITNESS_RE = re.compile(r"\bin witness whereof\b|\bsigned for and on behalf of\b", re.IGNORECASE)
+_OBLIGATION_RE = re.compile(r"\b(?:shall|must|will|agree[sd]?|pay(?:s|able|ment|ments)?)\b", re.IGNORECASE)
+
+
+def _lines(text: str) -> list[str]:
+    return [line for line in text.splitlines() if line.strip()]
+
+
+def reason(text: str) -> Optional[str]:
+    """Why a segment is non-substantive (page_number, toc, signature, too_short, low_density), or None."""
+    settings = get_settings()
+    lines = _lines(text)
+    if not lines or all(_PAGE_NUMBER_RE.match(line) for line in lines):
+        return "page_number"
+    if len(lines) >= 3:
+        toc_lines = sum(1 for line in lines if _TOC_LINE_RE.search(line))
+        if toc_lines / len(lines) >= 0.5 or (_TOC_TITLE_RE.search(lines[0]) and toc_lines >= 2):
+            return "toc"
+    words = _WORD_RE.findall(text)
+    if len(words) <= settings.triage_signature_max_words and (
+        _WITNESS_RE.search(text) or len(_SIGNATURE_FIELD_RE.findall(text)) >= 2
+    ):
+        return "signature"
+    # Short or number-heavy text can still be a real clause ("Licensee has unlimited
+    # liability.", a payment schedule); only drop it when it carries no obligation or risk term
+    if _OBLIGATION_RE.search(text) or risk_keywords(text):
+        return None
+    if len(words) < settings.triage_min_words:
+        return "too_short"
+    visible = sum(1 for ch in text if not ch.isspace())
+    letters = sum(1 for ch in text if ch.isalpha())
+    if visible and letters / visible < settings.triage_min_alpha_ratio:
+        return "low_density"
+    return None
+
+
+def triage(clauses: list[dict]) -> dict[str, str]:
+    """clause id -> reason for the clauses that should skip analysis (empty when disabled)."""
+    if not get_settings().triage_enabled:
+        return {}
+    found = {}
+    for c in clauses:
+        why = reason(c["text"])
+        if why is not None:
+            found[c.get("clause_id") or c.get("id", "")] = why
+    return found
+
+
+def labels(why: str) -> dict:
+    """The labels given to a triaged segment."""
+    return {
+        "clause_type": CLAUSE_TYPE,
+        "importance": IMPORTANCE,
+        "risk_level": RISK_LEVEL,
+        "risk_reason": f"Non-substantive segment ({why.replace('_', ' ')}); not sent for analysis",
+    }
+
+
+def indexable(clauses: list[dict]) -> list[dict]:
+    """Clauses to embed: all of them, or only substantive ones with TRIAGE_EXCLUDE_FROM_INDEX."""
+    settings = get_settings()
+    if not (settings.triage_enabled and settings.triage_exclude_from_index):
+        return clauses
+    skipped = triage(clauses)
+    if skipped:
+        logger.info("Not indexing %d non-substantive segments", len(skipped))
+    return [c for c in clauses if (c.get("clause_id") or c.get("id", "")) not in skipped]
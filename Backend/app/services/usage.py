@@ -0,0 +1,219 @@
+"""LLM token usage ledger and per-user daily quotas.
+
+Every LLM call made through app.services.llm is recorded with its prompt and
+completion tokens, attributed to the user, document and chat session of the
+request that triggered it. Attribution lives in a contextvar that routes fill
+in (get_current_user sets the user), so services don't need extra arguments.
+Rows are buffered and written in batches by a background thread.
+
+Quotas are daily token allowances (prompt + completion). Routes call
+check_quota with an estimate of the work before any LLM call is made; an
+admitted estimate is reserved (counted as used) so concurrent requests cannot
+all pass the same check. Recorded calls draw the reservation down, and
+whatever is left of it is given back after USAGE_RESERVATION_SECONDS.
+"""
+
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+from typing import Callable, Optional
+
+from app.core.config import get_settings
+from app.db.database import get_db
+from app.db.repositories import get_llm_usage_report, get_user_tokens_since, insert_llm_usage
+
+logger = logging.getLogger(__name__)
+
+_attribution: ContextVar[dict] = ContextVar("llm_usage_attribution", default={})
+
+_lock = threading.Lock()
+_pending: list[tuple] = []
+_flusher: Optional[threading.Thread] = None
+# username -> tokens used (or reserved) today, seeded from the ledger on first use
+_used: dict[str, int] = {}
+# username -> [tokens still reserved, monotonic expiry] per admitted request, oldest first
+_reservations: dict[str, list[list]] = {}
+_used_day: Optional[date] = None
+
+
+class QuotaExceededError(Exception):
+    def __init__(self, username: str, used: int, quota: int, requested: int):
+        super().__init__(f"Daily LLM token quota exceeded for {username}")
+        self.username = username
+        self.used = used
+        self.quota = quota
+        self.requested = requested
+
+
+def set_context(**attrs) -> None:
+    """
+    Attribute LLM calls in the current request to user / document_id / session_id.
+    None values are ignored; each request runs in its own context.
+    """
+    current = _attribution.get()
+    _attribution.set({**current, **{k: v for k, v in attrs.items() if v is not None}})
+
+
+def current_user() -> Optional[str]:
+    """The user LLM calls in this context are attributed to."""
+    return _attribution.get().get("user")
+
+
+def _today_start() -> str:
+    return date.today().isoformat() + " 00:00:00"
+
+
+def record(prompt_type: str, prompt_tokens: int, completion_tokens: int) -> None:
+    """Queue one LLM call for the ledger."""
+    attrs = _attribution.get()
+    username = attrs.get("user")
+    row = (
+        username, attrs.get("document_id"), attrs.get("session_id"), prompt_type,
+        int(prompt_tokens), int(completion_tokens), datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    )
+    with _lock:
+        _pending.append(row)
+        if username is not None and username in _used and _used_day == date.today():
+            _used[username] += _draw_reservations_locked(username, row[4] + row[5])
+    _ensure_flusher()
+
+
+def flush() -> int:
+    """Write queued rows to the ledger; returns how many were written."""
+    with _lock:
+        rows = list(_pending)
+        _pending.clear()
+    if not rows:
+        return 0
+    conn = get_db()
+    try:
+        insert_llm_usage(conn, rows)
+    except Exception as e:
+        logger.error("Failed to write %d LLM usage rows: %s", len(rows), str(e))
+        with _lock:
+            _pending[:0] = rows
+        return 0
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(get_settings().usage_flush_interval_seconds)
+        flush()
+
+
+def _ensure_flusher() -> None:
+    global _flusher
+    if _flusher is None:
+        with _lock:
+            if _flusher is None:
+                _flusher = threading.Thread(target=_flush_loop, name="llm-usage-flush", daemon=True)
+                _flusher.start()
+
+
+# Quotas
+
+def _draw_reservations_locked(username: str, tokens: int) -> int:
+    """Take tokens out of the user's reservations; returns the part not covered by them."""
+    for reservation in _reservations.get(username, []):
+        taken = min(tokens, reservation[0])
+        reservation[0] -= taken
+        tokens -= taken
+        if not tokens:
+            break
+    _reservations[username] = [r for r in _reservations.get(username, []) if r[0] > 0]
+    return tokens
+
+
+def _release_expired_locked(username: str) -> None:
+    now = time.monotonic()
+    reservations = _reservations.get(username, [])
+    for remaining, expires in reservations:
+        if expires <= now:
+            _used[username] -= remaining
+    _reservations[username] = [r for r in reservations if r[1] > now]
+
+
+def quota_for(username: str) -> int:
+    """Daily token quota for a user; 0 means unlimited."""
+    settings = get_settings()
+    return settings.usage_user_quotas.get(username, settings.usage_daily_token_quota)
+
+
+def used_today(username: str) -> int:
+    global _used_day
+    today = date.today()
+    with _lock:
+        if _used_day != today:
+            _used.clear()
+            _reservations.clear()
+            _used_day = today
+        if username in _used:
+            _release_expired_locked(username)
+            return _used[username]
+    # Pending rows must be in the ledger before it is summed
+    flush()
+    conn = get_db()
+    try:
+        used = get_user_tokens_since(conn, username, _today_start())
+    finally:
+        conn.close()
+    with _lock:
+        _used.setdefault(username, used)
+        return _used[username]
+
+
+def check_quota(username: str, estimate: Callable[[], int]) -> None:
+    """
+    Raise QuotaExceededError if the estimated tokens would take the user past
+    today's quota, otherwise reserve them. estimate is only evaluated when a
+    quota applies.
+    """
+    quota = quota_for(username)
+    if quota <= 0:
+        return
+    used_today(username)  # seeds _used from the ledger outside the lock
+    requested = estimate()
+    with _lock:
+        if username not in _used:
+            # The day rolled over since used_today; count from zero
+            _used[username] = 0
+        _release_expired_locked(username)
+        used = _used[username]
+        if used + requested <= quota:
+            _used[username] += requested
+            _reservations.setdefault(username, []).append(
+                [requested, time.monotonic() + get_settings().usage_reservation_seconds],
+            )
+            return
+    logger.warning(
+        "Quota exceeded for %s: used %d + requested %d > %d", username, used, requested, quota,
+    )
+    raise QuotaExceededError(username, used, quota, requested)
+
+
+def seconds_until_reset() -> int:
+    tomorrow = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+    return max(1, int((tomorrow - datetime.now()).total_seconds()))
+
+
+# Reporting
+
+def report(
+    days: int,
+    group_by: list[str],
+    username: Optional[str] = None,
+    document_id: Optional[str] = None,
+) -> list[dict]:
+    """Ledger totals over the last `days` days (today counts as one)."""
+    flush()
+    since = (date.today() - timedelta(days=max(days, 1) - 1)).isoformat() + " 00:00:00"
+    conn = get_db()
+    try:
+        return get_llm_usage_report(conn, since, group_by, username, document_id)
+    finally:
+        conn.close()
@@ -1,15 +1,35 @@
 """FAISS vector store manager with disk persistence."""
 
 import logging
+import re
+import threading
+from collections import OrderedDict
 from pathlib import Path
+import numpy as np
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
-from app.services.embedding import get_embeddings_model
+from app.services.embedding import get_embeddings_model, embed_texts, embed_query
+from app.core import metrics, tracing
 from app.core.config import get_settings
 
 logger = logging.getLogger(__name__)
 
 _vector_store: FAISS | None = None
+# docstore id -> row in the FAISS index (the reverse of index_to_docstore_id)
+_positions: dict[str, int] = {}
+
+# Bumped on every add/delete so cached retrievals invalidate themselves
+_index_lock = threading.RLock()
+_index_version = 0
+# Per-document generation, bumped whenever that document's vectors change
+_document_versions: dict[str, int] = {}
+
+# (normalized question, doc scope, k, index version) -> results
+# Labels from an analysis that finished before the clause's upload-time vector was
+# added; applied by whichever add_clauses/copy_vectors call indexes the clause
+_pending_labels: dict[str, dict] = {}
+_retrieval_cache: OrderedDict[tuple, list[Document]] = OrderedDict()
+_retrieval_stats = {"hits": 0, "misses": 0}
 
 
 def get_vector_store() -> FAISS | None:
@@ -17,6 +37,62 @@ def get_vector_store() -> FAISS | None:
     return _vector_store
 
 
+def get_index_version() -> int:
+    """Return the current index version (changes on any add or delete)."""
+    return _index_version
+
+
+def get_document_version(doc_id: str) -> int:
+    """Return the generation of a document's vectors (changes on re-index or delete)."""
+    return _document_versions.get(doc_id, 0)
+
+
+def _bump_index_version(doc_ids: set[str] = frozenset()) -> None:
+    """Advance the index version and drop retrievals cached against older versions."""
+    global _index_version
+    with _index_lock:
+        _index_version += 1
+        for doc_id in doc_ids:
+            _document_versions[doc_id] = _document_versions.get(doc_id, 0) + 1
+        _retrieval_cache.clear()
+
+
+def get_retrieval_cache_stats() -> dict:
+    """Return retrieval-result cache hit/miss counters for this process."""
+    with _index_lock:
+        hits, misses = _retrieval_stats["hits"], _retrieval_stats["misses"]
+        size = len(_retrieval_cache)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / total if total else 0.0,
+        "size": size,
+        "index_version": _index_version,
+    }
+
+
+def _rebuild_positions() -> None:
+    """Recompute _positions from the store (after load or delete, which renumbers rows). Caller holds the lock."""
+    global _positions
+    _positions = {} if _vector_store is None else {
+        docstore_id: position for position, docstore_id in _vector_store.index_to_docstore_id.items()
+    }
+
+
+def _add_to_store(text_embeddings: list, metadatas: list[dict], ids: list[str]) -> None:
+    """Append vectors to the store (creating it if needed) and record their rows. Caller holds the lock."""
+    global _vector_store
+    if _vector_store is None:
+        _vector_store = FAISS.from_embeddings(text_embeddings, get_embeddings_model(), metadatas=metadatas, ids=ids)
+        _positions.clear()
+        start = 0
+    else:
+        start = len(_vector_store.index_to_docstore_id)
+        _vector_store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+    _positions.update(zip(ids, range(start, start + len(ids))))
+
+
 def load_index() -> None:
     """Load FAISS index from disk if it exists."""
     global _vector_store
@@ -34,6 +110,9 @@ def load_index() -> None:
     else:
         logger.info("No existing FAISS index found, starting fresh")
         _vector_store = None
+    with _index_lock:
+        _rebuild_positions()
+    _bump_index_version()
 
 
 def persist_index() -> None:
@@ -50,48 +129,238 @@ def persist_index() -> None:
     logger.info("FAISS index persisted to %s", index_path)
 
 
-def add_clauses(clauses: list[dict]) -> None:
+def _clause_metadata(c: dict) -> dict:
+    return {
+        "clause_id": c.get("clause_id") or c.get("id", ""),
+        "document_id": c.get("document_id", ""),
+        "section_title": c.get("section_title") or "Untitled",
+        "clause_type": c.get("clause_type") or "Unclassified",
+        "risk_level": c.get("risk_level") or "Unknown",
+        "page": c.get("page", 0),
+    }
+
+
+def _indexed_ids(ids: list[str]) -> set[str]:
+    """Return which of the given clause IDs already have vectors. Caller holds the lock."""
+    if _vector_store is None:
+        return set()
+    docstore = _vector_store.docstore._dict
+    return {i for i in ids if i in docstore}
+
+
+def add_clauses(clauses: list[dict]) -> int:
     """
-    Embed and add classified clauses to the FAISS index.
-    Each clause dict should have: clause_id, section_title, text, page, clause_type, risk_level
+    Embed and add clauses to the FAISS index, keyed by clause ID.
+    Each clause dict should have: clause_id, document_id, section_title, text, page
+    and optionally clause_type and risk_level (unlabelled clauses are searchable too).
+    Clauses that are already indexed are skipped. Returns the number added.
     """
-    global _vector_store
+    metadatas = [_clause_metadata(c) for c in clauses]
+    with _index_lock:
+        existing = _indexed_ids([m["clause_id"] for m in metadatas])
+    pending = [(c["text"], m) for c, m in zip(clauses, metadatas) if m["clause_id"] not in existing]
+    if not pending:
+        return 0
+
+    # Embed through the persistent cache so unchanged clauses are not recomputed
+    texts = [text for text, _ in pending]
+    vectors = embed_texts(texts)
+
+    with _index_lock:
+        # Another caller may have indexed some of these while we were embedding
+        existing = _indexed_ids([m["clause_id"] for _, m in pending])
+        rows = [
+            (text, vector, _pending_labels.pop(meta["clause_id"], meta))
+            for (text, meta), vector in zip(pending, vectors)
+            if meta["clause_id"] not in existing
+        ]
+        if not rows:
+            return 0
+        text_embeddings = [(text, vector) for text, vector, _ in rows]
+        metas = [meta for _, _, meta in rows]
+        ids = [meta["clause_id"] for meta in metas]
+
+        _add_to_store(text_embeddings, metas, ids)
+        logger.info("Added %d documents to FAISS index (total: %d)", len(rows), _vector_store.index.ntotal)
+        _bump_index_version({meta["document_id"] for meta in metas})
+
+        # Auto-persist after adding
+        persist_index()
+    return len(rows)
 
-    documents = []
-    for c in clauses:
-        doc = Document(
-            page_content=c["text"],
-            metadata={
-                "clause_id": c.get("clause_id") or c.get("id", ""),
-                "document_id": c.get("document_id", ""),
-                "section_title": c.get("section_title", "Untitled"),
-                "clause_type": c.get("clause_type", "General"),
-                "risk_level": c.get("risk_level", "Medium"),
-                "page": c.get("page", 0),
-},
+
+def upsert_document(doc_id: str, clauses: list[dict]) -> None:
+    """
+    Bring a document's vectors in line with its analysed clauses.
+    Vectors indexed at upload time only get their clause_type/risk_level
+    metadata patched; clauses that were never indexed are embedded and
+    added (with these labels, even if the upload-time add_clauses gets there
+    first), and vectors for clauses that no longer exist are removed.
+    """
+    incoming = {c.get("clause_id") or c.get("id", ""): c for c in clauses}
+
+    with _index_lock:
+        patched = 0
+        if _vector_store is not None:
+            docstore = _vector_store.docstore._dict
+            stale = []
+            for docstore_id, doc in docstore.items():
+                if doc.metadata.get("document_id") != doc_id:
+                    continue
+                clause = incoming.get(docstore_id)
+                if clause is None:
+                    stale.append(docstore_id)
+                    continue
+                doc.metadata.update(_clause_metadata({**clause, "document_id": doc_id}))
+                patched += 1
+            if stale:
+                _vector_store.delete(stale)
+                _rebuild_positions()
+                logger.info("Removed %d stale vectors for document %s", len(stale), doc_id)
+            if patched or stale:
+                _bump_index_version({doc_id})
+                persist_index()
+        # Clauses whose upload-time indexing is still in flight get the labels when they land
+        indexed = _indexed_ids(list(incoming))
+        for clause_id, clause in incoming.items():
+            if clause_id not in indexed:
+                _pending_labels[clause_id] = _clause_metadata({**clause, "document_id": doc_id})
+
+    added = add_clauses([{**c, "document_id": doc_id} for c in clauses])
+    logger.info("Indexed document %s: %d vectors patched, %d embedded", doc_id, patched, added)
+
+
+def delete_document(doc_id: str) -> int:
+    """Remove all vectors belonging to a document. Returns the number removed."""
+    with _index_lock:
+        for clause_id in [k for k, m in _pending_labels.items() if m["document_id"] == doc_id]:
+            del _pending_labels[clause_id]
+        if _vector_store is None:
+            return 0
+        ids = [
+            docstore_id
+            for docstore_id, doc in _vector_store.docstore._dict.items()
+            if doc.metadata.get("document_id") == doc_id
+        ]
+        if not ids:
+            return 0
+        _vector_store.delete(ids)
+        _rebuild_positions()
+        _bump_index_version({doc_id})
+        persist_index()
+    logger.info("Removed %d vectors for document %s from FAISS index", len(ids), doc_id)
+    return len(ids)
+
+
+def _stored_vectors(ids: list[str]) -> dict[str, np.ndarray]:
+    """Read the vectors of already indexed clause IDs back from FAISS. Caller holds the lock."""
+    positions = {i: _positions[i] for i in ids if i in _positions}
+    if not positions:
+        return {}
+    found = list(positions)
+    rows = _vector_store.index.reconstruct_batch(np.array([positions[i] for i in found], dtype=np.int64))
+    return dict(zip(found, rows))
+
+
+def copy_vectors(pairs: list[tuple[str, dict]]) -> int:
+    """
+    Index clauses under the vectors of other, already indexed clauses with the
+    same text (e.g. unchanged clauses of a new document version), without
+    embedding. pairs are (source_clause_id, clause dict with document_id).
+    Returns the number copied; sources without a vector are skipped.
+    """
+    with _index_lock:
+        sources = _stored_vectors([source for source, _ in pairs])
+        rows = [(c, sources[source]) for source, c in pairs if source in sources]
+        metas = [_clause_metadata(c) for c, _ in rows]
+        metas = [_pending_labels.pop(m["clause_id"], m) for m in metas]
+        existing = _indexed_ids([m["clause_id"] for m in metas])
+        rows = [(c, v, m) for (c, v), m in zip(rows, metas) if m["clause_id"] not in existing]
+        if not rows:
+            return 0
+        _add_to_store(
+            [(c["text"], v.tolist()) for c, v, _ in rows],
+            [m for _, _, m in rows],
+            [m["clause_id"] for _, _, m in rows],
         )
-        documents.append(doc)
+        _bump_index_version({m["document_id"] for _, _, m in rows})
+        persist_index()
+    logger.info("Copied %d vectors from previously indexed clauses", len(rows))
+    return len(rows)
 
-    embeddings_model = get_embeddings_model()
 
-    if _vector_store is None:
-        _vector_store = FAISS.from_documents(documents, embeddings_model)
-        logger.info("Created new FAISS index with %d documents", len(documents))
-    else:
-        _vector_store.add_documents(documents)
-        logger.info("Added %d documents to FAISS index (total: %d)", len(documents), _vector_store.index.ntotal)
+def get_clause_vectors(clauses: list[dict]) -> np.ndarray:
+    """
+    Unit vectors for the given clauses (dicts with clause_id or id, and text), one
+    row per clause in order. Stored vectors are read back from the FAISS index;
+    clauses that were never indexed are embedded (through the embedding cache).
+    """
+    ids = [c.get("clause_id") or c.get("id", "") for c in clauses]
+    with _index_lock:
+        vectors = _stored_vectors(ids)
+    missing = [c for c, clause_id in zip(clauses, ids) if clause_id not in vectors]
+    if missing:
+        embedded = embed_texts([c["text"] for c in missing])
+        for c, vector in zip(missing, embedded):
+            vectors[c.get("clause_id") or c.get("id", "")] = np.asarray(vector, dtype=np.float32)
+    if not ids:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.vstack([vectors[i] for i in ids]).astype(np.float32, copy=False)
 
-    # Auto-persist after adding
-    persist_index()
 
+def _normalize_query(query: str) -> str:
+    """Canonical form of a question for cache keys."""
+    return re.sub(r"\s+", " ", query).strip().rstrip("?.! ").lower()
 
-def search(query: str, k: int = 5) -> list[Document]:
-    """Search the FAISS index for the most similar clauses."""
-    global _vector_store
+
+@tracing.traced("vector_search")
+def search(query: str, k: int = 5, doc_id: str | None = None) -> list[Document]:
+    """
+    Search the FAISS index for the most similar clauses.
+    If doc_id is provided, only results from that document are returned.
+    """
     if _vector_store is None:
         logger.warning("FAISS index is empty, cannot search")
         return []
 
-    results = _vector_store.similarity_search(query, k=k)
+    key = (_normalize_query(query), doc_id, k, _index_version)
+    with _index_lock:
+        cached = _retrieval_cache.get(key)
+        if cached is not None:
+            _retrieval_cache.move_to_end(key)
+            _retrieval_stats["hits"] += 1
+            return list(cached)
+        _retrieval_stats["misses"] += 1
+
+    # Fetch extra results if filtering by doc_id
+    fetch_k = k * 3 if doc_id else k
+    query_vector = embed_query(query)
+    with metrics.FAISS_SEARCH_SECONDS.time(), tracing.span("faiss"):
+        scored = _vector_store.similarity_search_with_score_by_vector(query_vector, k=fetch_k)
+    # Vectors are unit-normalized, so squared L2 distance d maps to cosine 1 - d/2
+    results = [
+        Document(
+            id=doc.id,
+            page_content=doc.page_content,
+            metadata={**doc.metadata, "score": 1.0 - float(distance) / 2.0},
+        )
+        for doc, distance in scored
+    ]
+    if doc_id:
+        results = [r for r in results if r.metadata.get("document_id") == doc_id][:k]
     logger.info("FAISS search returned %d results for query: %s", len(results), query[:50])
-    return results
+
+    max_size = get_settings().retrieval_cache_size
+    with _index_lock:
+        _retrieval_cache[key] = results
+        while len(_retrieval_cache) > max_size:
+            _retrieval_cache.popitem(last=False)
+    return list(results)
+
+
+metrics.register_cache("retrieval", get_retrieval_cache_stats)
+metrics.register_gauge_callback(
+    "faiss_index_vectors",
+    "Vectors in the FAISS index",
+    lambda: _vector_store.index.ntotal if _vector_store is not None else 0,
+)
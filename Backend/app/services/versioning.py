@@ -0,0 +1,138 @@
+"""Clause-level diff between two versions of a document.
+
+Clauses are first paired by a hash of their normalized text (whitespace, case
+and the clause's own numbering ignored), so reordered or renumbered clauses
+still count as unchanged. The rest are paired by fuzzy text similarity
+(difflib ratio at or above VERSION_FUZZY_THRESHOLD) as modified; anything left
+over is added (new version only) or removed (previous version only).
+"""
+
+import logging
+import re
+from difflib import SequenceMatcher
+
+import xxhash
+
+from app.core.config import get_settings
+from app.services.dedup import NUMBERING_RE
+
+logger = logging.getLogger(__name__)
+
+UNCHANGED = "unchanged"
+MODIFIED = "modified"
+ADDED = "added"
+REMOVED = "removed"
+
+
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", NUMBERING_RE.sub("", text)).strip().lower()
+
+
+def text_hash(text: str) -> str:
+    return xxhash.xxh64_hexdigest(normalize(text).encode("utf-8"))
+
+
+def _fuzzy_pairs(new: list[dict], old: list[dict], threshold: float) -> list[tuple[int, int, float]]:
+    """Greedy best-first pairing of leftover clauses by difflib ratio."""
+    old_texts = [normalize(c["text"]) for c in old]
+    scored = []
+    for i, clause in enumerate(new):
+        matcher = SequenceMatcher(None, autojunk=False)
+        matcher.set_seq2(normalize(clause["text"]))
+        for j, text in enumerate(old_texts):
+            matcher.set_seq1(text)
+            # Cheap upper bounds first; ratio() is quadratic in the text length
+            if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+                continue
+            score = matcher.ratio()
+            if score >= threshold:
+                scored.append((score, i, j))
+    scored.sort(reverse=True)
+    used_new, used_old = set(), set()
+    pairs = []
+    for score, i, j in scored:
+        if i in used_new or j in used_old:
+            continue
+        used_new.add(i)
+        used_old.add(j)
+        pairs.append((i, j, score))
+    return pairs
+
+
+def diff_clauses(new: list[dict], old: list[dict]) -> list[dict]:
+    """
+    Diff the clauses of a new version against the previous one. Both are lists of
+    clause dicts with an id (clause_id or id) and text. Returns one entry per
+    clause: {"status", "clause_id", "previous_clause_id", "similarity"}, in the
+    new version's order followed by removed clauses.
+    """
+    def clause_id(c: dict) -> str:
+        return c.get("clause_id") or c.get("id", "")
+
+    old_by_hash: dict[str, list[int]] = {}
+    for j, clause in enumerate(old):
+        old_by_hash.setdefault(text_hash(clause["text"]), []).append(j)
+
+    matched: dict[int, tuple[int, float]] = {}
+    used_old: set[int] = set()
+    for i, clause in enumerate(new):
+        candidates = old_by_hash.get(text_hash(clause["text"]))
+        if candidates:
+            j = candidates.pop(0)
+            matched[i] = (j, 1.0)
+            used_old.add(j)
+
+    left_new = [i for i in range(len(new)) if i not in matched]
+    left_old = [j for j in range(len(old)) if j not in used_old]
+    fuzzy = _fuzzy_pairs(
+        [new[i] for i in left_new], [old[j] for j in left_old], get_settings().version_fuzzy_threshold,
+    )
+    modified = set()
+    for a, b, score in fuzzy:
+        matched[left_new[a]] = (left_old[b], score)
+        used_old.add(left_old[b])
+        modified.add(left_new[a])
+
+    changes = []
+    for i, clause in enumerate(new):
+        if i not in matched:
+            changes.append({"status": ADDED, "clause_id": clause_id(clause), "previous_clause_id": None, "similarity": None})
+            continue
+        j, score = matched[i]
+        changes.append({
+            "status": MODIFIED if i in modified else UNCHANGED,
+            "clause_id": clause_id(clause),
+            "previous_clause_id": clause_id(old[j]),
+            "similarity": round(score, 4),
+        })
+    for j, clause in enumerate(old):
+        if j not in used_old:
+            changes.append({"status": REMOVED, "clause_id": None, "previous_clause_id": clause_id(clause), "similarity": None})
+    return changes
+
+
+def summarize(changes: list[dict]) -> dict:
+    counts = {UNCHANGED: 0, MODIFIED: 0, ADDED: 0, REMOVED: 0}
+    for change in changes:
+        counts[change["status"]] += 1
+    return counts
+
+
+def carried_labels(changes: list[dict], previous: list[dict]) -> list[tuple]:
+    """
+    Label updates (as update_clause_classifications takes them) copying the
+    previous version's analysis onto unchanged clauses that were analyzed.
+    """
+    by_id = {c["id"]: c for c in previous}
+    updates = []
+    for change in changes:
+        if change["status"] != UNCHANGED:
+            continue
+        prev = by_id[change["previous_clause_id"]]
+        if prev.get("clause_type") is None:
+            continue
+        updates.append((
+            change["clause_id"], prev["clause_type"], prev["importance"], prev["risk_level"],
+            prev["risk_reason"], "previous_version", prev["id"], 1.0, prev.get("type_source"),
+        ))
+    return updates
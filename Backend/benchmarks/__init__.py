@@ -0,0 +1 @@
+"""Offline performance benchmarks and load tests for the legal analyzer backend."""
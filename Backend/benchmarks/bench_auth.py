@@ -0,0 +1,83 @@
+"""Micro-benchmark of per-request authentication overhead.
+
+Compares the original get_current_user path (JWT decode + full user row from a
+fresh SQLite connection on every request) with the cached dependency. From Backend/:
+
+    python -m benchmarks.bench_auth --iterations 5000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+
+def _configure_env(workdir: str) -> None:
+    os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+    os.environ.setdefault("JWT_SECRET_KEY", "offline-benchmark-secret")
+    os.environ["DATABASE_PATH"] = os.path.join(workdir, "bench.db")
+
+
+def _uncached_get_current_user(token: str) -> dict:
+    """The dependency as it was before principal caching."""
+    from app.core.security import decode_access_token
+    from app.db.database import get_db
+    from app.db.repositories import get_user_by_username
+
+    payload = decode_access_token(token)
+    username = payload.get("sub")
+    conn = get_db()
+    try:
+        return get_user_by_username(conn, username)
+    finally:
+        conn.close()
+
+
+def _time_sync(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations
+
+
+async def _time_async(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await fn()
+    return (time.perf_counter() - started) / iterations
+
+
+def main(iterations: int) -> dict:
+    from app.api.deps import get_current_user
+    from app.core.security import create_access_token, hash_password
+    from app.db.database import get_db, init_db
+    from app.db.repositories import create_user
+
+    init_db()
+    conn = get_db()
+    try:
+        create_user(conn, "bench-user", hash_password("bench-password"))
+    finally:
+        conn.close()
+    token = create_access_token({"sub": "bench-user"})
+
+    uncached = _time_sync(lambda: _uncached_get_current_user(token), iterations)
+    cached = asyncio.run(_time_async(lambda: get_current_user(token), iterations))
+    return {
+        "iterations": iterations,
+        "uncached_us_per_request": round(uncached * 1e6, 1),
+        "cached_us_per_request": round(cached * 1e6, 1),
+        "speedup": round(uncached / cached, 1) if cached else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        _configure_env(workdir)
+        print(json.dumps(main(args.iterations), indent=2))
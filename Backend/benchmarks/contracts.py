@@ -0,0 +1,173 @@
+"""Synthetic contract generator for benchmarks.
+
+Produces deterministic contract text (per seed) with a configurable number of
+pages, section heading style and share of boilerplate sections, and can write
+it out as a minimal text-only PDF that pdfplumber extracts like a real upload.
+"""
+
+import random
+from pathlib import Path
+
+SECTION_STYLES = ("section", "article", "numbered", "caps", "mixed")
+
+LINE_WIDTH = 90
+LINES_PER_PAGE = 54
+
+# Substantive clause bodies by topic; {party} and {n} are filled per section
+_SUBSTANTIVE = {
+    "Termination": [
+        "Either party may terminate this Agreement upon {n} days written notice to the other party.",
+        "The {party} may terminate immediately without cause if the other party breaches any material obligation.",
+        "Upon termination all licenses granted hereunder shall cease and the {party} shall return all materials.",
+    ],
+    "Liability": [
+        "In no event shall the {party} be liable for any indirect, incidental or consequential damages.",
+        "The aggregate liability of the {party} shall not exceed the fees paid in the {n} months preceding the claim.",
+        "The {party} shall have unlimited liability for gross negligence and wilful misconduct.",
+    ],
+    "Payment": [
+        "The {party} shall pay all invoices within {n} days of receipt.",
+        "Late payments shall accrue interest at {n} percent per month until paid in full.",
+        "All fees are non-refundable and exclusive of applicable taxes.",
+    ],
+    "Confidentiality": [
+        "Each party shall keep the Confidential Information of the other party strictly confidential.",
+        "The obligations of confidentiality shall survive for {n} years after termination of this Agreement.",
+        "Confidential Information may be disclosed only to employees with a need to know.",
+    ],
+    "Indemnity": [
+        "The {party} shall indemnify, defend and hold harmless the other party from any third party claims.",
+        "The indemnifying party shall have sole control of the defence of any claim.",
+    ],
+    "Non-Compete": [
+        "For {n} months after termination the {party} shall not engage in any competing business.",
+        "The {party} shall not solicit any employee of the other party during the term.",
+    ],
+    "Data Protection": [
+        "The {party} shall process personal data only on documented instructions.",
+        "Any personal data breach shall be notified within {n} hours of discovery.",
+    ],
+    "Dispute Resolution": [
+        "Any dispute shall be finally resolved by binding arbitration seated in London.",
+        "The parties shall first attempt to resolve any dispute through good faith negotiation for {n} days.",
+    ],
+}
+
+_BOILERPLATE = {
+    "Notices": "All notices under this Agreement shall be in writing and delivered to the addresses set out above.",
+    "Counterparts": "This Agreement may be executed in any number of counterparts, each of which is an original.",
+    "Headings": "Headings are for convenience only and do not affect the interpretation of this Agreement.",
+    "Severability": "If any provision is held invalid, the remaining provisions shall continue in full force.",
+    "Entire Agreement": "This Agreement constitutes the entire agreement between the parties on its subject matter.",
+    "Governing Law": "This Agreement is governed by the laws of England and Wales.",
+    "Waiver": "No failure or delay in exercising any right shall operate as a waiver of that right.",
+}
+
+_PARTIES = ("Supplier", "Customer", "Licensor", "Licensee", "Contractor", "Company")
+
+
+def _heading(style: str, number: int, title: str) -> str:
+    if style == "mixed":
+        style = SECTION_STYLES[number % 4]
+    if style == "section":
+        return f"Section {number}. {title}"
+    if style == "article":
+        return f"Article {number} {title}"
+    if style == "numbered":
+        return f"{number}.1 {title}"
+    return title.upper().replace("-", " ") + " PROVISIONS"
+
+
+def _wrap(text: str, width: int = LINE_WIDTH) -> list[str]:
+    lines, current = [], ""
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > width:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        lines.append(current)
+    return lines
+
+
+def generate_contract(
+    pages: int = 10,
+    section_style: str = "mixed",
+    boilerplate_ratio: float = 0.3,
+    seed: int = 0,
+) -> list[dict]:
+    """
+    Generate contract pages shaped like extract_pages output: [{"page": 1, "text": "..."}, ...].
+    boilerplate_ratio is the share of sections drawn from standard boilerplate.
+    """
+    if section_style not in SECTION_STYLES:
+        raise ValueError(f"section_style must be one of {SECTION_STYLES}")
+    rng = random.Random(seed)
+    lines: list[str] = ["MASTER SERVICES AGREEMENT", ""]
+    number = 0
+    while len(lines) < pages * LINES_PER_PAGE:
+        number += 1
+        if rng.random() < boilerplate_ratio:
+            title = rng.choice(list(_BOILERPLATE))
+            sentences = [_BOILERPLATE[title]]
+        else:
+            title = rng.choice(list(_SUBSTANTIVE))
+            sentences = [
+                rng.choice(_SUBSTANTIVE[title]).format(party=rng.choice(_PARTIES), n=rng.randint(2, 90))
+                for _ in range(rng.randint(2, 8))
+            ]
+        lines.append(_heading(section_style, number, title))
+        lines.extend(_wrap(" ".join(sentences)))
+        lines.append("")
+
+    return [
+        {"page": i + 1, "text": "\n".join(lines[i * LINES_PER_PAGE:(i + 1) * LINES_PER_PAGE]).strip()}
+        for i in range(pages)
+    ]
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(pages: list[dict], path: Path) -> Path:
+    """Write pages as a minimal uncompressed PDF (Helvetica 9pt, one text line per line)."""
+    objects: list[bytes] = []
+    page_ids = []
+    font_id = 3
+    for page in pages:
+        ops = ["BT", "/F1 9 Tf", "13 TL", "40 760 Td"]
+        for line in page["text"].split("\n"):
+            ops.append(f"({_pdf_escape(line)}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        content_id = 4 + len(objects)
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(4 + len(objects))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (font_id, content_id)
+        )
+
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode("ascii")
+    header_objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(header_objects + objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_at = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(offsets) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(offsets) + 1, xref_at)
+
+    path = Path(path)
+    path.write_bytes(bytes(out))
+    return path
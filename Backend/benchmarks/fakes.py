@@ -0,0 +1,168 @@
+"""Deterministic stand-ins for the Groq LLM and the HuggingFace embedding model.
+
+They let benchmarks exercise the real request path without network access or
+a torch install, with configurable latency so I/O-bound behaviour is realistic.
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+# Mirrors app.services.qa_chain.STREAM_META_MARKER without importing app settings
+STREAM_META_MARKER = "###META###"
+
+CLAUSE_TYPES = [
+    "Termination", "Liability", "Payment", "Confidentiality", "Indemnity", "IP",
+    "Warranty", "Insurance", "Dispute Resolution", "Force Majeure", "Non-Compete",
+    "Data Protection", "Governing Law", "Amendment", "General",
+]
+LEVELS = ["Low", "Medium", "High"]
+
+
+def _digest(text: str) -> int:
+    return int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def prompt_kind(prompt: str) -> str:
+    """Identify which application prompt produced this text."""
+    if "Classify the following legal clause" in prompt:
+        return "classification"
+    if "Assess the risk level" in prompt:
+        return "risk"
+    if "running summary of a conversation" in prompt:
+        return "summary"
+    return "qa"
+
+
+def fake_completion(prompt: str) -> str:
+    """Return a schema-valid JSON completion for any of the application prompts."""
+    kind = prompt_kind(prompt)
+    h = _digest(prompt)
+    if kind == "classification":
+        return json.dumps({
+            "clause_type": CLAUSE_TYPES[h % len(CLAUSE_TYPES)],
+            "importance": LEVELS[(h >> 4) % 3],
+        })
+    if kind == "risk":
+        level = LEVELS[(h >> 8) % 3]
+        return json.dumps({
+            "risk_level": level,
+            "risk_reason": f"Synthetic assessment: clause carries {level.lower()} exposure.",
+        })
+    if kind == "summary":
+        return f"The user and assistant discussed {prompt.count('User:')} questions about the contract."
+    clause_ids = re.findall(r"\[Clause_ID: ([^\]]+)\]", prompt)[:3]
+    answer = "Based on the provided clauses, the relevant obligations are summarised here."
+    if STREAM_META_MARKER in prompt:
+        meta = {"referenced_clauses": clause_ids, "overall_risk": LEVELS[h % 3], "confidence": 0.8}
+        return f"{answer}\n{STREAM_META_MARKER}\n{json.dumps(meta)}"
+    return json.dumps({
+        "answer": answer,
+        "referenced_clauses": clause_ids,
+        "overall_risk": LEVELS[h % 3],
+        "confidence": 0.8,
+    })
+
+
+class FakeLLM:
+    """
+    Implements the subset of the ChatGroq interface the services use.
+    With jitter, each prompt's latency varies by up to +/- jitter * latency,
+    derived from the prompt hash so runs stay reproducible.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self.calls_by_kind: dict[str, int] = {}
+
+    def _delay(self, prompt: str) -> float:
+        if not self.latency or not self.jitter:
+            return self.latency
+        spread = (_digest(prompt) % 1000) / 500 - 1.0
+        return max(self.latency * (1 + self.jitter * spread), 0.0)
+
+    def _message(self, prompt: str) -> AIMessage:
+        self.calls += 1
+        kind = prompt_kind(prompt)
+        self.calls_by_kind[kind] = self.calls_by_kind.get(kind, 0) + 1
+        content = fake_completion(prompt)
+        return AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": len(prompt) // 4,
+                "output_tokens": len(content) // 4,
+                "total_tokens": (len(prompt) + len(content)) // 4,
+            },
+        )
+
+    def invoke(self, prompt: str) -> AIMessage:
+        delay = self._delay(prompt)
+        if delay:
+            time.sleep(delay)
+        return self._message(prompt)
+
+    async def ainvoke(self, prompt: str) -> AIMessage:
+        delay = self._delay(prompt)
+        if delay:
+            await asyncio.sleep(delay)
+        return self._message(prompt)
+
+    async def astream(self, prompt: str):
+        """Yield the completion in small chunks, spreading the latency across them."""
+        content = self._message(prompt).content
+        delay = self._delay(prompt)
+        pieces = [content[i:i + 8] for i in range(0, len(content), 8)] or [""]
+        for piece in pieces:
+            if delay:
+                await asyncio.sleep(delay / len(pieces))
+            yield AIMessageChunk(content=piece)
+
+
+class FakeEmbeddings(Embeddings):
+    """Hashed bag-of-words embeddings: deterministic, normalized, and similar for similar texts."""
+
+    def __init__(self, dim: int = 384, latency_per_text: float = 0.0):
+        self.dim = dim
+        self.latency_per_text = latency_per_text
+
+    def _vector(self, text: str) -> list[float]:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            vec[_digest(token) % self.dim] += 1.0
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if self.latency_per_text:
+            time.sleep(self.latency_per_text * len(texts))
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+def install_fakes(
+    llm_latency: float = 0.0,
+    fake_embeddings: bool = True,
+    llm_jitter: float = 0.0,
+    fake_llm: bool = True,
+) -> FakeLLM:
+    """Patch the service layer to use FakeLLM and/or FakeEmbeddings."""
+    from app.services import embedding
+    from app.services import llm as llm_service
+
+    llm = FakeLLM(latency=llm_latency, jitter=llm_jitter)
+    if fake_llm:
+        llm_service.get_llm = lambda prompt_type: llm
+    if fake_embeddings:
+        fake = FakeEmbeddings()
+        embedding._embeddings_model = fake
+    return llm
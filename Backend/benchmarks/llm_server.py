@@ -0,0 +1,227 @@
+"""Local OpenAI/Groq-compatible chat completions stand-in for load testing.
+
+Serves POST /openai/v1/chat/completions (the path the Groq client uses) and
+/v1/chat/completions with schema-valid answers for the classification, risk,
+summary and QA prompts, so the real ChatGroq client code path runs end to end
+with no network or quota. Point the app at it with LLM_BASE_URL. From Backend/:
+
+    python -m benchmarks.llm_server --port 8001 --latency 0.4 --jitter 0.25
+    python -m benchmarks.llm_server --rate-limit 30        # 429 above 30 req/s
+    python -m benchmarks.llm_server --record calls.jsonl --upstream https://api.groq.com
+    python -m benchmarks.llm_server --replay calls.jsonl   # serve recorded answers
+
+Recording forwards each request (with the caller's API key) to the upstream
+and appends the answer to the JSONL file; replay serves recorded answers by a
+hash of (model, messages) and falls back to synthetic ones on a miss.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.fakes import fake_completion
+
+
+def request_key(model: str, messages: list[dict]) -> str:
+    """Stable key for a chat request, used by record/replay."""
+    raw = json.dumps({"model": model, "messages": messages}, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _TokenBucket:
+    """Allows `rate` requests per second with bursts of up to `rate`."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> float:
+        """Consume a token; returns 0 on success or the seconds to wait for one."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+def _usage(prompt: str, content: str) -> dict:
+    prompt_tokens, completion_tokens = len(prompt) // 4, len(content) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _rate_limited(retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        headers={"retry-after": f"{max(retry_after, 0.001):.3f}"},
+        content={"error": {
+            "message": "Rate limit reached (local stand-in). Please try again later.",
+            "type": "tokens",
+            "code": "rate_limit_exceeded",
+        }},
+    )
+
+
+def create_server(
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    rate_limit: float | None = None,
+    error_rate: float = 0.0,
+    replay: str | None = None,
+    record: str | None = None,
+    upstream: str | None = None,
+    seed: int = 0,
+) -> FastAPI:
+    app = FastAPI(title="LLM stand-in")
+    rng = random.Random(seed)
+    bucket = _TokenBucket(rate_limit) if rate_limit else None
+    stats = {"requests": 0, "synthetic": 0, "replayed": 0, "recorded": 0, "rate_limited": 0}
+    recorded: dict[str, str] = {}
+    if replay and Path(replay).exists():
+        with open(replay) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    recorded[entry["key"]] = entry["content"]
+    record_lock = asyncio.Lock()
+
+    async def _record_upstream(body: dict, key: str, authorization: str) -> str:
+        import httpx
+
+        payload = {**body, "stream": False}
+        async with httpx.AsyncClient(base_url=upstream, timeout=120) as client:
+            resp = await client.post(
+                "/openai/v1/chat/completions",
+                json=payload,
+                headers={"Authorization": authorization},
+            )
+            resp.raise_for_status()
+        content = resp.json()["choices"][0]["message"]["content"]
+        async with record_lock:
+            with open(record, "a") as f:
+                f.write(json.dumps({"key": key, "model": body.get("model"), "content": content}) + "\n")
+        recorded[key] = content
+        stats["recorded"] += 1
+        return content
+
+    async def _completions(request: Request):
+        stats["requests"] += 1
+        if bucket:
+            wait = bucket.take()
+            if wait:
+                stats["rate_limited"] += 1
+                return _rate_limited(wait)
+        if error_rate and rng.random() < error_rate:
+            stats["rate_limited"] += 1
+            return _rate_limited(1.0)
+
+        body = await request.json()
+        model = body.get("model", "stand-in")
+        messages = body.get("messages", [])
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        key = request_key(model, messages)
+
+        if key in recorded:
+            content = recorded[key]
+            stats["replayed"] += 1
+        elif record and upstream:
+            content = await _record_upstream(body, key, request.headers.get("authorization", ""))
+        else:
+            content = fake_completion(prompt)
+            stats["synthetic"] += 1
+
+        delay = latency * (1 + jitter * (2 * rng.random() - 1)) if latency else 0.0
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(max(delay, 0.0))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": _usage(prompt, content),
+            }
+
+        async def chunks():
+            pieces = [content[i:i + 16] for i in range(0, len(content), 16)] or [""]
+            for i, piece in enumerate(pieces):
+                await asyncio.sleep(max(delay, 0.0) / len(pieces))
+                delta = {"role": "assistant", "content": piece} if i == 0 else {"content": piece}
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created,
+                    "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            final = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created,
+                "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "x_groq": {"usage": _usage(prompt, content)},
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    app.add_api_route("/openai/v1/chat/completions", _completions, methods=["POST"])
+    app.add_api_route("/v1/chat/completions", _completions, methods=["POST"])
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per completion")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Latency jitter as a fraction")
+    parser.add_argument("--rate-limit", type=float, help="Requests/sec before answering 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered 429")
+    parser.add_argument("--replay", help="JSONL of recorded answers to serve")
+    parser.add_argument("--record", help="Append upstream answers to this JSONL file")
+    parser.add_argument("--upstream", help="Real API base URL used when recording")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.record and not args.upstream:
+        parser.error("--record requires --upstream")
+    server = create_server(
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit=args.rate_limit,
+        error_rate=args.error_rate,
+        replay=args.replay or args.record,
+        record=args.record,
+        upstream=args.upstream,
+        seed=args.seed,
+    )
+    uvicorn.run(server, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,151 @@
+"""Concurrency load test: sync (threadpool) vs async request path for /query.
+
+The "before" path is the old sync route shape (ask_question in a threadpool
+worker, blocking for the whole LLM round trip); the "after" path is the async
+/query route. While load runs, a probe repeatedly hits GET /documents/ to show
+whether cheap endpoints are starved of threadpool workers.
+
+Runs fully offline with FakeLLM / FakeEmbeddings. From Backend/:
+
+    python -m benchmarks.load_async_routes --llm-latency 0.5 --concurrency 4 16 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+
+def _configure_env(workdir: str) -> None:
+    os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+    os.environ.setdefault("JWT_SECRET_KEY", "offline-benchmark-secret")
+    os.environ["DATABASE_PATH"] = os.path.join(workdir, "bench.db")
+    os.environ["FAISS_INDEX_PATH"] = os.path.join(workdir, "faiss_index")
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(workdir, "embedding_cache.db")
+    os.environ["UPLOAD_DIR"] = os.path.join(workdir, "uploads")
+    # Every request should reach the LLM so we measure the blocking behaviour
+    os.environ["ANSWER_CACHE_ENABLED"] = "false"
+
+
+def _build_app():
+    from fastapi import Depends
+
+    from app.api.deps import get_current_user
+    from app.db.database import get_db, init_db
+    from app.db.repositories import create_document
+    from app.main import create_app
+    from app.models.query import QueryRequest, QueryResponse
+    from app.services.qa_chain import ask_question
+    from app.services.vector_store import add_clauses
+
+    init_db()
+    conn = get_db()
+    try:
+        create_document(conn, "bench-doc", "bench.pdf", "bench-user", 3)
+    finally:
+        conn.close()
+    add_clauses([
+        {
+            "clause_id": f"bench-doc-section-{i}",
+            "document_id": "bench-doc",
+            "section_title": f"Section {i}",
+            "text": f"Section {i}. The parties agree to termination, payment and liability term {i}.",
+            "page": 1 + i // 10,
+        }
+        for i in range(50)
+    ])
+
+    app = create_app()
+
+    def query_sync(request: QueryRequest, current_user: dict = Depends(get_current_user)):
+        """Pre-async route shape, kept here as the baseline."""
+        return ask_question(question=request.question, top_k=request.top_k, doc_id=request.doc_id)
+
+    app.add_api_route("/bench/query-sync", query_sync, methods=["POST"], response_model=QueryResponse)
+    return app
+
+
+async def _login(client) -> dict:
+    await client.post("/auth/register", json={"username": "bench-user", "password": "bench-password"})
+    resp = await client.post("/auth/login", data={"username": "bench-user", "password": "bench-password"})
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+async def _run_level(client, headers: dict, path: str, concurrency: int, per_worker: int) -> dict:
+    from benchmarks.stats import summarize
+
+    latencies: list[float] = []
+    probe_latencies: list[float] = []
+    stop = asyncio.Event()
+
+    async def worker(worker_id: int) -> None:
+        for i in range(per_worker):
+            payload = {"question": f"What are the termination terms, variant {worker_id}-{i}?", "top_k": 5}
+            started = time.perf_counter()
+            resp = await client.post(path, json=payload, headers=headers)
+            resp.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    async def probe() -> None:
+        while not stop.is_set():
+            started = time.perf_counter()
+            await client.get("/documents/", headers=headers)
+            probe_latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.05)
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+
+    result = {"concurrency": concurrency, **summarize(latencies, elapsed)}
+    result["probe_p95_ms"] = summarize(probe_latencies, elapsed)["p95_ms"]
+    return result
+
+
+async def main(args) -> dict:
+    import anyio.to_thread
+    import httpx
+
+    from benchmarks.fakes import install_fakes
+
+    install_fakes(llm_latency=args.llm_latency)
+    app = _build_app()
+    # Starlette runs sync routes and dependencies on this limiter
+    anyio.to_thread.current_default_thread_limiter().total_tokens = args.threadpool
+
+    report = {"llm_latency_s": args.llm_latency, "threadpool": args.threadpool, "sync": [], "async": []}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        headers = await _login(client)
+        for concurrency in args.concurrency:
+            for mode, path in (("sync", "/bench/query-sync"), ("async", "/query/")):
+                result = await _run_level(client, headers, path, concurrency, args.requests_per_worker)
+                report[mode].append(result)
+                print(f"{mode:5s} c={concurrency:<4d} rps={result['rps']:<8} "
+                      f"p95={result['p95_ms']}ms probe_p95={result['probe_p95_ms']}ms")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Simulated LLM latency in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--requests-per-worker", type=int, default=3)
+    parser.add_argument("--threadpool", type=int, default=40, help="Starlette threadpool size")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        _configure_env(workdir)
+        report = asyncio.run(main(args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
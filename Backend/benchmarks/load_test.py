@@ -0,0 +1,205 @@
+"""Async HTTP load generator for the user-facing API flows.
+
+Each virtual user registers, logs in, uploads a synthetic contract, analyzes
+it, sends chat messages about it and fetches dashboard stats. Latencies are
+grouped per endpoint and reported as RPS and p50/p95/p99, plus error counts.
+
+By default the app runs in-process (httpx ASGI transport, temp database,
+FakeLLM/FakeEmbeddings). --llm-url keeps the in-process app but sends LLM calls
+through the real ChatGroq client to benchmarks/llm_server.py; --base-url
+drives an already running deployment instead. From Backend/:
+
+    python -m benchmarks.load_test --users 20 --chats-per-user 5
+    python -m benchmarks.llm_server --port 8001 --latency 0.4 &
+    python -m benchmarks.load_test --users 50 --llm-url http://127.0.0.1:8001
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+QUESTIONS = [
+    "Can either party terminate early?",
+    "Is there a cap on liability?",
+    "When are payments due?",
+    "What happens to confidential information after termination?",
+    "Which law governs this agreement?",
+]
+
+
+class Recorder:
+    """Collects per-endpoint latencies and failures."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, dict[str, int]] = {}
+
+    async def call(self, name: str, request, expected: tuple[int, ...] = (200, 201, 204)):
+        started = time.perf_counter()
+        try:
+            resp = await request
+        except Exception as e:
+            self._error(name, type(e).__name__)
+            return None
+        self.latencies.setdefault(name, []).append(time.perf_counter() - started)
+        if resp.status_code not in expected:
+            self._error(name, str(resp.status_code))
+            return None
+        return resp
+
+    def _error(self, name: str, kind: str) -> None:
+        bucket = self.errors.setdefault(name, {})
+        bucket[kind] = bucket.get(kind, 0) + 1
+
+    def report(self, elapsed: float) -> dict:
+        from benchmarks.stats import summarize
+
+        endpoints = {}
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            endpoints[name] = {
+                **summarize(self.latencies.get(name, []), elapsed),
+                "errors": self.errors.get(name, {}),
+            }
+        return endpoints
+
+
+async def _user_flow(client, rec: Recorder, pdf_bytes: bytes, chats: int, user_index: int) -> None:
+    username = f"load-{user_index}-{uuid.uuid4().hex[:8]}"
+    password = "load-test-password"
+
+    if not await rec.call("POST /auth/register", client.post(
+        "/auth/register", json={"username": username, "password": password},
+    )):
+        return
+    resp = await rec.call("POST /auth/login", client.post(
+        "/auth/login", data={"username": username, "password": password},
+    ))
+    if not resp:
+        return
+    headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+    resp = await rec.call("POST /documents/upload", client.post(
+        "/documents/upload",
+        files={"file": ("contract.pdf", pdf_bytes, "application/pdf")},
+        headers=headers,
+    ))
+    if not resp:
+        return
+    doc_id = resp.json()["doc_id"]
+
+    await rec.call("POST /documents/{id}/analyze", client.post(
+        f"/documents/{doc_id}/analyze", headers=headers,
+    ))
+
+    session_id = None
+    for i in range(chats):
+        payload = {"question": QUESTIONS[(user_index + i) % len(QUESTIONS)], "doc_id": doc_id}
+        if session_id:
+            payload["session_id"] = session_id
+        resp = await rec.call("POST /chat/send", client.post("/chat/send", json=payload, headers=headers))
+        if resp:
+            session_id = resp.json().get("session_id", session_id)
+
+    await rec.call("GET /documents/stats", client.get("/documents/stats", headers=headers))
+
+
+def _configure_in_process(workdir: str, llm_url: str | None) -> None:
+    os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+    os.environ.setdefault("JWT_SECRET_KEY", "offline-benchmark-secret")
+    os.environ["DATABASE_PATH"] = os.path.join(workdir, "bench.db")
+    os.environ["FAISS_INDEX_PATH"] = os.path.join(workdir, "faiss_index")
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(workdir, "embedding_cache.db")
+    os.environ["UPLOAD_DIR"] = os.path.join(workdir, "uploads")
+    os.makedirs(os.environ["UPLOAD_DIR"], exist_ok=True)
+    if llm_url:
+        os.environ["LLM_BASE_URL"] = llm_url
+
+
+async def main(args, workdir: str) -> dict:
+    import httpx
+
+    from benchmarks.contracts import generate_contract, write_pdf
+
+    pdf_bytes = write_pdf(
+        generate_contract(args.pages, seed=args.seed), Path(workdir) / "contract.pdf",
+    ).read_bytes()
+
+    if args.base_url:
+        transport, base_url = None, args.base_url
+    else:
+        from benchmarks.fakes import install_fakes
+
+        # With --llm-url the real ChatGroq client talks to the stand-in server
+        install_fakes(
+            llm_latency=args.llm_latency,
+            fake_embeddings=not args.real_embeddings,
+            fake_llm=not args.llm_url,
+        )
+        from app.db.database import init_db
+        from app.main import create_app
+
+        init_db()
+        transport, base_url = httpx.ASGITransport(app=create_app()), "http://load-test"
+
+    rec = Recorder()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run_user(i: int) -> None:
+        async with semaphore:
+            await _user_flow(client, rec, pdf_bytes, args.chats_per_user, i)
+
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(run_user(i) for i in range(args.users)))
+        elapsed = time.perf_counter() - started
+
+    total = sum(len(v) for v in rec.latencies.values())
+    return {
+        "config": {
+            "target": args.base_url or "in-process",
+            "llm": args.llm_url or ("fake" if not args.base_url else "server-configured"),
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "chats_per_user": args.chats_per_user,
+            "pages": args.pages,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "total_requests": total,
+        "overall_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "endpoints": rec.report(elapsed),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", help="Load-test a running API instead of an in-process app")
+    parser.add_argument("--llm-url", help="In-process only: LLM stand-in server base URL")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="In-process FakeLLM latency")
+    parser.add_argument("--real-embeddings", action="store_true")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=10, help="Users running at once")
+    parser.add_argument("--chats-per-user", type=int, default=3)
+    parser.add_argument("--pages", type=int, default=5, help="Pages per uploaded contract")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if not args.base_url:
+            _configure_in_process(workdir, args.llm_url)
+        report = asyncio.run(main(args, workdir))
+
+    for name, stats in report["endpoints"].items():
+        print(f"{name:30s} n={stats['requests']:<5d} rps={stats['rps']:<8} p50={stats['p50_ms']}ms "
+              f"p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms errors={stats['errors']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
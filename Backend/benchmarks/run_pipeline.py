@@ -0,0 +1,196 @@
+"""Per-stage timing and memory benchmark of the ingestion and query pipeline.
+
+Generates a synthetic contract PDF and runs it through the same service calls
+as the upload/analyze/query routes, timing each stage:
+
+    extract_pages -> segment_document -> store_clauses -> classify -> score_risk
+    -> add_clauses -> search -> ask_question
+
+The LLM is always FakeLLM; embeddings are FakeEmbeddings unless --real-embeddings
+is given. The report is JSON so runs can be diffed between commits. From Backend/:
+
+    python -m benchmarks.run_pipeline --pages 40 --output before.json
+    python -m benchmarks.run_pipeline --pages 40 --compare before.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+QUESTIONS = [
+    "What are the termination rights of each party?",
+    "Is liability capped, and at what amount?",
+    "When are invoices due and what interest applies to late payment?",
+    "How long do confidentiality obligations survive?",
+    "Who controls the defence of indemnified claims?",
+    "What restrictions apply after termination?",
+    "How quickly must a personal data breach be notified?",
+    "How are disputes resolved?",
+]
+
+
+def _configure_env(workdir: str) -> None:
+    os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+    os.environ.setdefault("JWT_SECRET_KEY", "offline-benchmark-secret")
+    os.environ["DATABASE_PATH"] = os.path.join(workdir, "bench.db")
+    os.environ["FAISS_INDEX_PATH"] = os.path.join(workdir, "faiss_index")
+    os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(workdir, "embedding_cache.db")
+    os.environ["UPLOAD_DIR"] = os.path.join(workdir, "uploads")
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+        )
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _run_stage(report: dict, name: str, fn, trace_memory: bool):
+    """Run fn() -> (result, item_count) and record wall time, per-item time and peak memory."""
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    result, items = fn()
+    elapsed = time.perf_counter() - started
+    stage = {
+        "seconds": round(elapsed, 4),
+        "items": items,
+        "per_item_ms": round(elapsed * 1000 / items, 3) if items else None,
+    }
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stage["peak_kb"] = round(peak / 1024, 1)
+    report["stages"][name] = stage
+    print(f"{name:16s} {stage['seconds']:>9.4f}s  items={items}", file=sys.stderr)
+    return result
+
+
+def run(args, workdir: str) -> dict:
+    from benchmarks.contracts import generate_contract, write_pdf
+    from benchmarks.fakes import install_fakes
+
+    llm = install_fakes(
+        llm_latency=args.llm_latency,
+        llm_jitter=args.llm_jitter,
+        fake_embeddings=not args.real_embeddings,
+    )
+
+    from app.db.database import get_db, init_db
+    from app.db.repositories import create_document, insert_clauses
+    from app.services.classifier import classify_clauses
+    from app.services.pdf_extractor import extract_pages
+    from app.services.qa_chain import ask_question
+    from app.services.risk_scorer import score_clauses
+    from app.services.segmenter import segment_document
+    from app.services.vector_store import add_clauses, search
+
+    init_db()
+    doc_id = "bench-doc"
+    pdf_path = write_pdf(
+        generate_contract(args.pages, args.style, args.boilerplate, args.seed),
+        Path(workdir) / "contract.pdf",
+    )
+    queries = [QUESTIONS[i % len(QUESTIONS)] + f" (variant {i})" for i in range(args.queries)]
+
+    report = {
+        "config": {
+            "pages": args.pages,
+            "style": args.style,
+            "boilerplate": args.boilerplate,
+            "seed": args.seed,
+            "queries": args.queries,
+            "llm_latency_s": args.llm_latency,
+            "llm_jitter": args.llm_jitter,
+            "real_embeddings": args.real_embeddings,
+            "trace_memory": args.trace_memory,
+        },
+        "environment": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "stages": {},
+    }
+    stage = lambda name, fn: _run_stage(report, name, fn, args.trace_memory)  # noqa: E731
+
+    pages = stage("extract_pages", lambda: (lambda p: (p, len(p)))(extract_pages(pdf_path)))
+    clauses = stage("segment_document", lambda: (lambda c: (c, len(c)))(segment_document(pages, doc_id)))
+    clause_dicts = [{**c.model_dump(), "id": c.clause_id, "document_id": doc_id} for c in clauses]
+
+    def store():
+        conn = get_db()
+        try:
+            create_document(conn, doc_id, pdf_path.name, "bench-user", len(pages))
+            insert_clauses(conn, doc_id, clause_dicts)
+        finally:
+            conn.close()
+        return None, len(clause_dicts)
+
+    stage("store_clauses", store)
+    stage("classify", lambda: (classify_clauses(clause_dicts), len(clause_dicts)))
+    stage("score_risk", lambda: (score_clauses(clause_dicts), len(clause_dicts)))
+    stage("add_clauses", lambda: (add_clauses(clause_dicts), len(clause_dicts)))
+    stage("search", lambda: ([search(q, k=5) for q in queries], len(queries)))
+    stage("ask_question", lambda: ([ask_question(q, top_k=5) for q in queries], len(queries)))
+
+    report["llm_calls"] = dict(llm.calls_by_kind)
+    report["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return report
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Per-stage time ratio current/baseline (>1 means slower than baseline)."""
+    ratios = {}
+    for name, stage in report["stages"].items():
+        before = baseline.get("stages", {}).get(name)
+        if before and before.get("seconds"):
+            ratios[name] = round(stage["seconds"] / before["seconds"], 3)
+    return {"baseline_commit": baseline.get("environment", {}).get("commit"), "time_ratio": ratios}
+
+
+if __name__ == "__main__":
+    from benchmarks.contracts import SECTION_STYLES
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--style", choices=SECTION_STYLES, default="mixed")
+    parser.add_argument("--boilerplate", type=float, default=0.3, help="Share of boilerplate sections")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated LLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="Latency jitter as a fraction")
+    parser.add_argument("--real-embeddings", action="store_true", help="Use the configured HuggingFace model")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Record tracemalloc peaks per stage (slows every stage down)")
+    parser.add_argument("--compare", help="Baseline report to compare stage timings against")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        _configure_env(workdir)
+        os.makedirs(os.environ["UPLOAD_DIR"], exist_ok=True)
+        report = run(args, workdir)
+
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(report, json.load(f))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
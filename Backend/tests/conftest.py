@@ -0,0 +1,6 @@
+"""Shared test setup: the required settings get dummy values so app modules import."""
+
+import os
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("JWT_SECRET_KEY", "test")
@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip("langchain_huggingface")
+
+from app.models.query import QueryResponse  # noqa: E402
+from app.services import answer_cache, vector_store  # noqa: E402
+
+
+def _response() -> QueryResponse:
+    return QueryResponse(answer="a", referenced_clauses=[], overall_risk="Low", confidence=0.9)
+
+
+def test_unscoped_answer_goes_stale_when_index_changes():
+    vector = [1.0, 0.0, 0.0]
+    answer_cache.store(vector, None, _response(), set())
+    assert answer_cache.lookup(vector, None) is not None
+    vector_store._bump_index_version({"new-doc"})
+    assert answer_cache.lookup(vector, None) is None
+
+
+def test_scoped_answer_survives_unrelated_index_changes():
+    vector = [0.0, 1.0, 0.0]
+    answer_cache.store(vector, "doc-a", _response(), {"doc-a"})
+    vector_store._bump_index_version({"doc-b"})
+    assert answer_cache.lookup(vector, "doc-a") is not None
+    vector_store._bump_index_version({"doc-a"})
+    assert answer_cache.lookup(vector, "doc-a") is None
@@ -0,0 +1,11 @@
+import time
+
+from app.core import auth_cache
+
+
+def test_token_with_edited_payload_is_not_served_from_cache():
+    token = "header.eyJzdWIiOiJhbGljZSJ9.signature"
+    auth_cache.remember_token(token, "alice", time.time() + 60)
+    assert auth_cache.get_token_subject(token) == "alice"
+    tampered = "header.eyJzdWIiOiJtYWxsb3J5In0.signature"
+    assert auth_cache.get_token_subject(tampered) is None
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.core.config import get_settings
+from app.services import chat_history
+
+
+class FakeRepo:
+    def __init__(self, messages):
+        self.messages = messages
+        self.summary = None
+
+    async def get_chat_summary(self, conn, session_id):
+        return self.summary
+
+    async def get_recent_chat_messages(self, conn, session_id, limit, before_id=None):
+        return [m for m in self.messages if before_id is None or m["id"] < before_id][-limit:]
+
+    async def upsert_chat_summary(self, conn, session_id, summary, last_message_id):
+        self.summary = {"summary": summary, "last_message_id": last_message_id}
+
+
+@pytest.fixture
+def session(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "chat_history_window", 20)
+    monkeypatch.setattr(settings, "chat_history_max_messages", 10)
+    monkeypatch.setattr(settings, "chat_history_fold_batch", 6)
+    monkeypatch.setattr(settings, "chat_history_token_budget", 100_000)
+    folds = []
+
+    async def fold(summary, messages):
+        folds.append(len(messages))
+        return "summary"
+
+    monkeypatch.setattr(chat_history, "_afold_summary", fold)
+
+    def make(messages):
+        repo = FakeRepo(messages)
+        monkeypatch.setattr(chat_history, "arepo", repo)
+        return repo, folds
+    return make
+
+
+def _messages(n, size=1):
+    return [{"id": i, "role": "user" if i % 2 else "assistant", "content": " ".join(["word"] * size)} for i in range(1, n + 1)]
+
+
+def test_folds_only_once_a_batch_has_overflowed(session):
+    repo, folds = session(_messages(40))
+    history, summary = asyncio.run(chat_history.abuild_history(None, "s", before_id=15))
+    assert folds == [] and summary is None and len(history) == 14
+    history, summary = asyncio.run(chat_history.abuild_history(None, "s", before_id=17))
+    assert folds == [6] and summary == "summary" and len(history) == 10
+
+
+def test_unfolded_turns_never_exceed_the_token_budget(session, monkeypatch):
+    monkeypatch.setattr(get_settings(), "chat_history_token_budget", 200)
+    repo, folds = session(_messages(20, size=30))
+
+    async def failing_fold(summary, messages):
+        folds.append(len(messages))
+        return None
+
+    monkeypatch.setattr(chat_history, "_afold_summary", failing_fold)
+    history, _ = asyncio.run(chat_history.abuild_history(None, "s"))
+    assert folds, "overflow beyond the token budget is folded straight away"
+    used = sum(chat_history.count_tokens(chat_history._format_message(m)) for m in history)
+    assert used <= 200
@@ -0,0 +1,17 @@
+from app.services import dedup
+
+CAP = "The aggregate liability of the Supplier shall not exceed the fees paid in the {} months preceding the claim{}."
+
+
+def _similarity(a: str, b: str) -> float:
+    return float((dedup.signature(a) == dedup.signature(b)).mean())
+
+
+def test_numbering_and_dates_do_not_break_a_match():
+    a = "3.2 " + CAP.format(12, ", effective 1 January 2024")
+    b = "Section 7. " + CAP.format(12, ", effective 2025-06-05")
+    assert _similarity(a, b) == 1.0
+
+
+def test_different_amounts_are_not_masked():
+    assert _similarity(CAP.format(12, ""), CAP.format(24, "")) < 0.9
@@ -0,0 +1,21 @@
+import pytest
+
+pytest.importorskip("langchain_huggingface")
+
+from app.services.hybrid_retriever import lexical_query  # noqa: E402
+
+
+@pytest.mark.parametrize("question", [
+    "Is a penalty of 2.5 times the fees enforceable?",
+    "What happens if damages exceed $1.5M?",
+])
+def test_decimals_are_not_section_references(question):
+    assert lexical_query(question) is None
+
+
+@pytest.mark.parametrize("question, query", [
+    ("What does Section 12.3 say?", '"section 12 3"'),
+    ("Summarize § 4.1", '"4 1"'),
+])
+def test_section_references_are_lexical(question, query):
+    assert lexical_query(question) == query
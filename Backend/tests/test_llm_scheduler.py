@@ -0,0 +1,50 @@
+import threading
+import time
+
+import pytest
+
+from app.core.config import get_settings
+from app.services import llm_scheduler
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "llm_scheduler_enabled", True)
+    monkeypatch.setattr(settings, "llm_max_concurrency", 4)
+    monkeypatch.setattr(settings, "llm_interactive_reserved_slots", 1)
+    monkeypatch.setattr(settings, "llm_bulk_degraded_slots", 0)
+    monkeypatch.setattr(settings, "llm_interactive_slo_seconds", 1.0)
+    monkeypatch.setattr(llm_scheduler, "_queues", {p: llm_scheduler._ClassQueue() for p in llm_scheduler.PRIORITIES})
+    monkeypatch.setattr(llm_scheduler, "_interactive_latencies", llm_scheduler.deque(maxlen=200))
+    monkeypatch.setattr(llm_scheduler, "_RECHECK_SECONDS", 0.05)
+
+
+def test_bulk_keeps_one_slot_while_slo_is_at_risk(scheduler):
+    now = time.monotonic()
+    llm_scheduler._interactive_latencies.extend((now, 5.0) for _ in range(5))
+    assert llm_scheduler.slo_at_risk()
+    assert llm_scheduler.get_stats()["bulk_limit"] == 1
+
+
+def test_throttled_bulk_resumes_when_slo_window_clears(scheduler):
+    # Slow interactive samples that age out of the SLO window in ~0.3s
+    expires = time.monotonic() - llm_scheduler._SLO_WINDOW_SECONDS + 0.3
+    llm_scheduler._interactive_latencies.extend((expires, 5.0) for _ in range(5))
+    granted = []
+
+    def bulk_call():
+        with llm_scheduler.sync_slot("risk", 1):
+            granted.append(time.monotonic())
+            time.sleep(0.5)
+
+    first = threading.Thread(target=bulk_call)
+    first.start()
+    time.sleep(0.05)
+    second = threading.Thread(target=bulk_call)
+    second.start()
+    second.join(timeout=0.4)
+    first.join(timeout=2)
+    second.join(timeout=2)
+    # The second call started after the samples aged out, not after the first call ended
+    assert len(granted) == 2 and granted[1] - granted[0] < 0.45
@@ -0,0 +1,26 @@
+import pytest
+
+from app.services import triage
+
+
+@pytest.mark.parametrize("text", [
+    "Licensee has unlimited liability.",
+    "Employee shall not compete.",
+    "Client shall pay 10% ($10,000) on 01/01/2025; 20% ($20,000) on 03/01/2025; 70% ($70,000) on 06/01/2025.",
+    "Fees: 10% ($10,000) payable 01/01/2025, 90% ($90,000) payable 06/01/2025.",
+    "The Supplier shall deliver the Services in accordance with the Statement of Work.",
+])
+def test_substantive_clauses_pass(text):
+    assert triage.reason(text) is None
+
+
+@pytest.mark.parametrize("text, why", [
+    ("12", "page_number"),
+    ("Page 3 of 10", "page_number"),
+    ("TABLE OF CONTENTS\n1. Definitions ........ 2\n2. Term ........ 3\n3. Payment ........ 4", "toc"),
+    ("SIGNATURES\nIN WITNESS WHEREOF the parties have executed this Agreement.\nBy: ____\nName: ____", "signature"),
+    ("MASTER SERVICES AGREEMENT", "too_short"),
+    ("Rates table one two three four: 10.000 20.000 30.000 40.000 50.000 60.000 70.000 80.000", "low_density"),
+])
+def test_non_substantive_segments(text, why):
+    assert triage.reason(text) == why
@@ -0,0 +1,59 @@
+import threading
+from datetime import date
+
+import pytest
+
+from app.core.config import get_settings
+from app.services import usage
+
+
+@pytest.fixture
+def ledger(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "usage_daily_token_quota", 1000)
+    monkeypatch.setattr(settings, "usage_user_quotas", {})
+    monkeypatch.setattr(settings, "usage_reservation_seconds", 300.0)
+    monkeypatch.setattr(usage, "_used", {"alice": 0})
+    monkeypatch.setattr(usage, "_reservations", {})
+    monkeypatch.setattr(usage, "_used_day", date.today())
+    monkeypatch.setattr(usage, "_pending", [])
+    monkeypatch.setattr(usage, "_ensure_flusher", lambda: None)
+    usage.set_context(user="alice")
+
+
+def test_concurrent_checks_cannot_overshoot_the_quota(ledger):
+    admitted = []
+    barrier = threading.Barrier(8)
+
+    def request():
+        barrier.wait()
+        try:
+            usage.check_quota("alice", lambda: 300)
+            admitted.append(1)
+        except usage.QuotaExceededError:
+            pass
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(admitted) == 3
+    assert usage.used_today("alice") == 900
+
+
+def test_record_draws_down_the_reservation(ledger):
+    usage.check_quota("alice", lambda: 300)
+    usage.record("classify", 100, 50)
+    assert usage.used_today("alice") == 300
+    usage.record("risk", 200, 100)
+    # 150 left of the reservation, the rest is counted on top
+    assert usage.used_today("alice") == 450
+
+
+def test_unused_reservation_is_released_after_expiry(ledger, monkeypatch):
+    monkeypatch.setattr(get_settings(), "usage_reservation_seconds", 0.0)
+    usage.check_quota("alice", lambda: 900)
+    usage.record("classify", 100, 0)
+    assert usage.used_today("alice") == 100
+    usage.check_quota("alice", lambda: 900)
@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("langchain_huggingface")
+
+from app.services import vector_store  # noqa: E402
+
+
+@pytest.fixture
+def empty_index(monkeypatch):
+    monkeypatch.setattr(vector_store, "embed_texts", lambda texts: [[1.0, 0.0, 0.5] for _ in texts])
+    monkeypatch.setattr(vector_store, "get_embeddings_model", lambda: None)
+    monkeypatch.setattr(vector_store, "persist_index", lambda: None)
+    monkeypatch.setattr(vector_store, "_vector_store", None)
+    monkeypatch.setattr(vector_store, "_positions", {})
+    monkeypatch.setattr(vector_store, "_pending_labels", {})
+
+
+def test_labels_survive_analysis_finishing_before_upload_indexing(empty_index, monkeypatch):
+    uploaded = {"clause_id": "c1", "document_id": "d1", "section_title": "1", "text": "Fees", "page": 1}
+    analyzed = {**uploaded, "clause_type": "Payment", "risk_level": "High"}
+    add_clauses = vector_store.add_clauses
+
+    # Analysis finishes while the upload-time add_clauses is still embedding, and that
+    # upload-time call is the one that ends up indexing the clause
+    monkeypatch.setattr(vector_store, "add_clauses", lambda clauses: 0)
+    vector_store.upsert_document("d1", [analyzed])
+    add_clauses([uploaded])
+
+    metadata = vector_store._vector_store.docstore._dict["c1"].metadata
+    assert (metadata["clause_type"], metadata["risk_level"]) == ("Payment", "High")
+    assert vector_store._pending_labels == {}
+
+
+def test_stored_vectors_follow_rows_renumbered_by_delete(empty_index, monkeypatch):
+    vectors = {"Fees": [1.0, 0.0, 0.0], "Term": [0.0, 1.0, 0.0], "Law": [0.0, 0.0, 1.0]}
+    monkeypatch.setattr(vector_store, "embed_texts", lambda texts: [vectors[t] for t in texts])
+    vector_store.add_clauses([{"clause_id": "a", "document_id": "d1", "text": "Fees"}])
+    vector_store.add_clauses([
+        {"clause_id": "b", "document_id": "d2", "text": "Term"},
+        {"clause_id": "c", "document_id": "d2", "text": "Law"},
+    ])
+    vector_store.delete_document("d1")
+    vector_store.copy_vectors([("c", {"clause_id": "c2", "document_id": "d3", "text": "Law"})])
+
+    found = vector_store.get_clause_vectors([{"id": i, "text": ""} for i in ("b", "c", "c2")])
+    assert found.tolist() == [vectors["Term"], vectors["Law"], vectors["Law"]]
+    assert vector_store._positions == {"b": 0, "c": 1, "c2": 2}
+